@@ -23,6 +23,32 @@ NEW v5.1 - AESTHETIC DESIGN PRINCIPLES:
 🎨 Cognitive flow optimization
 🎨 Identity layer support (logos/icons)
 🎨 Aesthetic cohesion across all chart types
+
+NEW v5.2 - PERFORMANCE EDITION:
+⚡ Multi-process chunked rendering (--workers N) with lossless segment concat
+⚡ Retained-mode column/line renderers (no ax.clear() per frame)
+⚡ Single-pass encoding: raw frames piped to FFmpeg (no temp file, no re-encode)
+⚡ Precomputed NumPy FramePlan (values, top-N order, labels, cumsum) - O(top_n) per frame
+⚡ Duplicate-frame elimination: without interpolation each period is drawn once
+⚡ Cached static layers (gradient, panel box, progress track, watermark) composited per frame
+⚡ Incremental line engine: preallocated views, precomputed limits (--line-window N)
+⚡ Fast renderer: NumPy/Pillow bar/column with glyph cache (--renderer fast)
+⚡ Text raster cache: shadowed labels stroked once, blitted on later frames
+⚡ Parquet / Feather / Arrow IPC input: column projection + memory-mapped reads
+⚡ Two-phase CSV loader: head-sample detection, then usecols + explicit dtypes + fast engine
+⚡ Directory / glob input: parallel shard loading with schema check and per-file timings
+⚡ Excel fast path: --sheet selection, read-only streaming parse, columnar spill cache
+⚡ SQL source (URI + --table/--query): filter, GROUP BY and top-N candidates pushed down, chunked pivot
+⚡ Normalized dataset cache on disk (LRU, --no-cache)
+⚡ Draft preview (--draft [K]): 1/K frames, low DPI, no effects, ultrafast encode, same timing
+⚡ Encoding profiles (--encode-profile, --encode-set): CRF / capped VBR / 2-pass, frame-scaled timeout, encode fps
+⚡ Multi-output fan-out (--also-output): one render piped into MP4 / WebM / GIF encoders in a single FFmpeg
+⚡ Render/encode pipeline (--frame-queue N): bounded reusable frame buffers, writer thread, stall stats
+⚡ Resumable chunked rendering (--resume, --work-dir): manifest with data/options hash, only missing chunks
+⚡ Fused single-pass normalization kernel (opt-in --float32 storage)
+⚡ Pre-render pruning of entities that never reach the top N
+⚡ Categorical-code pivot for long data (--agg sum/mean/last for duplicates)
+⚡ Time resampling / period bucketing before frame planning (--resample W|M|Q|Y|N)
 """
 
 import pandas as pd
@@ -30,18 +56,40 @@ import bar_chart_race as bcr
 import argparse
 import sys
 import os
+import re
 from pathlib import Path
 import warnings
 import matplotlib.pyplot as plt
 from matplotlib import colors as mcolors
-from matplotlib.patches import FancyBboxPatch, Rectangle, Wedge
-import matplotlib.patches as mpatches
-from matplotlib.animation import FuncAnimation, FFMpegWriter, PillowWriter
+from matplotlib.patches import FancyBboxPatch, Rectangle
+from matplotlib.animation import FFMpegWriter, writers as movie_writers
+from matplotlib.artist import Artist
+from matplotlib.text import Text
+from matplotlib.transforms import IdentityTransform
+from matplotlib.backends.backend_agg import RendererAgg
+from matplotlib.image import AxesImage
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
+from matplotlib import font_manager
+from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageFont
 import matplotlib.gridspec as gridspec
 import subprocess
 import tempfile
+import shutil
+import time
+import threading
+import queue
+import io
+import hashlib
+import json
+import contextlib
+import csv
+import sqlite3
+import glob
 import numpy as np
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 warnings.filterwarnings('ignore')
 
@@ -240,6 +288,1793 @@ class StylePresets:
     }
 
 
+class EncodingProfiles:
+    """
+    V5.2 - Bộ thông số encode H.264 đặt tên (--encode-profile, ghi đè bằng --encode-set)
+
+    rate_control:
+        crf      - Chất lượng cố định (-crf), bitrate tự do
+        vbr      - CRF có trần bitrate (-crf + -maxrate/-bufsize, 'bitrate' = -b:v nếu có)
+        2pass    - Bitrate mục tiêu, encode 2 lượt từ segment lossless trung gian
+        lossless - -qp 0 (segment trung gian của --workers / 2-pass)
+    min_fps: Tốc độ encode tối thiểu dự kiến → timeout = 120s + frames / min_fps mỗi lượt
+    """
+
+    EDITOR = {  # Mặc định: editor-friendly như các bản trước
+        'rate_control': 'vbr', 'crf': 18, 'bitrate': '8000k', 'maxrate': '10000k', 'bufsize': '16000k',
+        'preset': 'medium', 'threads': 0, 'min_fps': 10,
+    }
+    DRAFT = {  # --draft: nhanh nhất, giữ fps của frame render
+        'rate_control': 'crf', 'crf': 30, 'preset': 'ultrafast', 'threads': 0, 'min_fps': 60,
+        'force_fps': False, 'h264_high': False,
+    }
+    SOCIAL = {  # Clip ngắn mạng xã hội: trần 6 Mbps, nền phẳng không tốn bitrate
+        'rate_control': 'vbr', 'crf': 21, 'maxrate': '6000k', 'bufsize': '12000k',
+        'preset': 'fast', 'threads': 0, 'min_fps': 20,
+    }
+    WEB = {  # Nhúng web / streaming: trần 4 Mbps
+        'rate_control': 'vbr', 'crf': 23, 'maxrate': '4000k', 'bufsize': '8000k',
+        'preset': 'medium', 'threads': 0, 'min_fps': 10,
+    }
+    ARCHIVE = {  # Lưu trữ: bitrate mục tiêu, 2 lượt, preset chậm
+        'rate_control': '2pass', 'bitrate': '12000k', 'preset': 'slow', 'threads': 0, 'min_fps': 4,
+    }
+    LOSSLESS_INTERMEDIATE = {  # Segment trung gian (ghép / encode lại sau)
+        'rate_control': 'lossless', 'preset': 'ultrafast', 'threads': 0, 'min_fps': 30,
+        'force_fps': False, 'h264_high': False, 'faststart': False,
+    }
+
+    PROFILES = {
+        'editor': EDITOR,
+        'draft': DRAFT,
+        'social': SOCIAL,
+        'web': WEB,
+        'archive': ARCHIVE,
+        'lossless-intermediate': LOSSLESS_INTERMEDIATE,
+    }
+    RATE_CONTROLS = ('crf', 'vbr', '2pass', 'lossless')
+    # Khóa ghi đè được và kiểu giá trị (--encode-set KEY=VALUE)
+    KEYS = {
+        'rate_control': str, 'crf': int, 'bitrate': str, 'maxrate': str, 'bufsize': str, 'preset': str,
+        'threads': int, 'timeout': float, 'min_fps': float,
+    }
+
+    # Output phụ (--also-output): đuôi file → codec
+    CONTAINERS = {'.mp4': 'h264', '.m4v': 'h264', '.mov': 'h264', '.mkv': 'h264', '.webm': 'vp9', '.gif': 'gif'}
+    # libvpx-vp9 -cpu-used theo preset x264 (> 5 → -deadline realtime). -deadline good chậm hơn
+    # x264 medium 4-5 lần ở mọi cpu-used; realtime 6 ≈ tốc độ x264 medium, file lớn hơn ~20%
+    VP9_CPU_USED = {'ultrafast': 8, 'superfast': 8, 'veryfast': 7, 'faster': 7, 'fast': 6,
+                    'medium': 6, 'slow': 4, 'slower': 2, 'veryslow': 1}
+    VP9_CRF_OFFSET = 10  # Thang CRF của VP9 (0-63): ~x264 CRF + 10 cho cùng chất lượng
+    GIF_FPS = 12
+    GIF_WIDTH = 480
+
+    @staticmethod
+    def resolve(name=None, overrides=None):
+        """
+        Profile theo tên + ghi đè
+
+        Args:
+            name: Tên profile (None = 'editor')
+            overrides: dict {khóa: giá trị} (giá trị chuỗi được chuyển theo KEYS)
+
+        Returns:
+            dict profile đầy đủ (có 'name')
+        """
+        name = name or 'editor'
+        if name not in EncodingProfiles.PROFILES:
+            raise ValueError(f"Encode profile không tồn tại: {name} ({', '.join(EncodingProfiles.PROFILES)})")
+        profile = {'crf': 23, 'bitrate': None, 'maxrate': None, 'bufsize': None, 'timeout': None,
+                   'force_fps': True, 'h264_high': True, 'faststart': True,
+                   **EncodingProfiles.PROFILES[name], 'name': name}
+        for key, value in (overrides or {}).items():
+            if key not in EncodingProfiles.KEYS:
+                raise ValueError(f"Khóa encode không hợp lệ: {key} ({', '.join(EncodingProfiles.KEYS)})")
+            try:
+                profile[key] = EncodingProfiles.KEYS[key](value)
+            except ValueError:
+                raise ValueError(f"Giá trị không hợp lệ cho {key}: {value}")
+        if profile['rate_control'] not in EncodingProfiles.RATE_CONTROLS:
+            raise ValueError(f"rate_control không hợp lệ: {profile['rate_control']} "
+                             f"({', '.join(EncodingProfiles.RATE_CONTROLS)})")
+        if profile['rate_control'] == '2pass' and not profile['bitrate']:
+            raise ValueError("rate_control 2pass cần bitrate (vd --encode-set bitrate=8000k)")
+        if profile['rate_control'] == 'vbr' and not profile['maxrate']:
+            raise ValueError("rate_control vbr cần maxrate (vd --encode-set maxrate=6000k)")
+        return profile
+
+    @staticmethod
+    def describe(profile):
+        """Mô tả ngắn: 'social (vbr crf 21 ≤ 6000k, preset fast)'"""
+        rc = profile['rate_control']
+        if rc == 'crf':
+            detail = f"crf {profile['crf']}"
+        elif rc == 'vbr':
+            detail = f"vbr crf {profile['crf']} ≤ {profile['maxrate']}"
+        elif rc == '2pass':
+            detail = f"2-pass {profile['bitrate']}"
+        else:
+            detail = "lossless"
+        threads = f", {profile['threads']} threads" if profile.get('threads') else ""
+        return f"{profile['name']} ({detail}, preset {profile['preset']}{threads})"
+
+    @staticmethod
+    def parse_output(spec, default=None):
+        """
+        Output phụ dạng 'PATH[:PROFILE][:Ns]' (vd 'race.webm:web', 'teaser.gif:8s')
+
+        Args:
+            spec: Chuỗi output (PATH có thể chứa ':' như C:\\video\\race.webm)
+            default: Profile khi spec không chọn profile (mặc định: editor; 2-pass → editor)
+
+        Returns:
+            dict {'path', 'codec', 'profile', 'seconds'}
+        """
+        parts = spec.split(':')
+        name, seconds = None, None
+        while len(parts) > 1:
+            option = parts[-1]
+            if name is None and option in EncodingProfiles.PROFILES:
+                name = option
+            elif seconds is None and option.endswith('s') and option[:-1].replace('.', '', 1).isdigit():
+                seconds = float(option[:-1])
+            else:
+                break
+            parts.pop()
+        path = ':'.join(parts)
+        codec = EncodingProfiles.CONTAINERS.get(os.path.splitext(path)[1].lower())
+        if codec is None:
+            raise ValueError(f"Output không hỗ trợ: {spec} (đuôi: {', '.join(EncodingProfiles.CONTAINERS)})")
+        if name is not None:
+            profile = EncodingProfiles.resolve(name)
+            if profile['rate_control'] == '2pass':
+                raise ValueError(f"Output phụ không dùng được profile 2-pass: {spec}")
+        elif default is None or default['rate_control'] == '2pass':
+            profile = EncodingProfiles.resolve()
+        else:
+            profile = default
+        return {'path': path, 'codec': codec, 'profile': profile, 'seconds': seconds}
+
+    @staticmethod
+    def describe_output(target):
+        """Mô tả ngắn một output phụ: 'teaser.gif (GIF 480px @ 12 fps, 8s)'"""
+        if target['codec'] == 'gif':
+            detail = f"GIF {EncodingProfiles.GIF_WIDTH}px @ {EncodingProfiles.GIF_FPS} fps"
+        else:
+            detail = f"{'VP9' if target['codec'] == 'vp9' else 'H.264'} {EncodingProfiles.describe(target['profile'])}"
+        seconds = f", {target['seconds']:g}s" if target['seconds'] else ""
+        return f"{target['path']} ({detail}{seconds})"
+
+
+class FramePipeline:
+    """
+    V5.2 - Pipeline render → encode: luồng render đẩy frame vào hàng đợi có giới hạn,
+    một writer thread ghi frame sang stdin của FFmpeg
+
+    Frame được chép vào buffer lấy từ pool cấp phát sẵn (depth buffer) và trả về pool sau
+    khi ghi → bộ nhớ = depth × W × H × 4, không phụ thuộc độ dài video. Frame lặp lại
+    (cùng nội dung) chỉ đẩy marker REPEAT, writer ghi lại buffer trước đó.
+
+    Thống kê: độ đầy hàng đợi khi render đẩy frame, thời gian chờ của mỗi bên
+    (render chờ buffer trống = encoder chậm hơn; writer chờ frame = render chậm hơn).
+    """
+
+    REPEAT = object()
+    _END = object()
+    POLL_SECONDS = 0.5  # Chu kỳ kiểm tra writer thread còn sống khi render phải chờ
+
+    def __init__(self, stream, shape, depth):
+        """
+        Args:
+            stream: File nhận bytes của frame (stdin của FFmpeg)
+            shape: (H, W, 4) của frame
+            depth: Số buffer trong pool (tối thiểu 2: writer giữ frame trước cho REPEAT)
+        """
+        self.stream = stream
+        self.depth = max(2, depth)
+        self.frame_bytes = int(np.prod(shape))
+        self._free = queue.Queue()
+        for _ in range(self.depth):
+            self._free.put(np.empty(shape, dtype=np.uint8))
+        self._filled = queue.Queue(maxsize=self.depth)
+        self.error = None
+        self.frames = 0
+        self.render_stall = 0.0
+        self.writer_stall = 0.0
+        self._occupancy_sum = 0
+        self.max_occupancy = 0
+        self._thread = threading.Thread(target=self._write_loop, name='tsr-frame-writer', daemon=True)
+        self._thread.start()
+
+    def acquire(self):
+        """Buffer trống từ pool (chờ nếu writer chưa trả buffer nào)"""
+        start = time.perf_counter()
+        while True:
+            try:
+                buffer = self._free.get(timeout=self.POLL_SECONDS)
+                break
+            except queue.Empty:
+                self._check_writer()
+        self.render_stall += time.perf_counter() - start
+        return buffer
+
+    def submit(self, item):
+        """Đẩy buffer đã vẽ (hoặc REPEAT) vào hàng đợi ghi"""
+        occupancy = self._filled.qsize()
+        self._occupancy_sum += occupancy
+        self.max_occupancy = max(self.max_occupancy, occupancy)
+        self.frames += 1
+        self._put(item)
+
+    def repeat(self):
+        """Frame giống frame trước → writer ghi lại buffer cũ, không chép"""
+        self.submit(self.REPEAT)
+
+    def _put(self, item):
+        start = time.perf_counter()
+        while True:
+            try:
+                self._filled.put(item, timeout=self.POLL_SECONDS)
+                break
+            except queue.Full:
+                self._check_writer()
+        self.render_stall += time.perf_counter() - start
+
+    def _check_writer(self):
+        if self.error is not None:
+            raise self.error
+        if not self._thread.is_alive():
+            raise RuntimeError("Writer thread đã dừng")
+
+    def _write_loop(self):
+        previous = None
+        try:
+            while True:
+                start = time.perf_counter()
+                item = self._filled.get()
+                self.writer_stall += time.perf_counter() - start
+                if item is self._END:
+                    break
+                if item is self.REPEAT:
+                    self.stream.write(previous)
+                    continue
+                self.stream.write(item)
+                if previous is not None:
+                    self._free.put(previous)
+                previous = item
+        except Exception as e:
+            self.error = e
+
+    def close(self):
+        """Đợi writer ghi hết hàng đợi; lỗi của writer thread được ném lại ở đây"""
+        if self._thread.is_alive():
+            self._put(self._END)
+            self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def summary(self):
+        """'queue 2.7/4 (max 4, 29 MB), stall render 0.3s / writer 4.1s'"""
+        average = self._occupancy_sum / max(self.frames, 1)
+        return (f"queue {average:.1f}/{self.depth} (max {self.max_occupancy}, "
+                f"{self.depth * self.frame_bytes / (1024 * 1024):.0f} MB), "
+                f"stall render {self.render_stall:.1f}s / writer {self.writer_stall:.1f}s")
+
+
+class _FrameSink(io.RawIOBase):
+    """V5.2 - File-like cho savefig(format='rgba'): ghi bytes thẳng vào buffer của FramePipeline"""
+
+    def __init__(self, buffer):
+        super().__init__()
+        self.view = buffer.reshape(-1)
+        self.offset = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = np.frombuffer(data, dtype=np.uint8)
+        self.view[self.offset:self.offset + len(data)] = data
+        self.offset += len(data)
+        return len(data)
+
+
+class BufferFFMpegWriter(FFMpegWriter):
+    """
+    V5.2 - FFMpegWriter ghi thẳng buffer RGBA của canvas (không gọi savefig → không vẽ lại)
+
+    queue_depth > 0: frame đi qua FramePipeline (writer thread riêng) → render frame sau
+    trong khi frame trước đang được ghi sang FFmpeg. 0 = ghi đồng bộ như FFMpegWriter.
+    """
+
+    QUEUE_DEPTH = 0
+
+    def __init__(self, *args, fanout_args=None, queue_depth=None, **kwargs):
+        """
+        Args:
+            fanout_args: Tham số + đường dẫn các output phụ, nối sau output chính trong CÙNG
+                         lệnh FFmpeg → mỗi frame chỉ pipe một lần, FFmpeg encode ra mọi output
+            queue_depth: Số buffer của FramePipeline (None = QUEUE_DEPTH của lớp, 0 = đồng bộ)
+        """
+        super().__init__(*args, **kwargs)
+        self.fanout_args = fanout_args or []
+        self.queue_depth = self.QUEUE_DEPTH if queue_depth is None else queue_depth
+        self.pipeline = None
+        self._last_frame = None
+
+    def _args(self):
+        return super()._args() + self.fanout_args
+
+    def setup(self, fig, outfile, dpi=None):
+        super().setup(fig, outfile, dpi)
+        if self.queue_depth:
+            width, height = self.frame_size
+            self.pipeline = FramePipeline(self._proc.stdin, (height, width, 4), self.queue_depth)
+
+    def finish(self):
+        try:
+            if self.pipeline is not None:
+                self.pipeline.close()
+        finally:
+            super().finish()
+
+    def _write_frame(self, rgba):
+        if self.pipeline is None:
+            self._proc.stdin.write(rgba)
+            self._last_frame = rgba
+        else:
+            buffer = self.pipeline.acquire()
+            np.copyto(buffer, np.asarray(rgba))
+            self.pipeline.submit(buffer)
+
+    def grab_buffer(self):
+        """Ghi buffer hiện tại của canvas (đã được vẽ) làm một frame"""
+        self._write_frame(self.fig.canvas.buffer_rgba())
+
+    def grab_array(self, rgba):
+        """Ghi một frame RGBA (H × W × 4, uint8) do renderer fast vẽ sẵn"""
+        self._write_frame(rgba)
+
+    def repeat_frame(self):
+        """Ghi lại frame trước (nội dung không đổi, không vẽ / chép lại)"""
+        if self.pipeline is None:
+            self._proc.stdin.write(self._last_frame)
+        else:
+            self.pipeline.repeat()
+
+    def grab_frame(self, **savefig_kwargs):
+        """anim.save (bar_chart_race): savefig thẳng vào buffer của pipeline"""
+        if self.pipeline is None:
+            return super().grab_frame(**savefig_kwargs)
+        self.fig.set_size_inches(self._w, self._h)
+        buffer = self.pipeline.acquire()
+        self.fig.savefig(_FrameSink(buffer), format=self.frame_format, dpi=self.dpi, **savefig_kwargs)
+        self.pipeline.submit(buffer)
+
+    def pipeline_summary(self):
+        """', queue ..., stall ...' cho log render (chuỗi rỗng khi ghi đồng bộ)"""
+        return f", {self.pipeline.summary()}" if self.pipeline is not None else ""
+
+
+@movie_writers.register('tsr_ffmpeg')
+class PipelinedFFMpegWriter(BufferFFMpegWriter):
+    """
+    V5.2 - Writer theo tên cho bar_chart_race: anim.save chỉ nhận tên writer (kèm fps), nên
+    độ sâu hàng đợi đặt qua QUEUE_DEPTH và pipeline của lần ghi gần nhất được giữ lại để báo cáo
+    """
+
+    last_pipeline = None
+
+    def finish(self):
+        PipelinedFFMpegWriter.last_pipeline = self.pipeline
+        super().finish()
+
+
+@contextlib.contextmanager
+def _bcr_layout_columns(columns):
+    """
+    V5.2 - bar_chart_race nới rộng figure theo tick label dài nhất trong MỌI cột nó nhận
+    (_BarChartRace.calculate_new_figsize). Sau prune, đo bằng tên cột trước prune để kích
+    thước frame giống hệt render không prune.
+
+    Args:
+        columns: Tên cột trước prune (None = không đổi gì)
+    """
+    if columns is None:
+        yield
+        return
+    race_class = bcr._make_chart._BarChartRace
+    calculate = race_class.calculate_new_figsize
+
+    def calculate_new_figsize(race, real_fig):
+        # Chỉ dùng số cột, tên cột và giá trị lớn nhất (luôn thuộc thực thể được giữ)
+        df_values = race.df_values
+        race.df_values = pd.DataFrame([[df_values.max().max()] * len(columns)], columns=columns)
+        try:
+            return calculate(race, real_fig)
+        finally:
+            race.df_values = df_values
+
+    race_class.calculate_new_figsize = calculate_new_figsize
+    try:
+        yield
+    finally:
+        race_class.calculate_new_figsize = calculate
+
+
+class StaticLayer(Artist):
+    """
+    V5.2 - Lớp artist tĩnh được raster hóa MỘT lần rồi composite mỗi frame
+
+    Gom các artist không đổi giữa các frame (gradient nền, khung stats panel,
+    track progress bar, watermark...) thành một ảnh RGBA cache. Mỗi lần vẽ chỉ
+    draw_image ảnh đã cache thay vì vẽ lại từng artist. Cache tự động raster lại
+    khi kích thước canvas / vị trí axes thay đổi, và khi axis limits thay đổi nếu
+    có artist dùng toạ độ data.
+    """
+
+    def __init__(self, ax, artists, zorder):
+        super().__init__()
+        self._ax = ax
+        self._members = []
+        for artist in artists:
+            # Tách khỏi axes: chỉ lớp này vẽ chúng (bar_chart_race cũng không xoá được)
+            try:
+                artist.remove()
+            except NotImplementedError:
+                pass  # Artist chưa được thêm vào axes
+            artist.axes = ax
+            artist.set_figure(ax.figure)
+            self._members.append(artist)
+        self._members.sort(key=lambda a: a.get_zorder())
+        self._limit_dependent = any(a.get_transform().contains_branch(ax.transData)
+                                    for a in self._members)
+        self.set_zorder(zorder)
+        self._key = None
+        self._image = None
+        self._offset = (0, 0)
+        self.rasterizations = 0
+        self.composites = 0
+
+    def _cache_key(self, renderer):
+        key = (renderer.width, renderer.height, renderer.dpi, tuple(self._ax.bbox.bounds))
+        if self._limit_dependent:
+            key += (self._ax.get_xlim(), self._ax.get_ylim())
+        return key
+
+    def _rasterize(self, renderer):
+        """Vẽ các artist lên canvas trong suốt và giữ lại vùng có nội dung"""
+        layer = RendererAgg(int(renderer.width), int(renderer.height), renderer.dpi)
+        for artist in self._members:
+            artist.draw(layer)
+        rgba = np.asarray(layer.buffer_rgba())
+        rows, cols = np.nonzero(rgba[..., 3])
+        if len(rows) == 0:
+            self._image = None
+            return
+        top, bottom, left, right = rows.min(), rows.max(), cols.min(), cols.max()
+        # Buffer Agg gốc ở trên-trái, draw_image gốc ở dưới-trái
+        self._image = np.ascontiguousarray(rgba[top:bottom + 1, left:right + 1][::-1])
+        self._offset = (int(left), int(renderer.height) - 1 - int(bottom))
+        self.rasterizations += 1
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        if not isinstance(renderer, RendererAgg):
+            # Backend vector (pdf/svg...) - vẽ trực tiếp
+            for artist in self._members:
+                artist.draw(renderer)
+            return
+
+        key = self._cache_key(renderer)
+        if key != self._key:
+            self._rasterize(renderer)
+            self._key = key
+        else:
+            self.composites += 1
+
+        if self._image is not None:
+            gc = renderer.new_gc()
+            renderer.draw_image(gc, self._offset[0], self._offset[1], self._image)
+            gc.restore()
+        self.stale = False
+
+
+class TextRasterCache:
+    """
+    V5.2 - Cache raster cho text có bóng (patheffects.withStroke)
+
+    Mỗi text có bóng phải chuyển thành path rồi stroke + fill lại mỗi lần vẽ - đắt hơn
+    nhiều so với text thường. Cache giữ ảnh RGBA đã raster hóa, key theo (chuỗi, font
+    family, cỡ, weight, style, màu, góc xoay, căn lề, mức bóng, dpi, phần lẻ vị trí 1/4 px):
+    tiêu đề, tên entity, nhãn cố định, tick %... chỉ raster một lần rồi draw_image lại.
+    """
+
+    MAX_ENTRIES = 2048  # LRU - số lặp lại (nhãn giá trị, %) không làm cache phình mãi
+
+    def __init__(self):
+        self._images = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def attach(self, text_obj, shadow_level):
+        """
+        Cho text_obj vẽ qua cache
+
+        Text được tạo bởi ax.text / set_title / pie... nên đổi lớp tại chỗ thành
+        CachedText (giữ nguyên mọi thuộc tính và vị trí trong axes).
+        """
+        text_obj.__class__ = CachedText
+        text_obj._raster_cache = self
+        text_obj._shadow_level = shadow_level
+        return text_obj
+
+    def get(self, key):
+        image = self._images.get(key)
+        if image is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._images.move_to_end(key)
+        return image
+
+    def put(self, key, image):
+        self._images[key] = image
+        if len(self._images) > self.MAX_ENTRIES:
+            self._images.popitem(last=False)
+
+
+class CachedText(Text):
+    """
+    V5.2 - Text vẽ từ TextRasterCache trên renderer Agg
+
+    Lần đầu gặp một key, text (kèm path effects) được vẽ lên canvas Agg nhỏ vừa khung
+    chữ; các lần sau chỉ draw_image ảnh đã cache tại vị trí hiện tại. Backend vector,
+    text có bbox, clip hoặc usetex vẽ như Text thường.
+    """
+
+    _raster_cache = None
+    _shadow_level = None
+
+    def _cache_key(self, renderer, frac):
+        prop = self.get_fontproperties()
+        return (self.get_text(), tuple(prop.get_family()), prop.get_size_in_points(), prop.get_weight(),
+                prop.get_style(), prop.get_stretch(), prop.get_file(),
+                mcolors.to_rgba(self.get_color()), self.get_alpha(), self.get_rotation(),
+                self.get_rotation_mode(), self.get_horizontalalignment(), self.get_verticalalignment(),
+                self._multialignment, self._linespacing, self._shadow_level,
+                renderer.dpi, frac)
+
+    def _rasterize(self, renderer, frac):
+        """Vẽ text lên canvas trong suốt vừa khung chữ, neo tại (dx, dy) + phần lẻ frac"""
+        spec = AestheticConfig.SHADOWS.get(self._shadow_level, AestheticConfig.SHADOWS['medium'])
+        pad = (spec['blur'] / 2 + spec['offset']) * renderer.dpi / 72 + 2
+        bbox = self.get_window_extent(renderer)
+        posx, posy = self.get_transform().transform(self.get_unitless_position())
+        dx = int(np.ceil(posx - bbox.x0 + pad))
+        dy = int(np.ceil(posy - bbox.y0 + pad))
+        width = dx + int(np.ceil(bbox.x1 - posx + pad)) + 1
+        height = dy + int(np.ceil(bbox.y1 - posy + pad)) + 1
+
+        layer = RendererAgg(width, height, renderer.dpi)
+        transform, position = self.get_transform(), self.get_position()
+        self.set_transform(IdentityTransform())
+        self.set_position((dx + frac[0], dy + frac[1]))
+        try:
+            super().draw(layer)
+        finally:
+            self.set_transform(transform)
+            self.set_position(position)
+            self._renderer = renderer
+
+        rgba = np.asarray(layer.buffer_rgba())
+        rows, cols = np.nonzero(rgba[..., 3])
+        if len(rows) == 0:
+            return (None, 0, 0)
+        top, bottom, left, right = rows.min(), rows.max(), cols.min(), cols.max()
+        # Buffer Agg gốc ở trên-trái, draw_image gốc ở dưới-trái (như StaticLayer)
+        image = np.ascontiguousarray(rgba[top:bottom + 1, left:right + 1][::-1])
+        return (image, dx - int(left), dy - (height - 1 - int(bottom)))
+
+    def draw(self, renderer):
+        if (self._raster_cache is None or not isinstance(renderer, RendererAgg)
+                or not self.get_visible() or not self.get_text() or self.get_usetex()
+                or self.get_bbox_patch() is not None
+                or self.get_clip_on() and (self.get_clip_box() or self.get_clip_path())):
+            return super().draw(renderer)
+
+        posx, posy = self.get_transform().transform(self.get_unitless_position())
+        if not (np.isfinite(posx) and np.isfinite(posy)):
+            return
+        # Vị trí làm tròn 1/4 px: ảnh cache dùng lại được mà không lệch nét chữ
+        posx, posy = round(posx * 4) / 4, round(posy * 4) / 4
+        x, y = int(np.floor(posx)), int(np.floor(posy))
+        frac = (posx - x, posy - y)
+
+        key = self._cache_key(renderer, frac)
+        cached = self._raster_cache.get(key)
+        if cached is None:
+            cached = self._rasterize(renderer, frac)
+            self._raster_cache.put(key, cached)
+
+        image, dx, dy = cached
+        if image is not None:
+            gc = renderer.new_gc()
+            renderer.draw_image(gc, x - dx, y - dy, image)
+            gc.restore()
+        self.stale = False
+
+
+class FramePlan:
+    """
+    V5.2 - Kế hoạch frame tính trước (vectorized) cho các renderer
+
+    Được tạo MỘT lần sau normalize_data. Mỗi frame chỉ cần tra chỉ số vào các mảng
+    NumPy (O(top_n)) thay vì iloc + sort_values trên pandas ở từng frame.
+
+    Mảng theo period:
+        values (periods × entities): Giá trị gốc
+        cumsum (periods × top_n): Tổng tích lũy của top-N ở frame cuối (line chart),
+                                  cột theo thứ tự top_order của frame cuối
+
+    Mảng theo frame:
+        frame_period: Period của mỗi frame
+        frame_row: Hàng nội dung của mỗi frame (không nội suy: 1 hàng / period,
+                   nội suy: 1 hàng / frame)
+        top_order, top_values (rows × top_n): Chỉ số entity top-N và giá trị đã nội suy
+
+    Chuyển động BAR (periods × 2·top_n, như bar_chart_race): entity thuộc top-N của period
+    i hoặc i+1 cùng giá trị và thứ hạng (cắt ở top_n + 1) tại hai đầu - giá trị và thứ hạng
+    được nội suy tuyến tính ở MỌI frame, kể cả khi không --interpolate.
+    """
+
+    def __init__(self, df_wide, top_n, steps_per_period, interpolate=False):
+        self.entities = np.asarray(df_wide.columns, dtype=object)
+        self.period_labels = list(df_wide.index)
+        self.steps_per_period = steps_per_period
+        self.interpolate = interpolate
+        self.n_periods = len(df_wide)
+        self.n_frames = self.n_periods * steps_per_period
+        self.top_n = min(top_n, len(self.entities))
+
+        # Giữ float32 nếu df_wide đã chuẩn hóa ở float32 (--float32) để không nhân đôi bộ nhớ
+        dtype = np.float32 if len(df_wide.columns) and (df_wide.dtypes == np.float32).all() else np.float64
+        self.values = np.ascontiguousarray(df_wide.to_numpy(dtype=dtype))
+
+        frames = np.arange(self.n_frames)
+        self.frame_period = np.minimum(frames // steps_per_period, self.n_periods - 1).astype(np.int32)
+
+        if interpolate:
+            # Nội suy tuyến tính giữa period i và i+1 (period cuối giữ nguyên)
+            self.frame_row = frames.astype(np.int32)
+            self.top_order = np.empty((self.n_frames, self.top_n), dtype=np.int32)
+            self.top_values = np.empty((self.n_frames, self.top_n), dtype=dtype)
+            t = (np.arange(steps_per_period) / steps_per_period)[:, None]
+            for i in range(self.n_periods):
+                start = self.values[i]
+                end = self.values[min(i + 1, self.n_periods - 1)]
+                block = start + t * (end - start)
+                rows = slice(i * steps_per_period, (i + 1) * steps_per_period)
+                self.top_order[rows] = self._top_order(block, self.top_n)
+                self.top_values[rows] = np.take_along_axis(block, self.top_order[rows], axis=1)
+        else:
+            self.frame_row = self.frame_period
+            self.top_order = self._top_order(self.values, self.top_n).astype(np.int32)
+            self.top_values = np.take_along_axis(self.values, self.top_order, axis=1)
+
+        # Chỉ cộng dồn các cột line chart thực sự vẽ (top-N frame cuối), không phải cả P × E
+        self.cumsum = np.cumsum(self.values[:, self.top_order[self.frame_row[-1]]], axis=0)
+        self._build_bar_motion()
+
+    def _build_bar_motion(self):
+        """
+        Bảng chuyển động BAR: ứng viên của mỗi bước period i → i+1 là top-N của hai period,
+        thứ hạng ngoài top-N = top_n + 1 (như rank().clip(upper=n_bars + 1) của bar_chart_race)
+        """
+        k = self.top_n
+        period_top = self.top_order[self.frame_row[::self.steps_per_period]]
+        next_top = np.concatenate([period_top[1:], period_top[-1:]])
+        candidates = np.concatenate([period_top, next_top], axis=1)
+
+        def ranks_in(top):
+            hit = candidates[:, :, None] == top[:, None, :]
+            return np.where(hit.any(axis=2), hit.argmax(axis=2) + 1, k + 1)
+
+        start, end = ranks_in(period_top), ranks_in(next_top)
+        # Entity có mặt ở cả hai period chỉ giữ bản ở nửa đầu
+        duplicate = np.zeros(candidates.shape, dtype=bool)
+        duplicate[:, k:] = start[:, k:] <= k
+        start[duplicate] = end[duplicate] = k + 1
+
+        rows = np.arange(self.n_periods)[:, None]
+        self.bar_entities = candidates.astype(np.int32)
+        self.bar_ranks = np.stack([start, end], axis=1).astype(np.float32)
+        self.bar_values = np.stack([self.values[rows, candidates],
+                                    self.values[np.minimum(rows + 1, self.n_periods - 1), candidates]], axis=1)
+
+    @staticmethod
+    def _top_order(matrix, k):
+        """
+        Chỉ số k cột lớn nhất của mỗi hàng, giảm dần (stable)
+
+        np.argpartition chọn top-k trong O(E), sau đó chỉ sort k phần tử.
+        Giá trị bằng nhau (kể cả ở biên top-k) giữ thứ tự cột như stable sort.
+        """
+        n_cols = matrix.shape[1]
+        if k >= n_cols:
+            return np.argsort(-matrix, axis=1, kind='stable')[:, :k]
+
+        neg = -matrix
+        part = np.argpartition(neg, k - 1, axis=1)[:, :k]
+        kth = np.take_along_axis(neg, part, axis=1).max(axis=1)
+
+        # Hàng có giá trị bằng nhau tràn qua biên top-k: chọn lại theo chỉ số cột nhỏ nhất
+        ambiguous = np.flatnonzero((neg <= kth[:, None]).sum(axis=1) > k)
+        for r in ambiguous:
+            better = np.flatnonzero(neg[r] < kth[r])
+            ties = np.flatnonzero(neg[r] == kth[r])[:k - len(better)]
+            part[r] = np.concatenate([better, ties])
+
+        part.sort(axis=1)
+        order = np.argsort(np.take_along_axis(neg, part, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(part, order, axis=1)
+
+    @property
+    def nbytes(self):
+        """Tổng dung lượng các mảng của plan"""
+        return sum(a.nbytes for a in (self.values, self.cumsum, self.frame_period,
+                                      self.frame_row, self.top_order, self.top_values,
+                                      self.bar_entities, self.bar_ranks, self.bar_values))
+
+    def top(self, frame):
+        """
+        Top-N của một frame
+
+        Returns:
+            (entity_indices, values, period_index)
+        """
+        row = self.frame_row[frame]
+        return self.top_order[row], self.top_values[row], self.frame_period[frame]
+
+    def frame_key(self, frame):
+        """
+        Khóa nội dung của frame: hai frame cùng khóa cho ra hình giống hệt nhau
+
+        Không nội suy → mọi frame trong một period cùng khóa (chỉ cần vẽ 1 lần / period).
+        """
+        return self.frame_row[frame]
+
+    def bar_frame(self, frame):
+        """
+        Bars của một frame BAR: giá trị và thứ hạng nội suy giữa period hiện tại và period kế
+
+        Returns:
+            (entity_indices, values, ranks, period_index) - ranks là số thực (1 = trên cùng),
+            chỉ gồm bar còn trong khung (hạng < top_n + 1)
+        """
+        period = self.frame_period[frame]
+        t = (frame - period * self.steps_per_period) / self.steps_per_period
+        ranks, values = self.bar_ranks[period], self.bar_values[period]
+        ranks = ranks[0] + t * (ranks[1] - ranks[0])
+        values = values[0] + t * (values[1] - values[0])
+        visible = ranks < self.top_n + 1
+        return self.bar_entities[period][visible], values[visible], ranks[visible], period
+
+
+def _blend(region, rgb, alpha):
+    """
+    V5.2 - Alpha blend màu lên một vùng của frame buffer (uint8 RGBA), tại chỗ
+
+    Args:
+        region: View H × W × 4 của frame buffer
+        rgb: Màu (0..255, float32) - 3 phần tử hoặc mảng H × W × 3
+        alpha: Độ phủ - số (0..1) hoặc mask H × W (float32)
+    """
+    if np.ndim(alpha):
+        alpha = alpha[..., None]
+    elif alpha >= 1:
+        region[..., :3] = rgb
+        return
+    elif alpha <= 0:
+        return
+    target = region[..., :3]
+    target[...] = target + (rgb - target) * alpha + 0.5
+
+
+def _rgb(color):
+    """Màu matplotlib bất kỳ → mảng RGB float32 (0..255)"""
+    return np.asarray(mcolors.to_rgb(color), dtype=np.float32) * 255
+
+
+class Glyph:
+    """
+    V5.2 - Một chuỗi đã raster hóa cho renderer fast
+
+    Attributes:
+        mask: Độ phủ của chữ (float32 0..1)
+        halo: Độ phủ của bóng chữ (withStroke lệch như _add_text_shadow) hoặc None
+        box: (x, y, w, h) của khung layout chữ trong mask - dùng để căn ha/va
+        keep: Phần nền còn lại sau khi vẽ bóng + chữ: (1 - halo)·(1 - mask)
+    """
+
+    __slots__ = ('mask', 'halo', 'box', 'keep', '_tinted')
+
+    def __init__(self, mask, halo, box):
+        self.mask = mask
+        self.halo = halo
+        self.box = box
+        keep = 1 - mask
+        if halo is not None:
+            keep *= 1 - halo
+        self.keep = keep[..., None]
+        self._tinted = {}
+
+    def tinted(self, color):
+        """mask·màu (+0.5 để làm tròn) - cache theo màu"""
+        key = tuple(color)
+        if key not in self._tinted:
+            self._tinted[key] = self.mask[..., None] * color + 0.5
+        return self._tinted[key]
+
+
+class GlyphCache:
+    """
+    V5.2 - Cache glyph đã raster hóa (Pillow/FreeType) cho renderer fast
+
+    Nhãn (tên entity, tiêu đề, period...) được raster hóa nguyên chuỗi MỘT lần rồi
+    blit lại mỗi frame. Số thay đổi liên tục nên được ghép từ glyph từng ký tự đã cache
+    → không raster lại chữ nào trong vòng lặp frame; chuỗi số lặp lại (tick, %) cũng được
+    cache sau lần ghép đầu.
+    """
+
+    MAX_NUMBERS = 4096  # Giới hạn cache chuỗi số đã ghép
+
+    def __init__(self, dpi, family, enable_shadows=True):
+        self.scale = dpi / 72.0
+        self.family = [f.strip() for f in family.split(',')]
+        self.enable_shadows = enable_shadows
+        self._fonts = {}
+        self._glyphs = {}
+        self._numbers = {}
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, size, weight='normal', style='normal'):
+        """FreeTypeFont cho cỡ chữ (points) - cùng file font mà matplotlib chọn"""
+        key = (size, weight, style)
+        if key not in self._fonts:
+            prop = font_manager.FontProperties(family=self.family, weight=weight, style=style)
+            path = font_manager.findfont(prop)
+            self._fonts[key] = ImageFont.truetype(path, max(1, int(round(size * self.scale))))
+        return self._fonts[key]
+
+    def text(self, text, size, weight='normal', style='normal', shadow=None, angle=0):
+        """Glyph của cả chuỗi (cache theo chuỗi, font, cỡ, weight, shadow, góc xoay)"""
+        key = (text, size, weight, style, shadow, angle)
+        glyph = self._glyphs.get(key)
+        if glyph is None:
+            self.misses += 1
+            glyph = self._glyphs[key] = self._rasterize(text, size, weight, style, shadow, angle)
+        else:
+            self.hits += 1
+        return glyph
+
+    def number(self, text, size, weight='normal', style='normal', shadow=None):
+        """Glyph của chuỗi số, ghép từ glyph từng ký tự đã cache"""
+        key = (text, size, weight, style, shadow)
+        glyph = self._numbers.get(key)
+        if glyph is None:
+            if len(self._numbers) >= self.MAX_NUMBERS:
+                self._numbers.clear()
+            glyph = self._numbers[key] = self.join([self.text(ch, size, weight, style, shadow) for ch in text])
+        else:
+            self.hits += 1
+        return glyph
+
+    @staticmethod
+    def join(glyphs):
+        """Ghép các glyph cùng font theo chiều ngang (theo khung layout của từng glyph)"""
+        if len(glyphs) == 1:
+            return glyphs[0]
+        pad, top, _, height = glyphs[0].box
+        width = sum(g.box[2] for g in glyphs)
+        mask = np.zeros((glyphs[0].mask.shape[0], width + 2 * pad), dtype=np.float32)
+        halo = np.zeros_like(mask) if glyphs[0].halo is not None else None
+        x = 0
+        for glyph in glyphs:
+            cols = slice(x, x + glyph.mask.shape[1])
+            np.maximum(mask[:, cols], glyph.mask, out=mask[:, cols])
+            if halo is not None:
+                np.maximum(halo[:, cols], glyph.halo, out=halo[:, cols])
+            x += glyph.box[2]
+        return Glyph(mask, halo, (pad, top, width, height))
+
+    def _rasterize(self, text, size, weight, style, shadow, angle):
+        font = self.font(size, weight, style)
+        ascent, descent = font.getmetrics()
+        left, _, right, _ = font.getbbox(text, anchor='ls') if text else (0, 0, 0, 0)
+        x_origin = -min(0, left)
+        width = max(1, int(np.ceil(max(right, font.getlength(text)))) + x_origin)
+        height = ascent + descent
+
+        # Bóng chữ = nét viền (dilate) lệch xuống-phải, giống patheffects.withStroke
+        pad = radius = offset = 0
+        spec = AestheticConfig.SHADOWS.get(shadow) if shadow and self.enable_shadows else None
+        if spec:
+            radius = max(1, int(round(spec['blur'] / 4 * self.scale)))
+            offset = int(round(spec['offset'] * self.scale))
+            pad = radius + offset
+
+        image = Image.new('L', (width + 2 * pad, height + 2 * pad), 0)
+        ImageDraw.Draw(image).text((pad + x_origin, pad + ascent), text, font=font, fill=255, anchor='ls')
+        halo_image = None
+        if spec:
+            halo_image = ImageChops.offset(image.filter(ImageFilter.MaxFilter(2 * radius + 1)), offset, offset)
+
+        box = (pad, pad, width, height)
+        if angle:
+            image = image.rotate(angle, resample=Image.BICUBIC, expand=True)
+            if halo_image is not None:
+                halo_image = halo_image.rotate(angle, resample=Image.BICUBIC, expand=True)
+            # Khung layout xoay quanh tâm ảnh (pad đối xứng) → bbox mới vẫn nằm giữa
+            cos, sin = abs(np.cos(np.radians(angle))), abs(np.sin(np.radians(angle)))
+            box_w, box_h = width * cos + height * sin, width * sin + height * cos
+            box = ((image.width - box_w) / 2, (image.height - box_h) / 2, box_w, box_h)
+
+        mask = np.asarray(image, dtype=np.float32) / 255
+        halo = np.asarray(halo_image, dtype=np.float32) * (spec['alpha'] / 255) if spec else None
+        return Glyph(mask, halo, box)
+
+    @staticmethod
+    def draw(buffer, glyph, x, y, color, alpha=1.0, ha='left', va='top'):
+        """Blit glyph lên frame buffer, căn khung layout theo (ha, va) tại pixel (x, y)"""
+        box_x, box_y, box_w, box_h = glyph.box
+        left = int(round(x - box_x - {'left': 0, 'center': box_w / 2, 'right': box_w}[ha]))
+        top = int(round(y - box_y - {'top': 0, 'center': box_h / 2, 'bottom': box_h}[va]))
+        height, width = glyph.mask.shape
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(left + width, buffer.shape[1]), min(top + height, buffer.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return
+        crop = (slice(y0 - top, y1 - top), slice(x0 - left, x1 - left))
+        # Bóng (đen) rồi chữ trong một lần: r' = r·(1 - halo)·(1 - chữ) + màu·chữ
+        if alpha < 1:
+            coverage = glyph.mask[crop] * alpha
+            keep = 1 - coverage
+            if glyph.halo is not None:
+                keep *= 1 - glyph.halo[crop]
+            keep, tint = keep[..., None], coverage[..., None] * color + 0.5
+        else:
+            keep, tint = glyph.keep[crop], glyph.tinted(color)[crop]
+        target = buffer[y0:y1, x0:x1, :3]
+        target[...] = target * keep + tint
+
+
+class FastRenderer:
+    """
+    V5.2 - Renderer raster nhẹ (NumPy + Pillow) cho BAR / COLUMN race (--renderer fast)
+
+    Không dùng matplotlib trong vòng lặp frame:
+    - Lớp nền (figure, nền axes, gradient, tiêu đề, tick tĩnh) vẽ MỘT lần
+    - Lớp phủ tĩnh (spines, grid cố định, track progress bar, khung stats panel,
+      watermark) vẽ một lần, lưu dạng sparse (chỉ pixel có nội dung) và composite mỗi frame
+    - Mỗi frame: copy lớp nền, tô bars bằng slice NumPy, blit chữ từ GlyphCache
+
+    Layout, palette, theme, typography (AestheticConfig) và bóng chữ theo cùng settings
+    với renderer matplotlib.
+    """
+
+    CHART_TYPES = ('bar', 'column')
+
+    # Subplot mặc định của matplotlib (left, bottom, right, top) - giống plt.subplots()
+    SUBPLOT = (0.125, 0.11, 0.9, 0.88)
+
+    def __init__(self, racer, width, height):
+        """
+        Args:
+            racer: TimeSeriesRacing đã có frame_plan
+            width, height: Kích thước frame (pixel) - lấy từ writer để khớp encoder
+        """
+        self.racer = racer
+        self.plan = racer.frame_plan
+        self.chart_type = racer.chart_type
+        self.width = width
+        self.height = height
+        self.pt = racer.dpi / 72.0
+        self.glyphs = GlyphCache(racer.dpi, racer.aesthetic.FONT_FAMILIES.get(racer.font_style, 'sans-serif'),
+                                 enable_shadows=racer.enable_shadows)
+        self.bar_glyphs = GlyphCache(racer.dpi, racer.font_family, enable_shadows=False)
+        self.colors = [_rgb(c) for c in ColorPalettes.get_palette(racer.palette)]
+        positions = racer.entity_positions
+        self.color_positions = positions if positions is not None else np.arange(len(self.plan.entities))
+        self.text_color = _rgb('#1a1a1a' if racer.theme == 'light' else '#FFFFFF')
+        self.black = _rgb(plt.rcParams['text.color'])
+        self.total_periods = max(1, self.plan.n_periods - 1)
+        self.frames_drawn = 0
+
+        # Glyph tên entity: raster trước cho mọi entity từng lọt top-N
+        self.top_entities = np.unique(self.plan.top_order)
+        if self.chart_type == 'bar':
+            self._setup_bar()
+        else:
+            self._setup_column()
+
+        self._base = np.empty((height, width, 4), dtype=np.uint8)
+        self._base[...] = 255
+        self._draw_base(self._base)
+        # Nền trong axes chỉ đổi theo hàng (màu nền / gradient) → màu bar đã blend tính theo hàng
+        self._row_bg = self._base[:, int((self.ax0 + self.ax1) / 2), :3].astype(np.float32)
+        self._overlay = self._build_overlay()
+        self.buffer = np.empty_like(self._base)
+
+    # ==================== LAYOUT ====================
+
+    def _axes_rect(self, left, bottom, right, top):
+        """Toạ độ figure (0..1, gốc dưới-trái) → pixel (x0, y0, x1, y1) gốc trên-trái"""
+        self.ax0, self.ax1 = left * self.width, right * self.width
+        self.ay0, self.ay1 = (1 - top) * self.height, (1 - bottom) * self.height
+
+    def _axes_point(self, x, y):
+        """Toạ độ axes (0..1) → pixel"""
+        return self.ax0 + x * (self.ax1 - self.ax0), self.ay1 - y * (self.ay1 - self.ay0)
+
+    def _setup_column(self):
+        racer = self.racer
+        self.n_slots = self.plan.top_n
+        self._axes_rect(*self.SUBPLOT)
+        # Giống ax.bar(range(n), width=0.8) + margin 5% của matplotlib
+        span = self.n_slots - 1 + 0.8
+        self.xlim = (-0.4 - 0.05 * span, self.n_slots - 1 + 0.4 + 0.05 * span)
+        self.label_size = racer._get_font_size('body')
+        self.value_size = racer._get_font_size('caption')
+        self.bar_alpha = racer.bar_alpha
+        self.bar_edge = _rgb('white')
+        self.bar_lw = racer.bar_border_width * self.pt
+        for entity_idx in self.top_entities:
+            self.glyphs.text(str(self.plan.entities[entity_idx]), self.label_size, angle=45)
+
+    def _setup_bar(self):
+        racer = self.racer
+        self.n_slots = self.plan.top_n
+        bar_kwargs = racer._bar_style_kwargs()
+        self.bar_alpha = bar_kwargs['alpha']
+        self.bar_edge = _rgb(bar_kwargs['ec'])
+        self.bar_lw = bar_kwargs['lw'] * self.pt
+        self.title_size = racer.title_font_size if racer.ratio == '16:9' else racer.title_font_size - 2
+        self.tick_size = racer.bar_label_font_size - 1
+        self.label_size = racer.bar_label_font_size
+        # Trục trái đủ rộng cho tên entity dài nhất (như bar_chart_race tính theo tick labels)
+        label_width = max(self.bar_glyphs.text(str(self.plan.entities[i]), self.tick_size,
+                                               weight=racer.title_style).box[2]
+                          for i in self.top_entities)
+        left = min(0.45, (label_width + 12 * self.pt) / self.width)
+        self._axes_rect(left, 0.05, 0.95, 0.85)
+        # Chừa chỗ cho progress bar ở đáy axes
+        self.slot_top, self.slot_bottom = 1.0, (0.07 if racer.show_progress_bar else 0.0)
+
+    # ==================== STATIC LAYERS ====================
+
+    def _draw_base(self, buffer):
+        """Lớp nền: figure, nền axes (+ gradient), tiêu đề"""
+        racer = self.racer
+        buffer[..., :3] = _rgb(plt.rcParams['figure.facecolor'])
+        axes_bg = ('#FAFAFA' if racer.theme == 'light' else '#1A1A1A') \
+            if racer.enable_background_gradient else plt.rcParams['axes.facecolor']
+        x0, y0, x1, y1 = (int(round(v)) for v in (self.ax0, self.ay0, self.ax1, self.ay1))
+        buffer[y0:y1, x0:x1, :3] = _rgb(axes_bg)
+
+        if self.chart_type == 'bar':
+            if racer.enable_background_gradient:
+                # Giống _add_background_gradient: cmap Blues/Greys, alpha 0.1, đậm dần xuống dưới
+                cmap = plt.cm.Blues if racer.theme == 'light' else plt.cm.Greys
+                rows = cmap(np.linspace(0, 1, y1 - y0))[:, :3].astype(np.float32) * 255
+                _blend(buffer[y0:y1, x0:x1], rows[:, None, :], 0.1)
+            title = racer.title
+            self.bar_glyphs.draw(buffer, self.bar_glyphs.text(title, self.title_size + 2, weight=racer.title_style),
+                                 (self.ax0 + self.ax1) / 2, self.ay0 - 22 * self.pt, self.text_color,
+                                 ha='center', va='bottom')
+            return
+
+        # COLUMN: tiêu đề + subtitle như _format_title_with_subtitle
+        spacing = racer._get_spacing(racer.title_spacing)
+        title_size = racer._get_font_size('title', racer.title_font_size)
+        subtitle = racer.subtitle
+        if racer.subtitle_template and self.plan.period_labels[0]:
+            subtitle = racer.subtitle_template.format(period=self.plan.period_labels[0])
+        title_y = 1.0 + (spacing / 100 if subtitle else spacing / 200)
+        x, y = self._axes_point(0.5, title_y)
+        self.glyphs.draw(buffer, self.glyphs.text(racer.title, title_size, weight='bold', shadow='medium'),
+                         x, y, self.black, ha='center', va='bottom')
+        if subtitle and not racer.subtitle_template:
+            self._draw_subtitle(buffer, subtitle)
+
+        # Tick labels tên entity (xoay 45°) chỉ đổi khi thứ hạng đổi → vẽ mỗi frame từ cache
+        self.tick_len = 3.5 * self.pt
+        for slot in range(self.n_slots):
+            x = self._data_x(slot)
+            buffer[int(self.ay1):int(self.ay1 + self.tick_len), int(x):int(x + max(1, 0.8 * self.pt)), :3] = self.black
+
+    def _draw_subtitle(self, buffer, subtitle):
+        racer = self.racer
+        spacing = racer._get_spacing(racer.title_spacing)
+        x, y = self._axes_point(0.5, 1.0 + spacing / 200)
+        glyph = self.glyphs.text(subtitle, racer._get_font_size('subtitle', racer.title_font_size), shadow='low')
+        self.glyphs.draw(buffer, glyph, x, y, self.black, alpha=0.8, ha='center', va='bottom')
+
+    def _build_overlay(self, tile=64):
+        """
+        Lớp phủ tĩnh (trên bars): vẽ lên nền đen và nền trắng để tách alpha, rồi cắt
+        thành các ô chỉ chứa vùng có nội dung → composite mỗi frame rất rẻ
+
+        Returns:
+            List (rows, cols, keep, premultiplied) - keep = 1 - alpha
+        """
+        layers = []
+        for background in (0, 255):
+            layer = np.full((self.height, self.width, 4), background, dtype=np.uint8)
+            self._draw_overlay(layer)
+            layers.append(layer[..., :3].astype(np.float32))
+        on_black, on_white = layers
+        alpha = 1 - (on_white - on_black).mean(axis=2) / 255
+        alpha[alpha < 1 / 512] = 0
+
+        tiles = []
+        for top in range(0, self.height, tile):
+            for left in range(0, self.width, tile):
+                block = alpha[top:top + tile, left:left + tile]
+                rows, cols = np.flatnonzero(block.any(axis=1)), np.flatnonzero(block.any(axis=0))
+                if len(rows) == 0:
+                    continue
+                ys = slice(top + rows[0], top + rows[-1] + 1)
+                xs = slice(left + cols[0], left + cols[-1] + 1)
+                # RGBA premultiplied (+0.5 để làm tròn), kênh alpha luôn ra 255
+                keep = 1 - alpha[ys, xs][..., None]
+                premultiplied = np.concatenate([on_black[ys, xs], 255 * (1 - keep)], axis=2) + 0.5
+                if keep.max() < 1 / 512:
+                    # Ô phủ kín (spines...) → chỉ cần gán màu
+                    tiles.append((ys, xs, None, premultiplied.astype(np.uint8)))
+                else:
+                    tiles.append((ys, xs, keep, premultiplied))
+        return tiles
+
+    def _draw_overlay(self, layer):
+        racer = self.racer
+        # Spines (khung axes)
+        lw = max(1, int(round(0.8 * self.pt)))
+        x0, y0, x1, y1 = (int(round(v)) for v in (self.ax0, self.ay0, self.ax1, self.ay1))
+        edge = _rgb(plt.rcParams['axes.edgecolor'])
+        for rows, cols in (((y0, y0 + lw), (x0, x1)), ((y1 - lw, y1), (x0, x1)),
+                           ((y0, y1), (x0, x0 + lw)), ((y0, y1), (x1 - lw, x1))):
+            layer[rows[0]:rows[1], cols[0]:cols[1], :3] = edge
+
+        if racer.show_progress_bar:
+            track, self.progress_rect = self._progress_geometry()
+            if racer.enable_shadows:
+                shift = 0.003 * np.array([self.ax1 - self.ax0, self.ay1 - self.ay0] * 2)
+                self._fill_rect(layer, *(track + shift), _rgb('black'), 0.1)
+            self._fill_rect(layer, *track, _rgb('#CCCCCC' if racer.theme == 'light' else '#444444'), 0.4)
+
+        if self.chart_type == 'bar' and racer.show_stats_panel:
+            self._draw_stats_box(layer)
+
+        if racer.watermark_text:
+            spacing = racer._get_spacing('sm') / 1000
+            positions = {
+                'bottom-right': (0.98 - spacing, 0.06 + spacing),
+                'bottom-left': (0.02 + spacing, 0.06 + spacing),
+                'top-right': (0.98 - spacing, 0.94 - spacing),
+                'top-left': (0.02 + spacing, 0.94 - spacing)
+            }
+            x, y = self._axes_point(*positions.get(racer.watermark_position, positions['bottom-right']))
+            glyph = self.glyphs.text(racer.watermark_text, racer._get_font_size('caption'), style='italic',
+                                     shadow='low')
+            self.glyphs.draw(layer, glyph, x, y, self.text_color, alpha=0.5,
+                             ha='right' if 'right' in racer.watermark_position else 'left', va='bottom')
+
+    def _draw_stats_box(self, layer):
+        """Khung + tiêu đề của stats panel (giống _add_stats_panel)"""
+        racer = self.racer
+        panel_bg = _rgb('#F5F5F5' if racer.theme == 'light' else '#2C3E50')
+        panel_x, panel_y, panel_w, panel_h = 0.73, 0.78, 0.25, 0.20
+        boxes = []
+        if racer.enable_shadows:
+            boxes.append((panel_x + 0.005, panel_y - 0.005, 0.01, _rgb('black'), 0.15, None))
+        boxes.append((panel_x, panel_y, 0.015, panel_bg, 0.95, self.text_color))
+        for x, y, pad, face, alpha, edge in boxes:
+            left, top = (int(round(v)) for v in self._axes_point(x - pad, y + panel_h + pad))
+            right, bottom = (int(round(v)) for v in self._axes_point(x + panel_w + pad, y - pad))
+            radius = min(pad * (self.ax1 - self.ax0), pad * (self.ay1 - self.ay0))
+            region = layer[max(top, 0):bottom + 1, max(left, 0):right + 1]
+            shape = (right + 1 - max(left, 0), bottom + 1 - max(top, 0))
+            corners = (left - max(left, 0), top - max(top, 0), right - max(left, 0), bottom - max(top, 0))
+            face_mask = Image.new('L', shape, 0)
+            ImageDraw.Draw(face_mask).rounded_rectangle(corners, radius=radius, fill=255)
+            _blend(region, face, np.asarray(face_mask, dtype=np.float32)[:region.shape[0], :region.shape[1]] * (alpha / 255))
+            if edge is not None:
+                edge_mask = Image.new('L', shape, 0)
+                ImageDraw.Draw(edge_mask).rounded_rectangle(corners, radius=radius, outline=255,
+                                                            width=max(1, int(round(2 * self.pt))))
+                _blend(region, edge, np.asarray(edge_mask, dtype=np.float32)[:region.shape[0], :region.shape[1]] * (alpha / 255))
+        x, y = self._axes_point(panel_x + 0.125, panel_y + panel_h - 0.03)
+        glyph = self.glyphs.text("📊 STATISTICS", racer._get_font_size('body'), weight='bold', shadow='low')
+        self.glyphs.draw(layer, glyph, x, y, self.text_color, ha='center', va='top')
+
+    # ==================== PRIMITIVES ====================
+
+    def _data_x(self, x):
+        """Toạ độ data trục x của column → pixel"""
+        return self.ax0 + (x - self.xlim[0]) / (self.xlim[1] - self.xlim[0]) * (self.ax1 - self.ax0)
+
+    def _grid_rgb(self):
+        return _rgb(plt.rcParams['grid.color'])
+
+    def _dash_pattern(self, length):
+        """Độ phủ của đường grid '--' (lw 0.5, alpha 0.15) dọc theo chiều dài"""
+        on, off = (np.array(plt.rcParams['lines.dashed_pattern']) * 0.5 * self.pt)
+        positions = np.arange(length) % (on + off)
+        return np.where(positions < on, 0.15, 0.0).astype(np.float32)
+
+    def _progress_geometry(self):
+        """Khung track progress bar (pixel) theo _add_progress_bar"""
+        spacing = self.racer._get_spacing('sm') / 1000
+        bar_x, bar_y, bar_w, bar_h = 0.03, 0.02 + spacing, 0.94, 0.025
+        left, top = self._axes_point(bar_x, bar_y + bar_h)
+        right, bottom = self._axes_point(bar_x + bar_w, bar_y)
+        return np.array([left, top, right, bottom]), (left, top, right, bottom)
+
+    @staticmethod
+    def _fill_rect(buffer, x0, y0, x1, y1, rgb, alpha, edge=None, lw=0):
+        """Tô hình chữ nhật (pixel, có thể kèm viền căn giữa cạnh như patch matplotlib)"""
+        height, width = buffer.shape[:2]
+        half = lw / 2
+        ox0, oy0 = int(round(max(0, x0 - half))), int(round(max(0, y0 - half)))
+        ox1, oy1 = int(round(min(width, x1 + half))), int(round(min(height, y1 + half)))
+        if ox0 >= ox1 or oy0 >= oy1:
+            return
+        if edge is None or lw <= 0:
+            _blend(buffer[oy0:oy1, ox0:ox1], rgb, alpha)
+            return
+        ix0, iy0 = int(round(x0 + half)), int(round(y0 + half))
+        ix1, iy1 = int(round(x1 - half)), int(round(y1 - half))
+        if ix0 < ix1 and iy0 < iy1:
+            _blend(buffer[iy0:iy1, ix0:ix1], rgb, alpha)
+            strips = [(oy0, iy0, ox0, ox1), (iy1, oy1, ox0, ox1), (iy0, iy1, ox0, ix0), (iy0, iy1, ix1, ox1)]
+        else:
+            strips = [(oy0, oy1, ox0, ox1)]
+        for r0, r1, c0, c1 in strips:
+            if r0 < r1 and c0 < c1:
+                _blend(buffer[r0:r1, c0:c1], edge, alpha)
+
+    def _composite_overlay(self, buffer):
+        for rows, cols, keep, premultiplied in self._overlay:
+            region = buffer[rows, cols]
+            if keep is None:
+                region[...] = premultiplied
+            else:
+                region[...] = region * keep + premultiplied
+
+    def _fill_bar(self, buffer, x0, y0, x1, y1, rgb):
+        """
+        Tô một bar (mặt + viền căn giữa cạnh như patch matplotlib), cắt theo khung axes
+
+        Nền dưới bar đồng nhất theo hàng nên chỉ cần blend một cột màu rồi gán (không
+        tính float trên cả vùng bar).
+        """
+        half = self.bar_lw / 2
+        clip_x0, clip_x1 = int(round(self.ax0)), int(round(self.ax1))
+        clip_y0, clip_y1 = int(round(self.ay0)), int(round(self.ay1))
+        ox0, ox1 = max(clip_x0, int(round(x0 - half))), min(clip_x1, int(round(x1 + half)))
+        oy0, oy1 = max(clip_y0, int(round(y0 - half))), min(clip_y1, int(round(y1 + half)))
+        if ox0 >= ox1 or oy0 >= oy1:
+            return
+        ix0, ix1 = max(ox0, int(round(x0 + half))), min(ox1, int(round(x1 - half)))
+        iy0, iy1 = max(oy0, int(round(y0 + half))), min(oy1, int(round(y1 - half)))
+
+        rows_bg = self._row_bg[oy0:oy1] * (1 - self.bar_alpha) + 0.5
+        # Gán cả pixel RGBA một lần qua view uint32
+        pixels = buffer.view(np.uint32)[oy0:oy1, ox0:ox1, 0]
+        pixels[...] = self._pack(rows_bg + self.bar_edge * self.bar_alpha)
+        if ix0 < ix1 and iy0 < iy1:
+            face = self._pack(rows_bg[iy0 - oy0:iy1 - oy0] + rgb * self.bar_alpha)
+            pixels[iy0 - oy0:iy1 - oy0, ix0 - ox0:ix1 - ox0] = face
+
+    @staticmethod
+    def _pack(rows_rgb):
+        """Cột màu RGB (float) → cột pixel RGBA (alpha 255) dạng uint32, shape (n, 1)"""
+        rgba = np.full((len(rows_rgb), 4), 255, dtype=np.uint8)
+        rgba[:, :3] = rows_rgb
+        return rgba.view(np.uint32)
+
+    def _format_value(self, value):
+        """Nhãn giá trị trên bar (giống v4_bar_label_func của BAR matplotlib)"""
+        if self.racer.use_percent:
+            return f"{value:.1f}%"
+        return f"{value:,.0f}" if value >= 1000 else f"{value:.1f}"
+
+    # ==================== FRAME ====================
+
+    def render(self, frame):
+        """
+        Vẽ một frame vào self.buffer
+
+        Returns:
+            Frame buffer RGBA (H × W × 4, uint8) - tái sử dụng giữa các frame
+        """
+        buffer = self.buffer
+        np.copyto(buffer, self._base)
+        if self.chart_type == 'bar':
+            self._render_bar(buffer, *self.plan.bar_frame(frame))
+        else:
+            self._render_column(buffer, *self.plan.top(frame))
+        self.frames_drawn += 1
+        return buffer
+
+    def frame_key(self, frame):
+        """Khóa nội dung frame (BAR luôn chuyển động giữa các period như bar_chart_race)"""
+        if self.chart_type == 'bar':
+            return frame
+        return self.plan.frame_key(frame)
+
+    def _render_progress(self, buffer, period_idx):
+        if not self.racer.show_progress_bar:
+            return
+        progress = period_idx / self.total_periods
+        left, top, right, bottom = self.progress_rect
+        color = _rgb('#4CAF50' if self.racer.theme == 'light' else '#66BB6A')
+        self._fill_rect(buffer, left, top, left + (right - left) * progress, bottom, color, 0.95)
+        glyph = self.glyphs.number(f"{progress*100:.0f}%", self.racer._get_font_size('caption'),
+                                   weight='bold', shadow='low')
+        self.glyphs.draw(buffer, glyph, (left + right) / 2, (top + bottom) / 2, _rgb('white'),
+                         ha='center', va='center')
+
+    def _value_ticks(self, limit, length_px, size, horizontal=False):
+        """Tick trục giá trị như AutoLocator (MaxNLocator 'auto', steps 1-2-2.5-5-10)"""
+        n_bins = max(1, min(9, int(length_px / self.pt / (size * (3 if horizontal else 2)))))
+        ticks = MaxNLocator(nbins=n_bins, steps=[1, 2, 2.5, 5, 10]).tick_values(0, limit)
+        return ticks[(ticks >= 0) & (ticks <= limit * (1 + 1e-9))]
+
+    @staticmethod
+    def _tick_text(value):
+        return f"{value:g}" if abs(value) < 1e6 else f"{value:,.0f}"
+
+    def _render_column(self, buffer, top_idx, values, period_idx):
+        racer = self.racer
+        finite = values[np.isfinite(values)]
+        y_max = finite.max() if len(finite) else 0
+        if y_max > 0:
+            self.ylim = y_max * 1.15  # Headroom 15% cho nhãn giá trị
+        limit = getattr(self, 'ylim', 1.0)
+        plot_h = self.ay1 - self.ay0
+
+        def to_y(value):
+            return self.ay1 - value / limit * plot_h
+
+        # Bars (slot i luôn dùng màu i như ax.bar(color=colors_list[:n]))
+        half = 0.4 * (self.ax1 - self.ax0) / (self.xlim[1] - self.xlim[0])
+        for slot, value in enumerate(values):
+            if not np.isfinite(value) or value <= 0:
+                continue
+            x = self._data_x(slot)
+            self._fill_bar(buffer, x - half, to_y(value), x + half, self.ay1, self.colors[slot % len(self.colors)])
+
+        # Grid ngang + tick trục y (phụ thuộc ylim)
+        ticks = self._value_ticks(limit, plot_h, self.label_size)
+        x0, x1 = int(round(self.ax0)), int(round(self.ax1))
+        if racer.show_grid:
+            dash = self._dash_pattern(x1 - x0)
+            for tick in ticks:
+                row = int(to_y(tick))
+                _blend(buffer[row:row + 1, x0:x1], self._grid_rgb(), dash[None, :])
+            # Grid dọc tại các slot (vẽ trên bars như matplotlib)
+            y0, y1 = int(round(self.ay0)), int(round(self.ay1))
+            dash = self._dash_pattern(y1 - y0)[:, None]
+            for slot in range(self.n_slots):
+                col = int(self._data_x(slot))
+                _blend(buffer[y0:y1, col:col + 1], self._grid_rgb(), dash)
+        label_right = self.ax0 - 3.5 * self.pt - 3.5 * self.pt
+        widest = 0
+        for tick in ticks:
+            row = int(to_y(tick))
+            buffer[row:row + max(1, int(0.8 * self.pt)), int(self.ax0 - 3.5 * self.pt):x0, :3] = self.black
+            glyph = self.glyphs.number(self._tick_text(tick), self.label_size)
+            widest = max(widest, glyph.box[2])
+            self.glyphs.draw(buffer, glyph, label_right, row, self.black, ha='right', va='center')
+        ylabel = self.glyphs.text('Value', self.label_size, angle=90)
+        self.glyphs.draw(buffer, ylabel, label_right - widest - racer._get_spacing('sm') * self.pt,
+                         (self.ay0 + self.ay1) / 2, self.black, ha='right', va='center')
+
+        # Nhãn giá trị trên bars
+        if racer.show_bar_values:
+            for slot, value in enumerate(values):
+                if np.isfinite(value):
+                    glyph = self.glyphs.number(f'{value:,.0f}', self.value_size, weight='bold', shadow='low')
+                    self.glyphs.draw(buffer, glyph, self._data_x(slot), to_y(value), self.black,
+                                     ha='center', va='bottom')
+
+        # Tên entity (xoay 45°, căn phải-trên như set_xticklabels(rotation=45, ha='right'))
+        for slot, entity_idx in enumerate(top_idx):
+            glyph = self.glyphs.text(str(self.plan.entities[entity_idx]), self.label_size, angle=45)
+            self.glyphs.draw(buffer, glyph, self._data_x(slot), self.ay1 + 7 * self.pt, self.black,
+                             ha='right', va='top')
+
+        self._composite_overlay(buffer)
+        if racer.subtitle_template:
+            period_val = self.plan.period_labels[period_idx]
+            if period_val:
+                self._draw_subtitle(buffer, racer.subtitle_template.format(period=period_val))
+        self._render_progress(buffer, period_idx)
+
+    def _render_bar(self, buffer, top_idx, values, ranks, period_idx):
+        racer = self.racer
+        finite = values[np.isfinite(values)]
+        x_max = finite.max() if len(finite) else 0
+        if x_max > 0:
+            self.xlim_max = x_max * 1.12
+        limit = getattr(self, 'xlim_max', 1.0)
+        plot_w = self.ax1 - self.ax0
+
+        def to_x(value):
+            return self.ax0 + value / limit * plot_w
+
+        # Bars theo thứ hạng nội suy (hạng 1 ở trên), màu theo entity như cmap của bar_chart_race
+        top, bottom = self._axes_point(0, self.slot_top)[1], self._axes_point(0, self.slot_bottom)[1]
+        slot_h = (bottom - top) / max(1, self.n_slots)
+        centers = top + (ranks - 0.5) * slot_h
+        for entity_idx, value, center in zip(top_idx, values, centers):
+            if np.isfinite(value) and value > 0:
+                self._fill_bar(buffer, self.ax0, center - 0.475 * slot_h, to_x(value), center + 0.475 * slot_h,
+                               self.colors[self.color_positions[entity_idx] % len(self.colors)])
+
+        # Grid dọc (trên bars như matplotlib) + tick labels giá trị phía trên axes
+        ticks = self._value_ticks(limit, plot_w, self.tick_size, horizontal=True)
+        y0, y1 = int(round(self.ay0)), int(round(self.ay1))
+        dash = self._dash_pattern(y1 - y0)[:, None]
+        for tick in ticks:
+            col = int(to_x(tick))
+            if racer.show_grid:
+                _blend(buffer[y0:y1, col:col + 1], self._grid_rgb(), dash)
+            self.bar_glyphs.draw(buffer, self.bar_glyphs.number(f'{tick:,.0f}', self.tick_size), col,
+                                 self.ay0 - 4 * self.pt, self.text_color, ha='center', va='bottom')
+
+        # Tên entity + nhãn giá trị (bar đang trượt ra/vào dưới đáy: không ghi nhãn)
+        for entity_idx, value, center in zip(top_idx, values, centers):
+            if center > bottom:
+                continue
+            name = str(self.plan.entities[entity_idx])
+            self.bar_glyphs.draw(buffer, self.bar_glyphs.text(name, self.tick_size, weight=racer.title_style),
+                                 self.ax0 - 6 * self.pt, center, self.text_color, ha='right', va='center')
+            if racer.show_bar_values and self.label_size > 0 and np.isfinite(value) and value > 0:
+                glyph = self.bar_glyphs.number(self._format_value(value), self.label_size)
+                self.bar_glyphs.draw(buffer, glyph, to_x(value) + 4 * self.pt, center, self.text_color,
+                                     ha='left', va='center')
+
+        # Period label lớn góc dưới-phải
+        period_val = self.plan.period_labels[period_idx]
+        period_text = f'{period_val:g}' if isinstance(period_val, (int, float, np.number)) else str(period_val)
+        pos = (0.95, 0.18) if racer.ratio == '9:16' else (0.98, 0.15)
+        x, y = self._axes_point(*pos)
+        glyph = self.bar_glyphs.text(period_text, self.title_size + 12, weight=racer.period_label_style)
+        self.bar_glyphs.draw(buffer, glyph, x, y, self.text_color, alpha=0.9, ha='right', va='center')
+
+        self._composite_overlay(buffer)
+        if racer.show_stats_panel:
+            self._render_stats(buffer, period_idx)
+        self._render_progress(buffer, period_idx)
+
+    def _render_stats(self, buffer, period_idx):
+        """Số liệu stats panel (Total, Leader, Gap, Average) của cả hàng period"""
+        row = self.plan.values[period_idx]
+        row = row[np.isfinite(row)]
+        if len(row) == 0:
+            return
+        top_two = -np.partition(-row, 1)[:2] if len(row) > 1 else np.array([row[0], row[0]])
+        if self.racer.period_totals is not None:
+            # Sau prune: Total / Average tính trên cả hàng gốc
+            total = self.racer.period_totals[period_idx]
+            average = total / self.racer.n_entities_total
+        else:
+            total, average = row.sum(), row.mean()
+        stats = [("Total", total), ("Leader", top_two[0]), ("Gap", top_two[0] - top_two[1]),
+                 ("Average", average)]
+        size = self.racer._get_font_size('caption')
+        x, y = self._axes_point(0.73 + 0.125, 0.78 + 0.20 - 0.03 - 0.04)
+        step = 0.03 * (self.ay1 - self.ay0)
+        for i, (label, value) in enumerate(stats):
+            value = value if np.isfinite(value) else 0
+            glyph = GlyphCache.join([self.glyphs.text(f"{label}: ", size, shadow='low'),
+                                     self.glyphs.number(f"{value:,.0f}", size, shadow='low')])
+            self.glyphs.draw(buffer, glyph, x, y + i * step, self.text_color, ha='center', va='center')
+
+
+class DatasetCache:
+    """
+    V5.2 - Cache trên đĩa cho df_wide đã chuẩn hóa
+
+    Key = hash nội dung file đầu vào + các tùy chọn ảnh hưởng đến chuẩn hóa, nên đổi
+    palette / preset / chart type vẫn dùng lại được cache. Mỗi entry là một file pickle
+    (nhị phân, giữ nguyên dtype / index / tên cột). Dung lượng thư mục bị giới hạn:
+    entry dùng lâu nhất (theo mtime, cập nhật mỗi lần hit) bị xoá trước (LRU).
+    """
+
+    VERSION = 2  # Tăng khi pipeline chuẩn hóa thay đổi → cache cũ tự động không khớp
+
+    def __init__(self, cache_dir=None, max_size_mb=512):
+        if cache_dir is None:
+            cache_dir = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'TimeSeriesRacing'
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+
+    @staticmethod
+    def file_digest(path, chunk_size=1 << 20):
+        """Hash nội dung file (BLAKE2b, đọc từng khối 1 MB)"""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def key(self, input_files, options):
+        """
+        Key cache cho file đầu vào + tùy chọn chuẩn hóa
+
+        Args:
+            input_files: Đường dẫn file dữ liệu, hoặc list các shard (thêm / sửa / đổi tên
+                         một shard đều đổi key)
+            options: dict các tùy chọn ảnh hưởng đến df_wide
+
+        Returns:
+            str hex
+        """
+        if isinstance(input_files, (str, Path)):
+            input_files = [input_files]
+        digest = hashlib.blake2b(digest_size=16)
+        for input_file in input_files:
+            digest.update(self.file_digest(input_file).encode())
+            digest.update(Path(input_file).suffix.lower().encode())
+            if len(input_files) > 1:
+                digest.update(Path(input_file).name.encode())  # Thứ tự ghép theo tên file
+        digest.update(repr((self.VERSION, sorted(options.items()))).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.pkl"
+
+    def load(self, key):
+        """df_wide đã cache, hoặc None nếu chưa có / file hỏng"""
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            df_wide = pd.read_pickle(path)
+        except Exception:
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # Đánh dấu vừa dùng (LRU)
+        return df_wide
+
+    def store(self, key, df_wide):
+        """Ghi df_wide (atomic: file tạm + rename) rồi dọn cache vượt giới hạn"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f'.tmp{os.getpid()}')
+        df_wide.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+        return path.stat().st_size
+
+    def spill_key(self, path, options):
+        """Key của bản spill dạng cột cho file nguồn chậm (Excel) + tùy chọn đọc (sheet, cột)"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(b'spill')
+        digest.update(self.file_digest(path).encode())
+        digest.update(repr((self.VERSION, options)).encode())
+        return digest.hexdigest()
+
+    def load_spill(self, key):
+        """DataFrame thô đã spill (Feather memory-map, hoặc pickle), None nếu chưa có"""
+        for path in (self.cache_dir / f"{key}.feather", self._path(key)):
+            if not path.exists():
+                continue
+            try:
+                if path.suffix == '.feather':
+                    import pyarrow.feather as feather
+                    df = feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+                else:
+                    df = pd.read_pickle(path)
+            except Exception:
+                path.unlink(missing_ok=True)
+                return None
+            os.utime(path)  # Đánh dấu vừa dùng (LRU)
+            return df
+        return None
+
+    def store_spill(self, key, df):
+        """
+        Ghi DataFrame thô dạng Feather (cần pyarrow, tên cột là chuỗi, cột một kiểu);
+        không ghi được Feather → pickle
+
+        Returns:
+            Dung lượng file (bytes)
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{key}.feather"
+        tmp_path = path.with_suffix(f'.tmp{os.getpid()}')
+        try:
+            df.to_feather(tmp_path)
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            path = self._path(key)
+            tmp_path = path.with_suffix(f'.tmp{os.getpid()}')
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+        return path.stat().st_size
+
+    def _evict(self, keep=None):
+        """Xoá entry cũ nhất cho đến khi tổng dung lượng ≤ giới hạn (giữ lại entry vừa ghi)"""
+        entries = sorted((p for p in self.cache_dir.iterdir() if p.suffix in ('.pkl', '.feather')),
+                         key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            total -= entry.stat().st_size
+            entry.unlink(missing_ok=True)
+
+
+class RenderCheckpoint:
+    """
+    V5.2 - Thư mục làm việc của render có checkpoint (--resume)
+
+    Frame được render theo chunk cố định (chunk_frames) thành segment lossless chunk_NNNNN.mp4.
+    Chunk được ghi vào chunk_NNNNN.partial.mp4, chỉ đổi tên khi FFmpeg đã đóng file, rồi mới
+    ghi vào manifest.json (atomic) kèm dung lượng. File .partial, chunk không có trong manifest
+    hoặc sai dung lượng bị coi là dở dang và render lại. Manifest gắn với fingerprint
+    (dữ liệu + tùy chọn render): fingerprint khác → bỏ các chunk cũ, render lại từ đầu.
+
+    Work dir có thể do người dùng chỉ định (--work-dir): chỉ đụng tới các file tên đúng mẫu
+    của class này, file khác trong thư mục được giữ nguyên.
+    """
+
+    VERSION = 1  # Tăng khi cách render frame thay đổi → chunk cũ tự động không khớp
+    MANIFEST = 'manifest.json'
+    SEGMENT_LIST = 'segments.txt'  # Danh sách concat do _concat_segments ghi cạnh các chunk
+    CHUNK_PATTERN = re.compile(r'chunk_(\d{5})(\.partial)?\.mp4')
+
+    def __init__(self, work_dir, fingerprint, total_frames, chunk_frames):
+        """
+        Args:
+            work_dir: Thư mục chứa chunk + manifest
+            fingerprint: Hash dữ liệu + tùy chọn render (TimeSeriesRacing._render_fingerprint)
+            total_frames: Tổng số frame render
+            chunk_frames: Số frame mỗi chunk
+        """
+        self.work_dir = Path(work_dir)
+        self.fingerprint = fingerprint
+        self.total_frames = total_frames
+        self.chunk_frames = max(1, chunk_frames)
+        self.chunks = [(start, min(start + self.chunk_frames, total_frames))
+                       for start in range(0, total_frames, self.chunk_frames)]
+        self.done = {}  # chỉ số chunk → dung lượng file (bytes)
+        self.discarded = 0  # Số chunk bỏ đi vì manifest cũ không khớp
+
+    def chunk_path(self, index):
+        return self.work_dir / f"chunk_{index:05d}.mp4"
+
+    def partial_path(self, index):
+        return self.work_dir / f"chunk_{index:05d}.partial.mp4"
+
+    def open(self, resume):
+        """
+        Tạo work dir; resume=True dùng lại các chunk hoàn tất trong manifest khớp fingerprint
+
+        Returns:
+            Số chunk dùng lại được
+        """
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self._read_manifest() if resume else None
+        if manifest is not None:
+            if (manifest.get('version'), manifest.get('fingerprint'), manifest.get('total_frames'),
+                    manifest.get('chunk_frames')) == (self.VERSION, self.fingerprint, self.total_frames,
+                                                      self.chunk_frames):
+                for index, size in manifest.get('chunks', {}).items():
+                    path = self.chunk_path(int(index))
+                    if path.exists() and path.stat().st_size == size:
+                        self.done[int(index)] = size
+            else:
+                self.discarded = len(manifest.get('chunks', {}))
+        # Dọn chunk dở dang / không thuộc manifest hiện tại (file tên khác mẫu: bỏ qua)
+        for path, match in self._chunk_files():
+            if match.group(2) or int(match.group(1)) not in self.done:
+                path.unlink(missing_ok=True)
+        self._write_manifest()
+        return len(self.done)
+
+    def missing(self):
+        """Chỉ số các chunk chưa render"""
+        return [index for index in range(len(self.chunks)) if index not in self.done]
+
+    def commit(self, index):
+        """Chunk đã render xong (file .partial đã đóng) → đổi tên + ghi manifest"""
+        path = self.chunk_path(index)
+        os.replace(self.partial_path(index), path)
+        self.done[index] = path.stat().st_size
+        self._write_manifest()
+
+    def segment_files(self):
+        return [str(self.chunk_path(index)) for index in range(len(self.chunks))]
+
+    def remove(self):
+        """Xoá chunk, manifest, danh sách concat; xoá work dir chỉ khi không còn file nào khác"""
+        for path, _ in self._chunk_files():
+            path.unlink(missing_ok=True)
+        for name in (self.MANIFEST, self.SEGMENT_LIST):
+            (self.work_dir / name).unlink(missing_ok=True)
+        try:
+            self.work_dir.rmdir()
+        except OSError:
+            pass
+
+    def _chunk_files(self):
+        """(path, match) của các file chunk_NNNNN[.partial].mp4 trong work dir"""
+        for path in self.work_dir.glob('chunk_*.mp4'):
+            match = self.CHUNK_PATTERN.fullmatch(path.name)
+            if match:
+                yield path, match
+
+    def _read_manifest(self):
+        try:
+            with open(self.work_dir / self.MANIFEST, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self):
+        path = self.work_dir / self.MANIFEST
+        tmp_path = path.with_suffix(f'.tmp{os.getpid()}')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': self.VERSION,
+                'fingerprint': self.fingerprint,
+                'total_frames': self.total_frames,
+                'chunk_frames': self.chunk_frames,
+                'chunks': {str(index): size for index, size in sorted(self.done.items())},
+            }, f, indent=1)
+        os.replace(tmp_path, path)
+
+
+def _peak_rss_mb():
+    """Peak RSS của process (MB), None nếu hệ điều hành không hỗ trợ (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _children_cpu_seconds():
+    """CPU time (user + sys) của các process con đã kết thúc (FFmpeg), None nếu không hỗ trợ (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _encode_rate(n_frames, cpu_before):
+    """V5.2 - ', encode N frames/CPU-s' cho FFmpeg vừa kết thúc (chuỗi rỗng nếu không đo được)"""
+    cpu_after = _children_cpu_seconds()
+    if cpu_before is None or cpu_after is None or cpu_after <= cpu_before:
+        return ""
+    return f", encode {n_frames / (cpu_after - cpu_before):.0f} frames/CPU-s"
+
+
 class TimeSeriesRacing:
     """Lớp chính để xử lý và tạo video chart race - V5.0 MULTI-CHART EDITION"""
 
@@ -256,6 +2091,22 @@ class TimeSeriesRacing:
         self.top_n = kwargs.get('top', 10)
         self.fps = kwargs.get('fps', 30)
         self.use_percent = kwargs.get('percent', False)
+        self.use_float32 = kwargs.get('float32', False)  # V5.2: df_wide float32 (nửa bộ nhớ)
+        self.agg = kwargs.get('agg', 'sum')  # V5.2: gộp dòng trùng (thời gian, thực thể) khi pivot
+        self.resample = kwargs.get('resample', None)  # V5.2: W/M/Q/Y (index ngày) hoặc N (index số)
+        self.resample_agg = kwargs.get('resample_agg', 'last')  # Gộp các hàng trong mỗi chu kỳ
+        self.sheet = kwargs.get('sheet', 0)  # V5.2: sheet Excel theo tên hoặc chỉ số
+        self.load_workers = kwargs.get('load_workers', 0)  # V5.2: thread đọc input nhiều file (0 = tự động)
+        self.table = kwargs.get('table', None)  # V5.2: input SQL - bảng nguồn
+        self.query = kwargs.get('query', None)  # Hoặc câu SELECT nguồn
+        self.where = kwargs.get('where', None)  # Điều kiện lọc đẩy xuống DB
+        self.sql_chunk_rows = kwargs.get('sql_chunk_rows', self.SQL_CHUNK_ROWS)  # Số dòng mỗi lần fetchmany
+        self.prune = kwargs.get('prune', True)  # V5.2: bỏ thực thể không bao giờ vào top N
+        self.prune_margin = kwargs.get('prune_margin', 2)  # Thêm N hạng dự phòng khi prune
+        self.entity_positions = None  # Vị trí cột gốc của từng thực thể (màu giữ nguyên sau prune)
+        self.period_totals = None  # Tổng cả hàng trước prune (stats panel: Total / Average)
+        self.n_entities_total = None
+        self.unpruned_columns = None  # Tên cột trước prune (layout figure của bar_chart_race)
         self.ratio = kwargs.get('ratio', '16:9')
         self.theme = kwargs.get('theme', 'light')
         self.output = kwargs.get('output', 'output.mp4')
@@ -315,6 +2166,7 @@ class TimeSeriesRacing:
         self.prev_ranks = {}  # Track previous ranks for change indicators
         self.prev_values = {}  # Track previous values for growth rate
         self.period_index = 0  # Current period index
+        self.frame_plan = None  # V5.2 - FramePlan (tạo sau normalize_data)
 
         # V5.1 - AESTHETIC EDITION parameters
         self.subtitle = kwargs.get('subtitle', '')  # Subtitle for context
@@ -323,6 +2175,25 @@ class TimeSeriesRacing:
         self.font_style = kwargs.get('font_style', 'clean')  # modern/elegant/technical/clean
         self.title_spacing = kwargs.get('title_spacing', 'lg')  # xs/sm/md/lg/xl/xxl
 
+        # V5.2 - PERFORMANCE EDITION parameters
+        self.workers = kwargs.get('workers', 1)  # Số process render song song (0 = tất cả CPU cores)
+        if self.workers is not None and self.workers < 0:
+            raise ValueError(f"workers phải ≥ 0 (0 = tất cả CPU cores): {self.workers}")
+        if not self.workers:
+            self.workers = os.cpu_count() or 1
+        self.line_window = kwargs.get('line_window', 0)  # Số period hiển thị trong line chart (0 = toàn bộ lịch sử)
+        self.renderer = kwargs.get('renderer', 'matplotlib')  # matplotlib / fast (NumPy + Pillow, bar/column)
+        self.text_cache = TextRasterCache()  # Raster text có bóng, dùng chung mọi figure
+        self.use_cache = kwargs.get('use_cache', True)  # Cache df_wide đã chuẩn hóa trên đĩa
+        self.dataset_cache = DatasetCache(kwargs.get('cache_dir'), kwargs.get('cache_size_mb', 512))
+        self.draft = kwargs.get('draft', None)  # Bản nháp: render 1/k frame (0 = chỉ frame đầu mỗi period)
+        self.frame_queue = kwargs.get('frame_queue', self.FRAME_QUEUE_DEPTH)  # Buffer render → encode (0 = đồng bộ)
+        self.pipeline_stats = None  # FramePipeline của lần render tuần tự gần nhất (báo cáo)
+        self.resume = kwargs.get('resume', False)  # Dùng lại chunk đã render trong work_dir
+        self.work_dir = kwargs.get('work_dir')  # Thư mục chunk (--resume: mặc định <output>.tsr-chunks)
+        self.chunk_frames = kwargs.get('chunk_frames', self.CHUNK_FRAMES)
+        self.checkpoint_stats = None  # (chunk dùng lại, chunk render mới, tổng chunk)
+
         # Initialize aesthetic helper
         self.aesthetic = AestheticConfig()
 
@@ -330,8 +2201,34 @@ class TimeSeriesRacing:
         if self.preset:
             self._apply_preset()
 
+        # V5.2 - Draft ghi đè preset (DPI, steps, hiệu ứng)
+        if self.draft is not None and self.draft is not False:
+            self._apply_draft()
+        else:
+            self.draft = None
+
+        # V5.2 - Encode profile (mặc định editor; --draft → draft nếu không chọn profile)
+        self.encoding = EncodingProfiles.resolve(
+            kwargs.get('encode_profile') or ('draft' if self.draft is not None else None),
+            kwargs.get('encode_overrides'))
+
+        # V5.2 - Output phụ encode cùng lúc từ MỘT lần render (--also-output PATH[:PROFILE][:Ns])
+        self.extra_outputs = [EncodingProfiles.parse_output(spec, self.encoding)
+                              for spec in kwargs.get('extra_outputs') or []]
+        output_paths = [os.path.abspath(p) for p in [self.output] + [t['path'] for t in self.extra_outputs]]
+        if len(set(output_paths)) != len(output_paths):
+            raise ValueError(f"Output bị trùng: {', '.join(output_paths)}")
+
         self.df = None
         self.df_wide = None
+        self.source_format = None  # V5.2: 'wide' khi nguồn (SQL) đã pivot sẵn
+
+        # V5.2 - Tùy chọn ảnh hưởng tới frame (sau preset / draft) → fingerprint của --resume.
+        # Mọi thuộc tính kiểu đơn giản trừ RESUME_IGNORED, nên tùy chọn thêm sau này tự được tính
+        self.render_options = repr(sorted(
+            (key, value) for key, value in vars(self).items()
+            if key not in self.RESUME_IGNORED
+            and isinstance(value, (str, int, float, bool, list, tuple, dict, type(None)))))
 
     def _apply_preset(self):
         """Áp dụng preset style"""
@@ -358,6 +2255,35 @@ class TimeSeriesRacing:
             print(f"  → Period: {self.period_length}ms, Steps: {self.steps_per_period}")
             print(f"  → Aesthetic: {self.font_style} fonts, {self.title_spacing} spacing")
 
+    DRAFT_DPI = 72
+    FRAME_QUEUE_DEPTH = 4  # Số frame buffer giữa render và writer thread (~7 MB / frame 1800×1012)
+    CHUNK_FRAMES = 600  # Số frame mỗi chunk của render có checkpoint (20s ở 30 fps)
+    # Tùy chọn không ảnh hưởng tới nội dung frame → đổi giữa các lần chạy vẫn --resume được
+    RESUME_IGNORED = ('input_file', 'output', 'workers', 'load_workers', 'sql_chunk_rows', 'use_cache',
+                      'frame_queue', 'encoding', 'extra_outputs', 'resume', 'work_dir', 'chunk_frames')
+
+    def _apply_draft(self):
+        """
+        V5.2 - Draft: bản xem nhanh bố cục / màu thay cho render đầy đủ
+
+        Chỉ render 1 trong k frame (steps_per_period // k; 0 = chỉ frame đầu mỗi period).
+        FPS tính từ steps_per_period nên mỗi period vẫn dài period_length → thời lượng và
+        nhịp giống video thật. DPI hạ xuống DRAFT_DPI, tắt bóng chữ / gradient nền / hiệu ứng
+        bar, encode ultrafast và gắn nhãn DRAFT vào metadata (_encoding_args).
+        """
+        k = 0 if self.draft is True else int(self.draft)
+        self.draft = k
+        full_steps = self.steps_per_period
+        self.steps_per_period = 1 if k <= 0 else max(1, full_steps // k)
+        self.dpi = min(self.dpi, self.DRAFT_DPI)
+        self.enable_shadows = False
+        self.enable_background_gradient = False
+        self.enable_effects = False
+        self.glow_effect = False
+        frames = 'chỉ frame đầu mỗi period' if k <= 0 else f'1/{k} frame'
+        print(f"📝 DRAFT: {frames} ({full_steps} → {self.steps_per_period} steps/period), DPI {self.dpi}, "
+              f"không hiệu ứng, encode ultrafast")
+
     # ==================== V5.1 AESTHETIC HELPER METHODS ====================
 
     def _get_font_size(self, level='heading', base_size=None):
@@ -411,7 +2337,10 @@ class TimeSeriesRacing:
                             offset=(shadow['offset'], -shadow['offset']))
             ])
         except:
-            pass  # Fallback if path effects not available
+            return  # Fallback if path effects not available
+
+        # V5.2: Stroke + fill path mỗi frame rất đắt → raster một lần, blit lại từ cache
+        self.text_cache.attach(text_obj, shadow_level)
 
     def _format_title_with_subtitle(self, ax, title, subtitle=None, period_val=None):
         """
@@ -422,6 +2351,9 @@ class TimeSeriesRacing:
             title: Main title text
             subtitle: Subtitle text (optional)
             period_val: Current period value for dynamic subtitle
+
+        Returns:
+            (title_obj, subtitle_obj) - subtitle_obj là None nếu không có subtitle
         """
         # Calculate sizes using typography hierarchy
         title_size = self._get_font_size('title', self.title_font_size)
@@ -461,6 +2393,7 @@ class TimeSeriesRacing:
             # Add shadows for depth
             self._add_text_shadow(title_obj, 'medium')
             self._add_text_shadow(subtitle_obj, 'low')
+            return title_obj, subtitle_obj
         else:
             # Just title
             title_obj = ax.text(
@@ -472,6 +2405,7 @@ class TimeSeriesRacing:
                 fontfamily=self.aesthetic.FONT_FAMILIES.get(self.font_style, 'sans-serif')
             )
             self._add_text_shadow(title_obj, 'medium')
+            return title_obj, None
 
     def _apply_aesthetic_to_axis(self, ax):
         """
@@ -496,23 +2430,31 @@ class TimeSeriesRacing:
 
     # ==================== END AESTHETIC HELPER METHODS ====================
 
-    def read_data(self):
-        """Đọc dữ liệu từ file CSV, Excel, hoặc JSON"""
-        file_ext = Path(self.input_file).suffix.lower()
+    COLUMNAR_FORMATS = {'.parquet': 'parquet', '.pq': 'parquet', '.feather': 'feather',
+                        '.arrow': 'ipc', '.ipc': 'ipc'}
 
+    def read_data(self):
+        """
+        Đọc dữ liệu từ file CSV, Excel, JSON, Parquet, Feather hoặc Arrow IPC (một file, thư mục
+        hoặc glob), hoặc từ nguồn SQL (URI kết nối + --table / --query)
+        """
         print(f"📂 Đang đọc file: {self.input_file}")
 
         try:
-            if file_ext == '.csv':
-                self.df = pd.read_csv(self.input_file)
-            elif file_ext in ['.xlsx', '.xls']:
-                self.df = pd.read_excel(self.input_file)
-            elif file_ext == '.json':
-                self.df = pd.read_json(self.input_file)
+            load_start = time.perf_counter()
+            if self._is_sql_source():
+                self.df = self._read_sql()
             else:
-                raise ValueError(f"Định dạng file không được hỗ trợ: {file_ext}")
+                files = self._input_files()
+                if len(files) == 1:
+                    self.df = self._read_file(files[0])
+                else:
+                    self.df = self._read_many(files)
 
-            print(f"✅ Đọc thành công {len(self.df)} dòng dữ liệu")
+            load_time = time.perf_counter() - load_start
+            peak_rss = _peak_rss_mb()
+            rss_info = f", peak RSS {peak_rss:,.0f} MB" if peak_rss is not None else ""
+            print(f"✅ Đọc thành công {len(self.df)} dòng dữ liệu ({load_time:.2f}s{rss_info})")
             print(f"📊 Cột dữ liệu: {list(self.df.columns)}")
             return True
 
@@ -520,6 +2462,702 @@ class TimeSeriesRacing:
             print(f"❌ Lỗi khi đọc file: {str(e)}")
             return False
 
+    SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.xls', '.json') + tuple(COLUMNAR_FORMATS)
+
+    def _input_files(self):
+        """
+        V5.2 - Danh sách file đầu vào: một file, mọi file hỗ trợ trong thư mục, hoặc glob
+
+        Returns:
+            list Path đã sắp xếp theo tên (shard theo tháng/vùng ghép theo thứ tự tên file)
+        """
+        path = Path(self.input_file)
+        if path.is_dir():
+            files = sorted(p for p in path.iterdir()
+                           if p.is_file() and p.suffix.lower() in self.SUPPORTED_EXTENSIONS)
+        elif any(ch in str(self.input_file) for ch in '*?['):
+            files = sorted(Path(p) for p in glob.glob(str(self.input_file)) if os.path.isfile(p))
+        else:
+            return [path]
+        if not files:
+            raise ValueError(f"Không tìm thấy file dữ liệu nào khớp: {self.input_file}")
+        return files
+
+    def _read_file(self, path, columns=None, verbose=True, csv_plan=None):
+        """
+        Đọc một file theo phần mở rộng
+
+        Args:
+            path: Đường dẫn file
+            columns: Chỉ đọc các cột này (shard sau của input nhiều file), None = tự chọn
+            verbose: In chi tiết cột / engine đã chọn
+            csv_plan: _csv_plan của shard đầu, dùng lại cho shard CSV (không lấy mẫu lại)
+        """
+        file_ext = Path(path).suffix.lower()
+        if file_ext == '.csv':
+            if csv_plan is not None and columns is not None:
+                csv_plan = dict(csv_plan, columns=columns)
+            elif columns is not None:
+                csv_plan = dict(self._csv_plan(path), columns=columns)
+            return self._read_csv(path, csv_plan, verbose)
+        if file_ext in self.COLUMNAR_FORMATS:
+            return self._read_columnar(self.COLUMNAR_FORMATS[file_ext], path, columns, verbose)
+        if file_ext in ['.xlsx', '.xls']:
+            return self._read_excel(path, columns, verbose)
+        if file_ext == '.json':
+            df = pd.read_json(path)
+        else:
+            raise ValueError(f"Định dạng file không được hỗ trợ: {file_ext}")
+        return df if columns is None else df[columns]
+
+    @classmethod
+    def _file_columns(cls, path):
+        """V5.2 - Tên cột của file chỉ từ header / schema (None nếu phải đọc cả file: Excel, JSON)"""
+        file_ext = Path(path).suffix.lower()
+        if file_ext == '.csv':
+            with open(path, newline='', encoding='utf-8', errors='replace') as f:
+                return next(csv.reader(f), [])
+        if cls.COLUMNAR_FORMATS.get(file_ext) == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.read_schema(path, memory_map=True).names
+        if file_ext in cls.COLUMNAR_FORMATS:
+            import pyarrow as pa
+            source = pa.memory_map(str(path))
+            try:
+                return pa.ipc.open_file(source).schema.names
+            except pa.ArrowInvalid:
+                return pa.ipc.open_stream(source).schema.names
+        return None
+
+    def _read_many(self, files):
+        """
+        V5.2 - Đọc nhiều shard (mỗi tháng / vùng một file) song song rồi ghép một lần
+
+        Schema (tập tên cột) được kiểm tra từ header trước khi đọc dữ liệu. Shard đầu chọn
+        cột / kiểu như input một file (mẫu CSV chỉ lấy một lần); các shard còn lại đọc đúng
+        các cột đó trong thread pool
+        (parser CSV / pyarrow nhả GIL khi parse, DataFrame không phải pickle qua process),
+        rồi ghép bằng một lần pd.concat.
+
+        Args:
+            files: list Path
+
+        Returns:
+            DataFrame ghép theo thứ tự file
+        """
+        reference = self._file_columns(files[0])
+        for path in files[1:]:
+            names = self._file_columns(path) if reference is not None else None
+            if names is not None and set(names) != set(reference):
+                missing = [c for c in reference if c not in names]
+                extra = [c for c in names if c not in reference]
+                raise ValueError(f"Schema không khớp: {path.name} thiếu {missing}, thừa {extra} "
+                                 f"(so với {files[0].name})")
+
+        n_workers = self.load_workers or min(32, (os.cpu_count() or 1) + 4)
+        n_workers = max(1, min(n_workers, len(files) - 1))
+        print(f"  → {len(files)} file, đọc song song {n_workers} thread")
+
+        # Shard CSV dùng chung cột / dtype / engine chọn từ mẫu của shard đầu. Thực thể đọc dạng
+        # chuỗi: mỗi shard nhỏ có gần bằng số dòng category, dựng + ghép category tốn hơn một
+        # lần factorize khi pivot sau khi ghép
+        csv_plan = None
+        if files[0].suffix.lower() == '.csv':
+            csv_plan = self._csv_plan(files[0])
+            csv_plan['dtype'] = {c: t for c, t in csv_plan['dtype'].items() if t != 'category'}
+
+        def load(path, columns=None, verbose=False):
+            start = time.perf_counter()
+            try:
+                df = self._read_file(path, columns, verbose, csv_plan)
+            except KeyError as e:
+                raise ValueError(f"Schema không khớp: {path.name} thiếu cột {e} (so với {files[0].name})")
+            except Exception as e:
+                raise ValueError(f"{path.name}: {e}") from e
+            return df, time.perf_counter() - start
+
+        first, first_time = load(files[0], verbose=True)
+        columns = list(first.columns)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            results = [(first, first_time)] + list(executor.map(lambda p: load(p, columns), files[1:]))
+        frames = [df for df, _ in results]
+        timings = np.array([elapsed for _, elapsed in results])
+
+        concat_start = time.perf_counter()
+        df = pd.concat(frames, ignore_index=True, copy=False)
+        concat_time = time.perf_counter() - concat_start
+
+        rows = [len(frame) for frame in frames]
+        if len(files) <= 20:
+            for path, n_rows, elapsed in zip(files, rows, timings):
+                print(f"    📄 {path.name}: {n_rows:,} dòng ({elapsed:.2f}s)")
+        else:
+            for i in np.argsort(-timings)[:5]:
+                print(f"    📄 {files[i].name}: {rows[i]:,} dòng ({timings[i]:.2f}s)")
+            print(f"    ... chậm nhất 5/{len(files)} file")
+        print(f"  → Mỗi file: trung vị {np.median(timings):.3f}s, lớn nhất {timings.max():.3f}s, "
+              f"tổng {timings.sum():.2f}s; ghép {concat_time:.2f}s")
+        return df
+
+    CSV_SAMPLE_ROWS = 1000
+    CSV_SAMPLE_CELLS = 100_000
+
+    def _csv_plan(self, path):
+        """
+        V5.2 - Pha 1 của đọc CSV: mẫu đầu file → cột cần đọc, dtype và engine
+
+        Đọc tối đa CSV_SAMPLE_ROWS dòng đầu để biết cột số / chuỗi và chọn cột như
+        _projected_columns (cùng quy tắc detect_format). Long format khai báo kiểu sẵn:
+        cột giá trị float64, cột thực thể dạng category (mã số nguyên thay vì hàng triệu
+        object chuỗi), engine pyarrow nếu có (parse chuỗi nhanh ~2x engine C). Wide (nhiều
+        cột số) dùng engine C - bỏ các cột chữ, nhanh hơn pyarrow với bảng rộng.
+
+        Args:
+            path: Đường dẫn file CSV
+
+        Returns:
+            dict columns (None = mọi cột), dtype, engine, sample_rows, n_names
+        """
+        # Mẫu giới hạn theo số ô: bảng wide hàng nghìn cột đọc ít dòng mẫu hơn
+        n_columns = len(self._file_columns(path))
+        sample_rows = min(self.CSV_SAMPLE_ROWS, max(100, self.CSV_SAMPLE_CELLS // max(n_columns, 1)))
+        sample = pd.read_csv(path, nrows=sample_rows)
+        names = list(sample.columns)
+        numeric = sample.select_dtypes(include=['number']).columns.tolist()
+        text = sample.select_dtypes(include=['object']).columns.tolist()
+        time_col = self._guess_time_col(names)
+        others = [c for c in names if c != time_col]
+        columns, wide = self._sample_projection(sample)
+        selected = columns if columns is not None else names
+
+        # Wide: engine C tự suy kiểu số ngay khi tokenize, dtype map hàng nghìn cột còn chậm hơn
+        dtype = {}
+        engine = 'c'
+        if not wide:
+            dtype = {c: 'float64' for c in selected if c in numeric and c != time_col}
+            entity_col = self.entity_col if self.entity_col in others else next((c for c in others if c in text), None)
+            if entity_col in text:
+                dtype[entity_col] = 'category'
+            try:
+                import pyarrow  # noqa: F401 - engine='pyarrow' của pandas cần pyarrow
+                engine = 'pyarrow'
+            except ImportError:
+                pass
+        return {'columns': columns, 'dtype': dtype, 'engine': engine,
+                'sample_rows': len(sample), 'n_names': len(names)}
+
+    def _sample_projection(self, sample):
+        """
+        V5.2 - Các cột cần đọc suy ra từ mẫu đầu file (CSV / Excel)
+
+        Args:
+            sample: DataFrame các dòng đầu file (pandas tự suy kiểu)
+
+        Returns:
+            (columns, wide): list cột cần đọc (None = mọi cột), True nếu detect_format sẽ thấy wide
+        """
+        names = list(sample.columns)
+        numeric = sample.select_dtypes(include=['number']).columns.tolist()
+        text = sample.select_dtypes(include=['object']).columns.tolist()
+        time_col = self._guess_time_col(names)
+        # Cùng điều kiện với detect_format
+        wide = not (len(names) == 3 or (self.entity_col and self.value_col)) and len(numeric) > 2
+
+        columns = self._projected_columns(names, numeric, text)
+        if columns is not None and wide:
+            # Cột chữ có lẫn số trong mẫu vẫn thành giá trị khi chuẩn hóa (to_numeric) → đọc cả
+            mixed = [c for c in text if c != time_col and pd.to_numeric(sample[c], errors='coerce').notna().any()]
+            columns = [c for c in names if c in columns or c in mixed]
+        return columns, wide
+
+    def _read_csv(self, path, plan=None, verbose=True):
+        """
+        V5.2 - Đọc CSV hai pha: mẫu đầu file (_csv_plan), rồi đọc toàn bộ với usecols + dtype
+
+        Mẫu không đại diện (vd cột số có chữ ở cuối file) → đọc lại không khai báo kiểu.
+
+        Args:
+            path: Đường dẫn file CSV
+            plan: Kết quả _csv_plan dùng lại cho mọi shard của input nhiều file (None = tự lập)
+            verbose: In cột / engine đã chọn
+
+        Returns:
+            DataFrame chỉ gồm các cột cần thiết
+        """
+        if plan is None:
+            plan = self._csv_plan(path)
+        columns, dtype, engine = plan['columns'], plan['dtype'], plan['engine']
+
+        try:
+            df = pd.read_csv(path, usecols=columns, dtype=dtype, engine=engine)
+        except (ValueError, TypeError) as e:
+            print(f"  ⚠️  {Path(path).name}: mẫu {plan['sample_rows']} dòng đầu không đại diện ({e}) "
+                  f"- đọc lại không khai báo kiểu")
+            df = pd.read_csv(path, usecols=columns)
+            engine = 'c'
+        if columns is not None and list(df.columns) != columns:
+            df = df[columns]  # Engine pyarrow trả cột theo thứ tự usecols → giữ thứ tự trong file / shard đầu
+        if not verbose:
+            return df
+        if columns is not None:
+            print(f"  → Chỉ đọc {len(columns)}/{plan['n_names']} cột: {columns[:8]}{'...' if len(columns) > 8 else ''}")
+        categories = [c for c, t in dtype.items() if t == 'category']
+        print(f"  → Mẫu {plan['sample_rows']} dòng đầu → engine {engine}"
+              f"{f', {categories[0]} dạng category' if categories else ''}")
+        return df
+
+    def _read_excel(self, path, columns=None, verbose=True):
+        """
+        V5.2 - Đọc Excel: chọn sheet (--sheet), parse streaming read-only, spill ra cache dạng cột
+
+        Lần đầu: openpyxl read-only (values_only - không dựng đối tượng Cell), các dòng đầu
+        làm mẫu để chọn cột như CSV, sau đó chỉ giữ giá trị các cột cần. Kết quả được spill
+        ra file Feather trong thư mục cache (key = hash nội dung workbook + sheet + cột), nên
+        các lần render sau - kể cả khi đổi --percent / --agg / --resample - bỏ qua hoàn toàn
+        bước parse Excel. .xls (định dạng cũ) đọc bằng pandas/xlrd, vẫn được spill.
+
+        Args:
+            path: Đường dẫn workbook
+            columns: Đọc đúng các cột này thay vì tự chọn (shard sau của input nhiều file)
+            verbose: In sheet / cột / spill
+
+        Returns:
+            DataFrame chỉ gồm các cột cần thiết
+        """
+        start = time.perf_counter()
+        spill_key = None
+        if self.use_cache:
+            try:
+                spill_key = self.dataset_cache.spill_key(
+                    path, (str(self.sheet), columns, self.time_col, self.entity_col, self.value_col))
+                df = self.dataset_cache.load_spill(spill_key)
+            except OSError as e:
+                print(f"⚠️  Không dùng được cache Excel: {e}")
+                spill_key, df = None, None
+            if df is not None:
+                if verbose:
+                    print(f"  → Excel đã spill: đọc bản dạng cột từ cache ({time.perf_counter() - start:.2f}s), "
+                          f"bỏ qua parse workbook")
+                return df
+
+        if Path(path).suffix.lower() == '.xls':
+            # Định dạng nhị phân cũ: openpyxl không đọc được, xlrd không có chế độ streaming
+            sheet_name = int(self.sheet) if str(self.sheet).isdigit() else self.sheet
+            df = pd.read_excel(path, sheet_name=sheet_name)
+            if columns is not None:
+                df = df[columns]
+            n_names = len(df.columns)
+        else:
+            df, sheet_name, n_names = self._stream_excel(path, columns)
+
+        if verbose:
+            selected = f"{len(df.columns)}/{n_names} cột" if len(df.columns) != n_names else "mọi cột"
+            print(f"  → Sheet '{sheet_name}': streaming read-only, {selected} "
+                  f"({time.perf_counter() - start:.2f}s)")
+        if spill_key:
+            try:
+                size = self.dataset_cache.store_spill(spill_key, df)
+                if verbose:
+                    print(f"  💾 Spill sang cache dạng cột ({size / 1024:,.0f} KB) - lần sau bỏ qua parse Excel")
+            except Exception as e:
+                print(f"⚠️  Không spill được Excel: {e}")
+        return df
+
+    def _excel_sheet(self, workbook):
+        """V5.2 - Worksheet theo --sheet: tên, hoặc chỉ số (số nguyên / chuỗi số, 0 = sheet đầu)"""
+        sheet = self.sheet
+        if isinstance(sheet, str) and sheet.isdigit() and sheet not in workbook.sheetnames:
+            sheet = int(sheet)
+        if isinstance(sheet, int):
+            if not 0 <= sheet < len(workbook.worksheets):
+                raise ValueError(f"Không có sheet thứ {sheet} - workbook có {len(workbook.worksheets)} sheet: "
+                                 f"{workbook.sheetnames}")
+            return workbook.worksheets[sheet]
+        if sheet not in workbook.sheetnames:
+            raise ValueError(f"Không có sheet '{sheet}' - các sheet: {workbook.sheetnames}")
+        return workbook[sheet]
+
+    def _stream_excel(self, path, columns=None):
+        """
+        V5.2 - Parse một sheet .xlsx bằng openpyxl read-only, chỉ giữ các cột cần
+
+        Returns:
+            (DataFrame, tên sheet, số cột của sheet)
+        """
+        try:
+            import openpyxl
+        except ImportError:
+            raise ValueError("Đọc Excel cần openpyxl: pip install openpyxl")
+
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            sheet = self._excel_sheet(workbook)
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                raise ValueError(f"Sheet '{sheet.title}' trống")
+            # Header trống → tên như pandas.read_excel
+            names = [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)]
+            width = len(names)
+
+            def blank(row):
+                return all(value is None for value in row)
+
+            # Mẫu các dòng đầu (cùng quy tắc chọn cột với CSV), phần còn lại đọc tiếp từ cùng stream
+            sample = []
+            for row in rows:
+                if not blank(row):
+                    sample.append(row[:width] + (None,) * (width - len(row)))
+                    if len(sample) >= self.CSV_SAMPLE_ROWS:
+                        break
+            if columns is None:
+                columns, _ = self._sample_projection(pd.DataFrame.from_records(sample, columns=names))
+            if columns is None:
+                columns = names
+            missing = [c for c in columns if c not in names]
+            if missing:
+                raise KeyError(missing)
+
+            # Chỉ giữ giá trị các cột cần (XML vẫn phải parse hết, nhưng không dựng cột thừa)
+            positions = [names.index(c) for c in columns]
+            pick = (lambda row: (row[positions[0]],)) if len(positions) == 1 else itemgetter(*positions)
+            empty = (None,) * len(positions)
+            data = [pick(row) for row in sample]
+            for row in rows:
+                if len(row) < width:
+                    row = row + (None,) * (width - len(row))
+                values = pick(row)
+                if values != empty:
+                    data.append(values)
+            title = sheet.title
+        finally:
+            workbook.close()
+
+        return pd.DataFrame.from_records(data, columns=columns), title, width
+
+    def _read_columnar(self, kind, path, columns=None, verbose=True):
+        """
+        V5.2 - Đọc Parquet / Feather / Arrow IPC bằng pyarrow
+
+        Schema được đọc trước (không tốn I/O dữ liệu) để chỉ lấy các cột thời gian /
+        thực thể / giá trị mà detect_format sẽ dùng. File được memory-map: Feather/IPC
+        không nén đọc zero-copy, Parquet giải nén trực tiếp từ vùng map.
+
+        Args:
+            kind: 'parquet', 'feather' hoặc 'ipc'
+            path: Đường dẫn file
+            columns: Đọc đúng các cột này thay vì tự chọn (shard sau của input nhiều file)
+            verbose: In các cột đã chọn
+
+        Returns:
+            DataFrame chỉ gồm các cột cần thiết
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Đọc Parquet/Feather/Arrow cần pyarrow: pip install pyarrow")
+
+        if kind == 'parquet':
+            schema = pq.read_schema(path, memory_map=True)
+        else:
+            source = pa.memory_map(str(path))
+            try:
+                reader = pa.ipc.open_file(source)
+            except pa.ArrowInvalid:
+                reader = pa.ipc.open_stream(source)  # Arrow IPC dạng stream (.arrow từ pipe)
+            schema = reader.schema
+
+        def is_text(field_type):
+            if pa.types.is_dictionary(field_type):
+                field_type = field_type.value_type
+            return pa.types.is_string(field_type) or pa.types.is_large_string(field_type)
+
+        if columns is None:
+            columns = self._projected_columns(
+                schema.names,
+                numeric=[f.name for f in schema if pa.types.is_integer(f.type) or pa.types.is_floating(f.type)
+                         or pa.types.is_decimal(f.type)],
+                text=[f.name for f in schema if is_text(f.type)])
+
+        if kind == 'parquet':
+            table = pq.read_table(path, columns=columns, memory_map=True)
+        elif kind == 'feather':
+            table = feather.read_table(path, columns=columns, memory_map=True)
+        else:
+            table = reader.read_all()
+            if columns is not None:
+                table = table.select(columns)  # Zero-copy: chỉ giữ tham chiếu các cột cần
+
+        # Cột dictionary (categorical) → chuỗi thường, để pivot/detect_format xử lý như CSV
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+
+        if columns is not None and verbose:
+            print(f"  → Chỉ đọc {len(columns)}/{len(schema.names)} cột: {columns} (memory-map)")
+        return table.to_pandas(split_blocks=True)
+
+    SQL_CHUNK_ROWS = 100_000
+    TOTAL_COLUMN = '__period_total__'  # Cột ẩn: tổng cả hàng từ SQL khi chỉ lấy ứng viên top-N
+
+    def _is_sql_source(self):
+        """V5.2 - Input là URI kết nối SQL (sqlite:///data.db, postgresql://...) thay vì file"""
+        scheme, sep, _ = str(self.input_file).partition('://')
+        return bool(sep) and scheme.replace('+', '').isalnum()
+
+    def _sql_connect(self):
+        """
+        V5.2 - Mở kết nối DB-API cho input SQL
+
+        sqlite:///path.db dùng sqlite3 của thư viện chuẩn (mở read-only); URI khác
+        (postgresql://, mysql+pymysql://, ...) cần SQLAlchemy và driver tương ứng.
+
+        Returns:
+            (connection, quote, windows) - quote(tên) trích dẫn identifier theo dialect,
+            windows = DB hỗ trợ window function (RANK() OVER) để lọc ứng viên top-N
+        """
+        uri = str(self.input_file)
+        if uri.startswith('sqlite://'):
+            # Như SQLAlchemy: sqlite:///rel.db (tương đối), sqlite:////abs/path.db (tuyệt đối)
+            path = uri[len('sqlite:///'):] if uri.startswith('sqlite:///') else ''
+            if not path or not os.path.isfile(path):
+                raise ValueError(f"Không tìm thấy database SQLite: {path or uri}")
+            connection = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+            return (connection, lambda name: '"' + str(name).replace('"', '""') + '"',
+                    sqlite3.sqlite_version_info >= (3, 25, 0))
+        try:
+            import sqlalchemy
+        except ImportError:
+            raise ValueError("Nguồn SQL ngoài SQLite cần SQLAlchemy + driver DB: pip install sqlalchemy")
+        engine = sqlalchemy.create_engine(uri)
+        return engine.raw_connection(), engine.dialect.identifier_preparer.quote, True
+
+    def _sql_candidate_limit(self):
+        """
+        V5.2 - Số hạng ứng viên top-N lọc ngay trong SQL (None = phải lấy mọi thực thể)
+
+        Thực thể có hạng ≤ top N + margin ở một period nào đó chứa đúng các thực thể
+        prune_entities sẽ giữ khi prune chạy trên chính các period đó. Không áp dụng khi
+        --percent (chia cho tổng cả hàng), nội suy (frame nằm giữa hai period), resample
+        sum/mean (hạng trên tổng của bucket), --float32 (làm tròn có thể đổi thứ tự hai giá
+        trị sát nhau) hoặc --agg last (không gộp trong SQL).
+        """
+        interpolated = self.interpolate_period and self.steps_per_period > 1
+        if (not self.prune or self.use_percent or interpolated or self.use_float32 or self.agg == 'last'
+                or (self.resample and self.resample_agg != 'last')):
+            return None
+        return self.top_n + max(self.prune_margin, 0)
+
+    def _read_sql(self):
+        """
+        V5.2 - Đọc nguồn SQL (URI + --table hoặc --query) với pushdown vào câu truy vấn
+
+        Mẫu CSV_SAMPLE_ROWS dòng đầu chọn cột như file (_sample_projection). Long format:
+        lọc (--where), gộp (thời gian, thực thể) theo --agg bằng GROUP BY và lọc ứng viên
+        top-N bằng RANK() OVER đều chạy trong DB; kết quả được fetchmany từng khối
+        --sql-chunk-rows dòng và rải thẳng vào ma trận pivot (chỉ giữ mã số nguyên + giá trị
+        của từng khối, không dựng DataFrame long). Khi lọc ứng viên, tổng cả hàng và danh sách
+        mọi thực thể khác 0 cũng lấy từ DB để stats panel và màu giống hệt khi đọc đủ.
+
+        Returns:
+            DataFrame wide (cột đầu là thời gian) cho long format, hoặc DataFrame thô cho wide
+        """
+        if bool(self.table) == bool(self.query):
+            raise ValueError("Nguồn SQL cần đúng một trong --table hoặc --query")
+
+        connection, quote, windows = self._sql_connect()
+        try:
+            source = f"SELECT * FROM {quote(self.table)}" if self.table else self.query.strip().rstrip(';')
+            if self.where:
+                source = f"SELECT * FROM ({source}) AS filtered WHERE {self.where}"
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT * FROM ({source}) AS src LIMIT {self.CSV_SAMPLE_ROWS}")
+            names = [d[0] for d in cursor.description]
+            sample = pd.DataFrame(cursor.fetchall(), columns=names)
+            columns, wide = self._sample_projection(sample)
+            columns = columns or names
+
+            if wide:
+                # Wide: chỉ chiếu các cột cần, ghép các khối (detect_format/normalize như file)
+                cursor.execute(f"SELECT {', '.join(quote(c) for c in columns)} FROM ({source}) AS src")
+                chunks = []
+                while True:
+                    rows = cursor.fetchmany(self.sql_chunk_rows)
+                    if not rows:
+                        break
+                    chunks.append(pd.DataFrame(rows, columns=columns))
+                if not chunks:
+                    raise ValueError("Truy vấn SQL không trả về dòng nào")
+                print(f"  → SQL wide: {len(columns)}/{len(names)} cột, {len(chunks)} khối")
+                return pd.concat(chunks, ignore_index=True)
+
+            if len(columns) < 3:
+                raise ValueError(f"Nguồn SQL cần cột thời gian, thực thể, giá trị: {names}")
+            if self.time_col and self.entity_col and self.value_col:
+                time_col, entity_col, value_col = self.time_col, self.entity_col, self.value_col
+            else:
+                # Cùng quy tắc với normalize_data: thực thể là cột chữ đầu tiên, còn lại là giá trị
+                time_col = self._guess_time_col(columns)
+                others = [c for c in columns if c != time_col]
+                text = sample[others].select_dtypes(include=['object']).columns.tolist()
+                entity_col = text[0] if text else others[0]
+                value_col = [c for c in others if c != entity_col][0]
+
+            t, e, v = quote(time_col), quote(entity_col), quote(value_col)
+            present = f"FROM ({source}) AS src WHERE {t} IS NOT NULL AND {e} IS NOT NULL"
+            k = self._sql_candidate_limit() if windows else None
+            if self.agg == 'last':
+                # Dòng sau cùng theo thứ tự nguồn trả về (--query ... ORDER BY để cố định)
+                query = f"SELECT {t}, {e}, {v} {present}"
+                pushdown = "lọc"
+            else:
+                cells = f"SELECT {t} AS t, {e} AS e, {'SUM' if self.agg == 'sum' else 'AVG'}({v}) AS v {present} GROUP BY {t}, {e}"
+                query = cells
+                pushdown = f"lọc + GROUP BY ({self.agg})"
+                if k is not None:
+                    query = (f"WITH cells AS ({cells}), ranked AS (SELECT t, e, v, "
+                             f"RANK() OVER (PARTITION BY t ORDER BY COALESCE(ABS(v), 0) DESC) AS rk, "
+                             f"SUM(ABS(v)) OVER (PARTITION BY t) AS total FROM cells) "
+                             f"SELECT t, e, v, total FROM ranked WHERE e IN (SELECT e FROM ranked WHERE rk <= {k}) "
+                             # Thực thể khác 0 ngoài ứng viên: chỉ tên (thời gian NULL), cùng một lượt
+                             f"UNION ALL SELECT NULL, e, NULL, NULL FROM ranked "
+                             f"GROUP BY e HAVING MIN(rk) > {k} AND SUM(ABS(v)) > 0")
+                    pushdown += f" + ứng viên top {k}"
+            print(f"  → SQL long: {time_col} × {entity_col} × {value_col} - pushdown: {pushdown}")
+
+            start = time.perf_counter()
+            cursor.execute(query)
+            df, n_rows, n_chunks, n_duplicates = self._stream_pivot(cursor, time_col, entity_col,
+                                                                    with_totals=k is not None)
+            print(f"  → Stream {n_rows:,} dòng ({n_chunks} khối) vào pivot trong {time.perf_counter() - start:.2f}s")
+            if n_duplicates:
+                print(f"  ⚠️  {n_duplicates:,} dòng trùng (thời gian, thực thể) - đã gộp bằng {self.agg}")
+            if k is not None:
+                print(f"  → {len(df.columns) - 2:,}/{len(df.attrs['source_entities']):,} thực thể là ứng viên top {k}")
+        finally:
+            connection.close()
+
+        self.source_format = 'wide'  # Đã pivot sẵn, detect_format không đoán lại
+        return df
+
+    def _stream_pivot(self, cursor, time_col, entity_col, with_totals=False):
+        """
+        V5.2 - fetchmany từng khối dòng (thời gian, thực thể, giá trị[, tổng period]) → ma trận wide
+
+        Mỗi khối chỉ được factorize rồi ánh xạ nhãn sang mã toàn cục (dict trên các nhãn
+        khác nhau của khối, không lặp theo dòng); chỉ mã int64 + giá trị float64 được giữ lại.
+        Cuối cùng nhãn được sắp xếp như pd.factorize(sort=True) và rải bằng _scatter_pivot.
+
+        Với with_totals, dòng có thời gian NULL chỉ mang tên một thực thể khác 0 không phải
+        ứng viên; cùng các cột ứng viên khác 0, chúng thành df.attrs['source_entities'].
+
+        Returns:
+            (df, n_rows, n_chunks, n_duplicates) - df có cột đầu là thời gian, thêm
+            TOTAL_COLUMN ở cuối nếu with_totals
+        """
+        ids = ({}, {})
+        codes, values, totals, others = ([], []), [], [], []
+        n_rows = n_chunks = 0
+        while True:
+            rows = cursor.fetchmany(self.sql_chunk_rows)
+            if not rows:
+                break
+            n_rows += len(rows)
+            n_chunks += 1
+            fields = [np.asarray(field, dtype=object) for field in zip(*rows)]
+            if with_totals:
+                names_only = pd.isna(fields[0])
+                if names_only.any():
+                    others.extend(fields[1][names_only])
+                    fields = [field[~names_only] for field in fields]
+            for mapping, parts, column in zip(ids, codes, fields[:2]):
+                chunk_codes, uniques = pd.factorize(column)
+                lookup = np.array([mapping.setdefault(u, len(mapping)) for u in uniques] + [-1], dtype=np.int64)
+                parts.append(lookup[chunk_codes])  # -1 (thiếu) → phần tử cuối = -1
+            values.append(pd.to_numeric(pd.Series(fields[2], dtype=object), errors='coerce').to_numpy(dtype=np.float64))
+            if with_totals:
+                totals.append(pd.to_numeric(pd.Series(fields[3], dtype=object), errors='coerce').to_numpy(dtype=np.float64))
+        if not n_rows:
+            raise ValueError("Truy vấn SQL không trả về dòng nào")
+
+        labels = []
+        for mapping, parts in zip(ids, codes):
+            uniques = pd.Index(list(mapping))
+            try:
+                order = uniques.argsort()
+            except TypeError:
+                order = np.arange(len(uniques))  # Kiểu lẫn lộn: giữ thứ tự xuất hiện
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            labels.append(uniques[order])
+            merged = np.concatenate(parts)
+            parts[:] = [np.where(merged >= 0, rank[merged], -1)]
+        time_codes, entity_codes = codes[0][0], codes[1][0]
+        periods, entities = labels
+
+        matrix, n_duplicates = self._scatter_pivot(time_codes, entity_codes, np.concatenate(values),
+                                                   len(periods), len(entities), self.agg)
+        df = pd.DataFrame(matrix, columns=pd.Index(entities, name=entity_col), copy=False)
+        if with_totals:
+            period_totals = np.full(len(periods), np.nan)
+            period_totals[time_codes] = np.concatenate(totals)  # Mọi dòng của một period cùng tổng
+            df[self.TOTAL_COLUMN] = period_totals
+            nonzero = (np.isfinite(matrix) & (matrix != 0)).any(axis=0)
+            source_entities = pd.Index(list(entities[nonzero]) + others)
+            try:
+                source_entities = source_entities.sort_values()  # Thứ tự cột như pivot đầy đủ → màu giữ nguyên
+            except TypeError:
+                pass
+            df.attrs['source_entities'] = source_entities
+        df.insert(0, time_col, periods)
+        return df, n_rows, n_chunks, n_duplicates
+
+    def _guess_time_col(self, columns):
+        """V5.2 - Cột thời gian theo cùng quy tắc với detect_format (--time, rồi theo tên cột)"""
+        if self.time_col and self.time_col in columns:
+            return self.time_col
+        time_candidates = [c for c in columns
+                           if any(keyword in str(c).lower() for keyword in
+                                  ['year', 'date', 'time', 'period', 'month', 'day', 'năm', 'ngày', 'tháng'])]
+        return time_candidates[0] if time_candidates else columns[0]
+
+    def _projected_columns(self, columns, numeric, text):
+        """
+        V5.2 - Các cột detect_format/normalize_data sẽ dùng, suy ra từ schema
+
+        Cùng quy tắc với detect_format: cột thời gian theo tên (hoặc --time), long format
+        cần (thời gian, thực thể, giá trị), wide format cần thời gian + các cột số.
+
+        Args:
+            columns: Tên mọi cột theo thứ tự trong file
+            numeric: Các cột kiểu số
+            text: Các cột kiểu chuỗi
+
+        Returns:
+            list tên cột cần đọc, hoặc None nếu cần đọc tất cả
+        """
+        if len(columns) <= 3:
+            return None
+
+        time_col = self._guess_time_col(columns)
+        others = [c for c in columns if c != time_col]
+
+        if self.entity_col and self.value_col:
+            needed = [time_col, self.entity_col, self.value_col]
+            return needed if all(c in columns for c in needed) else None
+
+        if len(numeric) > 2:
+            # Wide: cột không phải số sẽ thành 0 và bị loại khi chuẩn hóa → bỏ qua luôn
+            needed = [time_col] + [c for c in others if c in numeric]
+            # Đúng 3 cột sẽ bị detect_format hiểu nhầm là long → đọc đủ
+            return needed if len(needed) != 3 else None
+
+        entity_col = next((c for c in others if c in text), others[0])
+        value_col = [c for c in others if c != entity_col][0]
+        return [time_col, entity_col, value_col]
+
     def detect_format(self):
         """
         Tự động nhận dạng cấu trúc dữ liệu (long format hoặc wide format)
@@ -529,6 +3167,13 @@ class TimeSeriesRacing:
         """
         print("\n🔍 Đang nhận dạng cấu trúc dữ liệu...")
 
+        if self.source_format:
+            # V5.2 - Nguồn SQL đã pivot khi stream: cột đầu là thời gian, còn lại là thực thể
+            self.detected_time_col = self.df.columns[0]
+            print(f"  → Cột thời gian: {self.detected_time_col}")
+            print(f"  → Định dạng: WIDE (đã pivot từ nguồn SQL)")
+            return self.source_format
+
         # Tìm cột thời gian
         time_candidates = []
         for col in self.df.columns:
@@ -590,7 +3235,7 @@ class TimeSeriesRacing:
                     cols = [c for c in self.df.columns if c != time_col]
 
                     # Tìm cột entity (thường là cột text)
-                    entity_candidates = self.df[cols].select_dtypes(include=['object']).columns.tolist()
+                    entity_candidates = self.df[cols].select_dtypes(include=['object', 'category']).columns.tolist()
                     entity_col = entity_candidates[0] if entity_candidates else cols[0]
 
                     # Cột còn lại là value
@@ -598,92 +3243,76 @@ class TimeSeriesRacing:
 
                 print(f"  → Pivot: {time_col} (thời gian) × {entity_col} (thực thể) × {value_col} (giá trị)")
 
-                # Pivot table
-                self.df_wide = self.df.pivot(
-                    index=time_col,
-                    columns=entity_col,
-                    values=value_col
-                )
+                # V5.2 - Pivot bằng mã số nguyên (factorize + scatter), gộp trùng lặp theo --agg
+                self.df_wide, n_duplicates = self._pivot_long(self.df, time_col, entity_col, value_col, self.agg)
+                if n_duplicates:
+                    print(f"  ⚠️  {n_duplicates:,} dòng trùng (thời gian, thực thể) - đã gộp bằng {self.agg}")
 
             else:
                 # Wide format - đã sẵn dạng đúng
                 time_col = self.detected_time_col
                 self.df_wide = self.df.set_index(time_col)
 
-            # === UPGRADED: Comprehensive Data Validation & Cleaning ===
-
-            # 1. Điền giá trị NaN bằng 0
-            self.df_wide = self.df_wide.fillna(0)
-
-            # 2. Đảm bảo index là sorted
-            self.df_wide = self.df_wide.sort_index()
-
-            # 3. Chuyển sang numeric và xử lý lỗi
-            for col in self.df_wide.columns:
-                self.df_wide[col] = pd.to_numeric(self.df_wide[col], errors='coerce').fillna(0)
+            # === V5.2: Fused Data Validation & Cleaning ===
+            # Chuyển MỘT lần sang ma trận float liên tục, mọi bước làm sạch chạy tại chỗ
+            # trên ma trận đó (không copy cả bảng sau mỗi bước như pipeline pandas cũ)
+            values, index, columns, stats = self._fused_clean(self.df_wide)
+            self.df_wide = None  # Giải phóng bảng pivot trước khi tạo bảng mới
 
-            # 4. UPGRADED: Remove infinite values (can cause video corruption)
-            self.df_wide = self.df_wide.replace([np.inf, -np.inf], 0)
+            if stats['negative']:
+                print("  ⚠️  Phát hiện giá trị âm - đã chuyển sang giá trị tuyệt đối")
 
-            # 5. UPGRADED: Ensure all values are non-negative (for racing charts)
-            # Negative values can cause bar rendering issues
-            if (self.df_wide < 0).any().any():
-                print("  ⚠️  Phát hiện giá trị âm - đang chuyển sang giá trị tuyệt đối")
-                self.df_wide = self.df_wide.abs()
-
-            # 6. UPGRADED: Remove columns with all zeros (they don't contribute to animation)
-            zero_cols = self.df_wide.columns[(self.df_wide == 0).all()]
+            zero_cols = columns[stats['zero_columns']]
             if len(zero_cols) > 0:
                 print(f"  ⚠️  Loại bỏ {len(zero_cols)} cột có toàn giá trị 0: {list(zero_cols)[:5]}...")
-                self.df_wide = self.df_wide.drop(columns=zero_cols)
+                keep = ~stats['zero_columns']
+                values, columns = values[:, keep], columns[keep]
 
-            # 7. UPGRADED: Validate minimum data requirements
-            if self.df_wide.shape[0] < 2:
+            # Validate minimum data requirements
+            if values.shape[0] < 2:
                 raise ValueError("Cần ít nhất 2 khoảng thời gian để tạo animation")
-            if self.df_wide.shape[1] < 1:
+            if values.shape[1] < 1:
                 raise ValueError("Cần ít nhất 1 thực thể (entity) để tạo animation")
 
-            # 8. UPGRADED: Check for duplicate indices
-            if self.df_wide.index.duplicated().any():
+            # Check for duplicate indices
+            if index.duplicated().any():
                 print("  ⚠️  Phát hiện thời gian trùng lặp - đang gộp dữ liệu")
-                self.df_wide = self.df_wide.groupby(level=0).mean()
+                merged = pd.DataFrame(values, index=index, columns=columns, copy=False).groupby(level=0).mean()
+                values, index = merged.to_numpy(copy=True), merged.index
+
+            # Nếu dùng phần trăm, chuẩn hóa (with division by zero protection) - tại chỗ trên ma trận
+            # riêng, trước khi tạo DataFrame (mảng sau DataFrame là read-only khi bật Copy-on-Write)
+            if self.use_percent:
+                row_sums = values.sum(axis=1, keepdims=True)
+                row_sums[row_sums == 0] = 1  # Replace 0 with 1 to avoid div by zero
+                values /= row_sums
+                values *= 100
+                print("  → Đã chuyển sang phần trăm (%)")
 
-            # 9. UPGRADED: Ensure numeric index if possible
+            self.df_wide = pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+            # Ensure numeric index if possible
             try:
                 if self.df_wide.index.dtype == 'object':
                     # Try to convert to numeric
                     self.df_wide.index = pd.to_numeric(self.df_wide.index, errors='ignore')
             except:
                 pass  # Keep original index if conversion fails
-
-            # 10. Nếu dùng phần trăm, chuẩn hóa (with division by zero protection)
-            if self.use_percent:
-                row_sums = self.df_wide.sum(axis=1)
-                # Protect against division by zero
-                row_sums = row_sums.replace(0, 1)  # Replace 0 with 1 to avoid div by zero
-                self.df_wide = self.df_wide.div(row_sums, axis=0) * 100
-                # Clean up any resulting NaN/inf
-                self.df_wide = self.df_wide.fillna(0).replace([np.inf, -np.inf], 0)
-                print("  → Đã chuyển sang phần trăm (%)")
-
-            # 11. UPGRADED: Final validation - ensure no NaN or Inf remain
-            if self.df_wide.isnull().any().any():
-                print("  ⚠️  Vẫn còn giá trị NaN sau xử lý - đang thay thế bằng 0")
-                self.df_wide = self.df_wide.fillna(0)
-
-            if np.isinf(self.df_wide.values).any():
-                print("  ⚠️  Vẫn còn giá trị vô cực sau xử lý - đang thay thế bằng 0")
-                self.df_wide = self.df_wide.replace([np.inf, -np.inf], 0)
-
-            # 12. UPGRADED: Log data quality metrics
-            total_values = self.df_wide.size
-            zero_values = (self.df_wide == 0).sum().sum()
+            self.df_wide.attrs.update(self.df.attrs)  # V5.2: danh sách thực thể của nguồn SQL
+
+            # Log data quality metrics (một lượt đếm, không tạo bảng bool)
+            n_entities = self.df_wide.shape[1]
+            if self.TOTAL_COLUMN in self.df_wide.columns:
+                values, n_entities = values[:, :-1], n_entities - 1  # Không tính cột tổng ẩn
+            total_values = values.size
+            zero_values = total_values - np.count_nonzero(values)
             zero_pct = (zero_values / total_values) * 100 if total_values > 0 else 0
 
-            print(f"✅ Chuẩn hóa thành công: {self.df_wide.shape[0]} khoảng thời gian × {self.df_wide.shape[1]} thực thể")
+            dtype_info = " (float32)" if values.dtype == np.float32 else ""
+            print(f"✅ Chuẩn hóa thành công: {self.df_wide.shape[0]} khoảng thời gian × {n_entities} thực thể{dtype_info}")
             print(f"  → Khoảng thời gian: {self.df_wide.index[0]} → {self.df_wide.index[-1]}")
             print(f"  → Chất lượng dữ liệu: {zero_pct:.1f}% giá trị bằng 0")
-            print(f"  → Phạm vi giá trị: {self.df_wide.values.min():.2f} → {self.df_wide.values.max():.2f}")
+            print(f"  → Phạm vi giá trị: {values.min():.2f} → {values.max():.2f}")
 
             return True
 
@@ -693,6 +3322,398 @@ class TimeSeriesRacing:
             traceback.print_exc()
             return False
 
+    PIVOT_AGGS = ('sum', 'mean', 'last')
+
+    @staticmethod
+    def _pivot_long(df, time_col, entity_col, value_col, agg='sum'):
+        """
+        V5.2 - Long → wide bằng mã số nguyên thay vì DataFrame.pivot
+
+        Thời gian và thực thể được factorize (sắp xếp như pivot) thành mã số nguyên,
+        giá trị được rải thẳng vào ma trận cấp phát sẵn bằng np.bincount theo chỉ số
+        phẳng - không tạo MultiIndex / unstack. Các dòng trùng (thời gian, thực thể) được
+        gộp trong cùng lượt đó thay vì làm pivot báo lỗi.
+
+        Args:
+            df: DataFrame long format
+            time_col, entity_col, value_col: Tên cột thời gian / thực thể / giá trị
+            agg: Cách gộp dòng trùng - 'sum', 'mean' hoặc 'last' (dòng xuất hiện sau cùng)
+
+        Returns:
+            (df_wide, n_duplicates) - ô không có dữ liệu là NaN như DataFrame.pivot
+        """
+        def factorize(column):
+            try:
+                codes, uniques = pd.factorize(column, sort=True)
+                if isinstance(uniques, pd.CategoricalIndex):
+                    uniques = uniques.astype(object)  # Cột category (CSV) → nhãn thường như cột chuỗi
+                return codes, uniques
+            except TypeError:
+                return pd.factorize(column)  # Kiểu lẫn lộn không sắp xếp được
+
+        time_codes, periods = factorize(df[time_col])
+        entity_codes, entities = factorize(df[entity_col])
+        values = pd.to_numeric(df[value_col], errors='coerce').to_numpy(dtype=np.float64)
+
+        matrix, n_duplicates = TimeSeriesRacing._scatter_pivot(
+            time_codes, entity_codes, values, len(periods), len(entities), agg)
+        df_wide = pd.DataFrame(matrix, index=pd.Index(periods, name=time_col),
+                               columns=pd.Index(entities, name=entity_col), copy=False)
+        return df_wide, n_duplicates
+
+    @staticmethod
+    def _scatter_pivot(time_codes, entity_codes, values, n_periods, n_entities, agg='sum'):
+        """
+        V5.2 - Rải các dòng (mã thời gian, mã thực thể, giá trị) vào ma trận periods × entities
+
+        Args:
+            time_codes, entity_codes: Mã số nguyên của từng dòng (-1 = thiếu)
+            values: Giá trị float64 của từng dòng (NaN = thiếu)
+            n_periods, n_entities: Kích thước ma trận
+            agg: Cách gộp dòng trùng - 'sum', 'mean' hoặc 'last'
+
+        Returns:
+            (matrix, n_duplicates) - ô không có dữ liệu là NaN
+        """
+        # Bỏ dòng thiếu thời gian / thực thể / giá trị (ô đó vẫn là NaN nếu không còn dòng nào)
+        valid = (time_codes >= 0) & (entity_codes >= 0) & ~np.isnan(values)
+        if not valid.all():
+            time_codes, entity_codes, values = time_codes[valid], entity_codes[valid], values[valid]
+
+        size = n_periods * n_entities
+        flat = time_codes.astype(np.int64) * n_entities + entity_codes
+
+        counts = np.bincount(flat, minlength=size)
+        if agg == 'last':
+            # Chỉ số dòng lớn nhất của mỗi ô → giá trị xuất hiện sau cùng
+            last = np.full(size, -1, dtype=np.int64)
+            np.maximum.at(last, flat, np.arange(len(flat), dtype=np.int64))
+            matrix = np.full(size, np.nan)
+            filled = last >= 0
+            matrix[filled] = values[last[filled]]
+        else:
+            matrix = np.bincount(flat, weights=values, minlength=size)
+            if agg == 'mean':
+                np.divide(matrix, counts, out=matrix, where=counts > 1)
+            matrix[counts == 0] = np.nan
+
+        n_duplicates = int(len(flat) - np.count_nonzero(counts))
+        return matrix.reshape(n_periods, n_entities), n_duplicates
+
+    def _fused_clean(self, df_wide):
+        """
+        V5.2 - Kernel chuẩn hóa một lượt trên ma trận float liên tục
+
+        Chuyển kiểu trong một lần copy (sắp xếp theo thời gian nếu cần), sau đó tại chỗ:
+        NaN/±inf/chuỗi không hợp lệ → 0, giá trị âm → trị tuyệt đối, đánh dấu cột toàn 0.
+
+        Args:
+            df_wide: DataFrame wide (index thời gian, mỗi cột một thực thể)
+
+        Returns:
+            (values, index, columns, stats) - stats gồm 'negative' (bool) và
+            'zero_columns' (mảng bool theo cột)
+        """
+        dtype = np.float32 if self.use_float32 else np.float64
+
+        # Cột không phải số (chuỗi "1,234", "N/A"...) → số, lỗi thành NaN (xử lý bên dưới)
+        non_numeric = [col for col, col_dtype in df_wide.dtypes.items()
+                       if not pd.api.types.is_numeric_dtype(col_dtype)]
+        if non_numeric:
+            df_wide = df_wide.copy(deep=False)  # Chỉ thay các cột này, không copy dữ liệu
+            for col in non_numeric:
+                df_wide[col] = pd.to_numeric(df_wide[col], errors='coerce')
+
+        # Một lần copy sang dtype đích (layout cột như block pandas → DataFrame dùng lại không copy);
+        # chỉ khi thời gian chưa sắp xếp mới cần thêm một lần hoán vị hàng (như sort_index)
+        values = df_wide.to_numpy(dtype=dtype, na_value=np.nan, copy=True)
+        index = df_wide.index
+        order = index.argsort()
+        if not (order == np.arange(len(order))).all():
+            index = index[order]
+            values = np.asfortranarray(values[order])
+
+        # Một lượt theo từng khối liền bộ nhớ (~1M ô: cột nếu layout Fortran, hàng nếu C)
+        # → mảng tạm của nan_to_num / any chỉ cỡ một khối thay vì cả bảng
+        by_columns = values.flags['F_CONTIGUOUS']
+        n_rows, n_cols = values.shape
+        length = n_cols if by_columns else n_rows
+        step = max(1, (1 << 20) // max(n_rows if by_columns else n_cols, 1))
+        negative = False
+        nonzero = np.zeros(n_cols, dtype=bool)
+        for start in range(0, length, step):
+            block = values[:, start:start + step] if by_columns else values[start:start + step]
+            np.nan_to_num(block, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+            if block.size and block.min() < 0:
+                np.abs(block, out=block)
+                negative = True
+            if by_columns:
+                nonzero[start:start + step] = block.any(axis=0)
+            else:
+                nonzero |= block.any(axis=0)
+        return values, index, df_wide.columns, {'negative': negative, 'zero_columns': ~nonzero}
+
+    def _normalization_options(self):
+        """V5.2 - Các tùy chọn ảnh hưởng đến df_wide (thành phần của key DatasetCache)"""
+        return {
+            'time': self.time_col,
+            'entity': self.entity_col,
+            'value': self.value_col,
+            'percent': self.use_percent,
+            'float32': self.use_float32,
+            'agg': self.agg,
+            'sheet': str(self.sheet),
+        }
+
+    def _load_cached_dataset(self):
+        """
+        V5.2 - Lấy df_wide từ DatasetCache nếu có
+
+        Returns:
+            Key cache (để lưu sau khi chuẩn hóa), hoặc None nếu không dùng được cache
+        """
+        try:
+            start = time.perf_counter()
+            key = self.dataset_cache.key(self._input_files(), self._normalization_options())
+            df_wide = self.dataset_cache.load(key)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Không dùng được cache dữ liệu: {e}")
+            return None
+
+        if df_wide is not None:
+            self.df_wide = df_wide
+            print(f"💾 Dùng dữ liệu đã chuẩn hóa từ cache ({time.perf_counter() - start:.2f}s): "
+                  f"{df_wide.shape[0]} khoảng thời gian × {df_wide.shape[1]} thực thể")
+            print(f"  → {self.dataset_cache.cache_dir} (--no-cache để đọc lại file)")
+        return key
+
+    def _store_cached_dataset(self, key):
+        """V5.2 - Lưu df_wide vừa chuẩn hóa vào DatasetCache (lỗi ghi không làm hỏng lần chạy)"""
+        try:
+            size = self.dataset_cache.store(key, self.df_wide)
+            print(f"💾 Đã lưu cache dữ liệu chuẩn hóa ({size / 1024:,.0f} KB)")
+        except Exception as e:
+            print(f"⚠️  Không lưu được cache dữ liệu: {e}")
+
+    RESAMPLE_RULES = ('W', 'M', 'Q', 'Y')
+    RESAMPLE_AGGS = ('sum', 'mean', 'last')
+
+    @staticmethod
+    def _period_buckets(index, rule):
+        """
+        V5.2 - Mã bucket (số nguyên, không giảm) cho từng hàng của index thời gian
+
+        Args:
+            index: Index của df_wide (datetime, chuỗi ngày, hoặc số như năm)
+            rule: 'W' / 'M' / 'Q' / 'Y' (index dạng ngày) hoặc số nguyên N
+                  (index số: bucket floor(x / N) * N, vd N=10 → thập kỷ;
+                  index khác: gộp mỗi N period liên tiếp)
+
+        Returns:
+            (order, codes, labels): order là hoán vị sắp xếp hàng theo thời gian (None nếu
+            đã đúng thứ tự), codes theo thứ tự đã sắp, labels(starts) → nhãn của từng bucket
+        """
+        if isinstance(rule, int):
+            if pd.api.types.is_numeric_dtype(index.dtype):
+                x = index.to_numpy(dtype=np.float64)
+                codes = np.floor(x / rule).astype(np.int64)
+                integral = bool(np.all(x == np.round(x)))
+
+                def labels(starts):
+                    edges = codes[starts] * rule
+                    return pd.Index(edges if integral else edges.astype(np.float64), name=index.name)
+            else:
+                codes = np.arange(len(index)) // rule
+
+                def labels(starts):
+                    return index[starts]
+            return None, codes, labels
+
+        if isinstance(index, pd.DatetimeIndex):
+            dates = index
+        elif pd.api.types.is_numeric_dtype(index.dtype):
+            raise ValueError(f"--resample {rule} cần index dạng ngày tháng; "
+                             f"index số (vd năm) dùng --resample N (vd 5 hoặc 10)")
+        else:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                dates = pd.DatetimeIndex(pd.to_datetime(index, errors='coerce'))
+                if dates.isna().any():
+                    # Định dạng đoán từ dòng đầu sai với ngày/tháng kiểu "13/01/2020" → thử ngày trước
+                    dates = pd.DatetimeIndex(pd.to_datetime(index, errors='coerce', dayfirst=True))
+            if dates.isna().any():
+                bad = list(index[dates.isna()][:3])
+                raise ValueError(f"Không đọc được index thời gian dạng ngày tháng: {bad}")
+        if dates.tz is not None:
+            dates = dates.tz_localize(None)
+
+        order = None
+        if not dates.is_monotonic_increasing:
+            # Index chuỗi được sắp theo chữ (vd "02/01/2020") → sắp lại theo thời gian thật
+            order = np.argsort(dates.asi8, kind='stable')
+            dates = dates[order]
+        periods = dates.to_period(rule)
+        codes = periods.asi8
+
+        def labels(starts):
+            bucket = periods[starts]
+            if rule == 'Y':
+                return pd.Index(bucket.year, name=index.name)  # Năm dạng số → nhãn như index năm
+            if rule == 'W':
+                return pd.Index(bucket.start_time.strftime('%Y-%m-%d'), name=index.name)
+            return pd.Index(bucket.strftime('%Y-%m' if rule == 'M' else '%YQ%q'), name=index.name)
+        return order, codes, labels
+
+    def resample_data(self):
+        """
+        V5.2 - Gộp df_wide theo chu kỳ lớn hơn (--resample W|M|Q|Y hoặc N) trước khi lập frame
+
+        Dữ liệu theo ngày nhiều năm → hàng nghìn period × steps_per_period frames. Hàng đã sắp
+        theo thời gian nên mỗi bucket là một khối hàng liên tục: sum/mean dùng một lượt
+        np.add.reduceat trên cả ma trận, last lấy hàng cuối mỗi khối (không groupby theo cột).
+        Chạy sau cache (df_wide đã chuẩn hóa dùng lại được cho mọi chu kỳ) và trước pruning/
+        FramePlan nên chi phí render giảm theo số period.
+        """
+        if not self.resample:
+            return True
+
+        rule = self.resample
+        if isinstance(rule, str):
+            rule = int(rule) if rule.isdigit() else rule.upper()
+        if (isinstance(rule, int) and rule < 1) or (isinstance(rule, str) and rule not in self.RESAMPLE_RULES):
+            print(f"❌ --resample không hợp lệ: {self.resample} (W, M, Q, Y hoặc số nguyên N ≥ 1)")
+            return False
+        if self.resample_agg not in self.RESAMPLE_AGGS:
+            print(f"❌ --resample-agg không hợp lệ: {self.resample_agg} ({'/'.join(self.RESAMPLE_AGGS)})")
+            return False
+
+        start = time.perf_counter()
+        n_before = len(self.df_wide)
+        try:
+            order, codes, labels = self._period_buckets(self.df_wide.index, rule)
+        except ValueError as e:
+            print(f"⚠️  Bỏ qua resample: {e}")
+            return True
+
+        values = self.df_wide.to_numpy()
+        if order is not None:
+            values = values[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        if len(starts) < 2:
+            print(f"⚠️  Bỏ qua resample {self.resample}: chỉ còn {len(starts)} khoảng thời gian (cần ít nhất 2)")
+            return True
+
+        if self.resample_agg == 'last':
+            ends = np.r_[starts[1:], len(values)] - 1
+            result = values[ends]
+        else:
+            result = np.add.reduceat(values, starts, axis=0)
+            if self.resample_agg == 'mean':
+                counts = np.diff(np.r_[starts, len(values)])
+                result /= counts[:, None].astype(result.dtype)
+        if self.use_percent and self.resample_agg == 'sum':
+            # Tổng các hàng phần trăm → chuẩn hóa lại để mỗi hàng vẫn là 100%
+            row_sums = result.sum(axis=1, keepdims=True)
+            row_sums[row_sums == 0] = 1
+            result /= row_sums
+            result *= 100
+
+        attrs = self.df_wide.attrs
+        self.df_wide = pd.DataFrame(result, index=labels(starts), columns=self.df_wide.columns, copy=False)
+        self.df_wide.attrs.update(attrs)
+        n_after = len(self.df_wide)
+        steps = self.steps_per_period
+        print(f"📅 Resample {self.resample} ({self.resample_agg}): {n_before:,} → {n_after:,} khoảng thời gian "
+              f"({n_before * steps:,} → {n_after * steps:,} frames) trong {(time.perf_counter() - start) * 1000:.1f}ms")
+        print(f"  → Khoảng thời gian: {self.df_wide.index[0]} → {self.df_wide.index[-1]}")
+        return True
+
+    def prune_entities(self):
+        """
+        V5.2 - Loại các thực thể không bao giờ vào top N (+ prune_margin) trước khi render
+
+        Thực thể được giữ nếu nằm trong top N + margin ở một period bất kỳ. Khi nội suy,
+        frame giữa period i và i+1 có giá trị nằm giữa hai đầu mút, nên chỉ thực thể có
+        max(đầu mút) ≥ giá trị lớn thứ k của min(đầu mút) mới có thể vào top-k; top-k của
+        từng frame nội suy được tính chính xác trên tập ứng viên đó. Thứ tự cột được giữ nguyên
+        (thứ hạng khi bằng nhau không đổi); vị trí cột gốc (màu) và tổng cả hàng
+        (stats panel) được lưu lại; BAR qua bar_chart_race đo bề rộng nhãn bằng tên cột
+        trước prune (_bcr_layout_columns) → video giống hệt khi không prune.
+        """
+        source_totals = None
+        if self.TOTAL_COLUMN in self.df_wide.columns:
+            # Nguồn SQL chỉ trả về ứng viên top-N: tổng cả hàng + mọi thực thể lấy từ DB
+            source_totals = self.df_wide[self.TOTAL_COLUMN].to_numpy(dtype=np.float64)
+            self.df_wide = self.df_wide.drop(columns=self.TOTAL_COLUMN)
+
+        n_entities = self.df_wide.shape[1]
+        self.entity_positions = np.arange(n_entities)
+        self.period_totals = None
+        self.n_entities_total = n_entities
+        if source_totals is not None:
+            source_entities = self.df_wide.attrs['source_entities']
+            self.entity_positions = source_entities.get_indexer(self.df_wide.columns)
+            self.period_totals = source_totals
+            self.n_entities_total = len(source_entities)
+        k = self.top_n + max(self.prune_margin, 0)
+        if not self.prune or n_entities <= k:
+            return
+
+        start = time.perf_counter()
+        values = self.df_wide.to_numpy()
+        keep = np.zeros(n_entities, dtype=bool)
+        candidates = np.zeros(n_entities, dtype=bool)
+        interpolated = self.interpolate_period and self.steps_per_period > 1
+        # Theo khối hàng (~1M ô) để mảng tạm của argpartition không cỡ cả bảng
+        step = max(2, (1 << 20) // n_entities)
+        for row in range(0, len(values), step):
+            block = values[row:row + step]
+            keep[FramePlan._top_order(block, k).ravel()] = True
+            if interpolated:
+                segment = values[row:row + step + 1]
+                low = np.minimum(segment[:-1], segment[1:])
+                high = np.maximum(segment[:-1], segment[1:])
+                if len(low):
+                    kth = -np.partition(-low, k - 1, axis=1)[:, k - 1]
+                    candidates |= (high >= kth[:, None]).any(axis=0)
+
+        if interpolated:
+            # Top-k chính xác ở từng frame nội suy (như FramePlan), chỉ trên tập ứng viên
+            columns = np.flatnonzero(candidates | keep)
+            subset = values[:, columns]
+            t = (np.arange(1, self.steps_per_period) / self.steps_per_period)[:, None]
+            for i in range(len(subset) - 1):
+                frames = subset[i] + t * (subset[i + 1] - subset[i])
+                keep[columns[FramePlan._top_order(frames, k).ravel()]] = True
+
+        kept = int(keep.sum())
+        if kept == n_entities:
+            print(f"✂️  Pruning: giữ toàn bộ {n_entities:,} thực thể (đều từng vào top {self.top_n} + {self.prune_margin})")
+            return
+
+        # Cùng phép cộng theo hàng như FramePlan/stats panel trên bảng đầy đủ
+        if self.period_totals is None:
+            self.period_totals = np.ascontiguousarray(values, dtype=np.float64).sum(axis=1)
+        self.entity_positions = self.entity_positions[keep]
+        self.unpruned_columns = self.df_wide.columns
+        self.df_wide = self.df_wide.iloc[:, np.flatnonzero(keep)]
+        print(f"✂️  Pruning: giữ {kept:,}/{n_entities:,} thực thể (từng vào top {self.top_n} + {self.prune_margin}) "
+              f"trong {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def build_frame_plan(self):
+        """
+        V5.2 - Tính trước FramePlan (giá trị, top-N, nhãn period, cumsum)
+        cho mọi frame từ df_wide đã chuẩn hóa
+        """
+        start = time.perf_counter()
+        self.frame_plan = FramePlan(self.df_wide, self.top_n, self.steps_per_period,
+                                    interpolate=self.interpolate_period)
+        elapsed = time.perf_counter() - start
+        plan = self.frame_plan
+        print(f"✅ Frame plan: {plan.n_frames:,} frames × {len(plan.entities)} thực thể "
+              f"(top {plan.top_n}) trong {elapsed*1000:.1f}ms - {plan.nbytes / (1024 * 1024):.2f} MB")
+        return plan
+
     def _create_v4_overlay(self, ax, current_values, current_ranks, period_value):
         """
         V4.0 - Create information-rich overlay on each frame
@@ -727,27 +3748,48 @@ class TimeSeriesRacing:
         panel_bg = '#F5F5F5' if self.theme == 'light' else '#2C3E50'
         panel_alpha = 0.95
 
-        # 1. BACKGROUND GRADIENT (V4.0 Feature)
-        if self.enable_background_gradient:
-            self._add_background_gradient(ax)
-
-        # 2. STATISTICS PANEL (V4.0 Feature)
+        # V5.2 - Overlay retained: phần tĩnh (gradient, khung panel, track, watermark) tạo
+        # MỘT lần và cache trong StaticLayer; mỗi frame chỉ cập nhật số liệu và progress.
+        # bar_chart_race xoá ax.texts mỗi frame → gắn lại các text động.
+        overlay = getattr(self, '_v4_overlay', None)
         values_len = len(current_values) if hasattr(current_values, '__len__') else 0
-        if self.show_stats_panel and values_len > 0:
-            self._add_stats_panel(ax, current_values, text_color, panel_bg, panel_alpha)
-
-        # 3. PROGRESS BAR (V4.0 Feature)
-        if self.show_progress_bar:
-            self._add_progress_bar(ax, text_color)
+        if overlay is None or overlay['ax'] is not ax:
+            overlay = self._v4_overlay = {'ax': ax, 'stats': None, 'progress': None}
+            static_artists = []
+
+            # 1. BACKGROUND GRADIENT (V4.0 Feature)
+            if self.enable_background_gradient:
+                static_artists.append(self._add_background_gradient(ax))
+
+            # 2. STATISTICS PANEL (V4.0 Feature)
+            if self.show_stats_panel and values_len > 0:
+                panel_artists, overlay['stats'] = self._add_stats_panel(
+                    ax, current_values, text_color, panel_bg, panel_alpha)
+                static_artists.extend(panel_artists)
+
+            # 3. PROGRESS BAR (V4.0 Feature)
+            if self.show_progress_bar:
+                overlay['progress'] = self._add_progress_bar(ax, text_color)
+                static_artists.extend(overlay['progress'][0])
+
+            # 5. WATERMARK (V4.0 Feature)
+            if self.watermark_text:
+                static_artists.append(self._add_watermark(ax, text_color))
+
+            self._add_static_layers(ax, static_artists)
+        else:
+            if overlay['stats'] and values_len > 0:
+                self._update_stats_panel(overlay['stats'], current_values)
+            if overlay['progress']:
+                self._update_progress_bar(overlay['progress'])
+            for text_obj in (overlay['stats'] or []) + ([overlay['progress'][2]] if overlay['progress'] else []):
+                if text_obj.axes is None:
+                    ax.add_artist(text_obj)
 
         # 4. RANK CHANGE INDICATORS (V4.0 Feature)
         if self.show_rank_changes:
             self._add_rank_indicators(ax, current_ranks, text_color)
 
-        # 5. WATERMARK (V4.0 Feature)
-        if self.watermark_text:
-            self._add_watermark(ax, text_color)
-
         # 6. EVENT ANNOTATIONS (V4.0 Feature)
         if period_value in self.event_annotations:
             self._add_event_annotation(ax, self.event_annotations[period_value], text_color)
@@ -764,7 +3806,15 @@ class TimeSeriesRacing:
             self.prev_values = current_values.copy() if hasattr(current_values, 'copy') else current_values
 
     def _add_background_gradient(self, ax):
-        """Add subtle background gradient for visual depth"""
+        """
+        Add subtle background gradient for visual depth
+
+        V5.2: Gradient nằm trong toạ độ axes (không phụ thuộc axis limits) và không
+        thay đổi data limits → có thể cache trong StaticLayer.
+
+        Returns:
+            AxesImage của gradient
+        """
         if self.theme == 'light':
             colors_grad = ['#FFFFFF', '#F8F9FA', '#F0F2F5']
         else:
@@ -774,41 +3824,23 @@ class TimeSeriesRacing:
         gradient = np.linspace(0, 1, 256).reshape(256, 1)
         gradient = np.hstack([gradient] * 2)
 
-        extent = [ax.get_xlim()[0], ax.get_xlim()[1],
-                  ax.get_ylim()[0], ax.get_ylim()[1]]
-
-        ax.imshow(gradient, aspect='auto', extent=extent,
-                  alpha=0.1, zorder=-10, cmap=plt.cm.Blues if self.theme == 'light' else plt.cm.Greys)
+        image = AxesImage(ax, cmap=plt.cm.Blues if self.theme == 'light' else plt.cm.Greys,
+                          extent=(0, 1, 0, 1), alpha=0.1, zorder=-10)
+        image.set_data(gradient)
+        image.set_transform(ax.transAxes)
+        image.set_clip_path(ax.patch)
+        ax.add_image(image)
+        return image
 
     def _add_stats_panel(self, ax, current_values, text_color, panel_bg, panel_alpha):
-        """Add real-time statistics panel (V4.0 ULTIMATE Feature) - UPGRADED"""
-        # Handle both dict and numpy array inputs
-        if isinstance(current_values, dict):
-            values_array = np.array(list(current_values.values()))
-        else:
-            values_array = np.array(current_values) if not isinstance(current_values, np.ndarray) else current_values
-
-        # UPGRADED: Filter out invalid values (NaN, Inf)
-        values_array = values_array[np.isfinite(values_array)]
-
-        # UPGRADED: Early return if no valid data
-        if len(values_array) == 0:
-            return
-
-        # Calculate statistics with validation
-        total_value = np.sum(values_array)
-        leader_value = np.max(values_array) if len(values_array) > 0 else 0
-        avg_value = np.mean(values_array) if len(values_array) > 0 else 0
-
-        # Get top 2 for gap calculation
-        sorted_values = np.sort(values_array)[::-1]  # Sort descending
-        gap = sorted_values[0] - sorted_values[1] if len(sorted_values) > 1 else 0
+        """
+        Add real-time statistics panel (V4.0 ULTIMATE Feature) - UPGRADED
 
-        # UPGRADED: Validate all calculated values
-        total_value = total_value if np.isfinite(total_value) else 0
-        leader_value = leader_value if np.isfinite(leader_value) else 0
-        avg_value = avg_value if np.isfinite(avg_value) else 0
-        gap = gap if np.isfinite(gap) else 0
+        Returns:
+            (static_artists, value_texts) - V5.2: khung panel + tiêu đề là tĩnh,
+            value_texts được cập nhật mỗi frame bằng _update_stats_panel
+        """
+        static_artists = []
 
         # V5.1 AESTHETIC: Panel position with spacing system
         spacing = self._get_spacing('md') / 1000  # Convert to axis units
@@ -831,6 +3863,7 @@ class TimeSeriesRacing:
                 zorder=999
             )
             ax.add_patch(shadow_panel)
+            static_artists.append(shadow_panel)
 
         # Main panel
         panel = FancyBboxPatch(
@@ -844,6 +3877,7 @@ class TimeSeriesRacing:
             zorder=1000
         )
         ax.add_patch(panel)
+        static_artists.append(panel)
 
         # V5.1 AESTHETIC: Typography hierarchy for panel
         heading_size = self._get_font_size('body')
@@ -861,23 +3895,16 @@ class TimeSeriesRacing:
                 family=font_family,
                 zorder=1002)
         self._add_text_shadow(title_obj, 'low')
-
-        # Statistics values with hierarchy
-        stats = [
-            ("Total", total_value),
-            ("Leader", leader_value),
-            ("Gap", gap),
-            ("Average", avg_value)
-        ]
+        static_artists.append(title_obj)
 
         y_start = title_y - 0.04
         line_spacing = 0.03
 
-        for i, (label, value) in enumerate(stats):
+        value_texts = []
+        for i in range(4):
             y_pos = y_start - (i * line_spacing)
             # Label + Value on same line with different weights
-            text_obj = ax.text(panel_x + 0.125, y_pos,
-                    f"{label}: {value:,.0f}",
+            text_obj = ax.text(panel_x + 0.125, y_pos, '',
                     transform=ax.transAxes,
                     fontsize=value_size,
                     ha='center', va='center',
@@ -886,10 +3913,65 @@ class TimeSeriesRacing:
                     family=font_family,
                     zorder=1001)
             self._add_text_shadow(text_obj, 'low')
+            value_texts.append(text_obj)
+
+        self._update_stats_panel(value_texts, current_values)
+        return static_artists, value_texts
+
+    def _update_stats_panel(self, value_texts, current_values):
+        """V5.2 - Cập nhật số liệu của stats panel đã tạo bởi _add_stats_panel"""
+        # Handle both dict and numpy array inputs
+        if isinstance(current_values, dict):
+            values_array = np.array(list(current_values.values()))
+        else:
+            values_array = np.array(current_values) if not isinstance(current_values, np.ndarray) else current_values
+
+        # UPGRADED: Filter out invalid values (NaN, Inf)
+        values_array = values_array[np.isfinite(values_array)]
+
+        # UPGRADED: Empty values if no valid data
+        if len(values_array) == 0:
+            for text_obj in value_texts:
+                text_obj.set_text('')
+            return value_texts
+
+        # Calculate statistics with validation
+        total_value = np.sum(values_array)
+        leader_value = np.max(values_array)
+        avg_value = np.mean(values_array)
+
+        # Get top 2 for gap calculation
+        sorted_values = np.sort(values_array)[::-1]  # Sort descending
+        gap = sorted_values[0] - sorted_values[1] if len(sorted_values) > 1 else 0
+
+        # UPGRADED: Validate all calculated values
+        total_value = total_value if np.isfinite(total_value) else 0
+        leader_value = leader_value if np.isfinite(leader_value) else 0
+        avg_value = avg_value if np.isfinite(avg_value) else 0
+        gap = gap if np.isfinite(gap) else 0
+
+        # Statistics values with hierarchy
+        stats = [
+            ("Total", total_value),
+            ("Leader", leader_value),
+            ("Gap", gap),
+            ("Average", avg_value)
+        ]
+        for text_obj, (label, value) in zip(value_texts, stats):
+            text_obj.set_text(f"{label}: {value:,.0f}")
+        return value_texts
 
     def _add_progress_bar(self, ax, text_color):
-        """Add timeline progress bar at bottom (V4.0 ULTIMATE Feature) - V5.1 AESTHETIC"""
-        progress = self.period_index / max(1, self._total_periods - 1)
+        """
+        Add timeline progress bar at bottom (V4.0 ULTIMATE Feature) - V5.1 AESTHETIC
+
+        Returns:
+            (track_artists, progress_bar, text_obj) - track (nền + bóng) là tĩnh,
+            progress_bar và text_obj được renderer retained-mode cập nhật mỗi frame
+        """
+        # FIXED: _total_periods chỉ được set trong overlay của BAR chart
+        total_periods = getattr(self, '_total_periods', len(self.df_wide))
+        progress = self.period_index / max(1, total_periods - 1)
 
         # V5.1 AESTHETIC: Progress bar position with spacing
         spacing = self._get_spacing('sm') / 1000
@@ -898,6 +3980,8 @@ class TimeSeriesRacing:
         bar_width = 0.94
         bar_x = 0.03
 
+        track_artists = []
+
         # V5.1 AESTHETIC: Shadow effect on progress bar
         if self.enable_shadows:
             shadow_offset = 0.003
@@ -909,6 +3993,7 @@ class TimeSeriesRacing:
                 zorder=999
             )
             ax.add_patch(shadow_bar)
+            track_artists.append(shadow_bar)
 
         # Background bar with rounded corners effect
         bg_bar = Rectangle(
@@ -919,6 +4004,7 @@ class TimeSeriesRacing:
             zorder=1000
         )
         ax.add_patch(bg_bar)
+        track_artists.append(bg_bar)
 
         # Progress bar with theme-aware color
         progress_color = '#4CAF50' if self.theme == 'light' else '#66BB6A'
@@ -945,6 +4031,37 @@ class TimeSeriesRacing:
                 zorder=1002)
         # Subtle shadow on percentage text
         self._add_text_shadow(text_obj, 'low')
+        return track_artists, progress_bar, text_obj
+
+    def _update_progress_bar(self, progress_artists):
+        """V5.2 - Cập nhật progress bar đã tạo bởi _add_progress_bar (retained mode)"""
+        track_artists, progress_bar, text_obj = progress_artists
+        total_periods = getattr(self, '_total_periods', len(self.df_wide))
+        progress = self.period_index / max(1, total_periods - 1)
+        progress_bar.set_width(track_artists[-1].get_width() * progress)
+        text_obj.set_text(f"{progress*100:.0f}%")
+        return [progress_bar, text_obj]
+
+    def _add_static_layers(self, ax, artists):
+        """
+        V5.2 - Gom các artist tĩnh vào StaticLayer (raster một lần, composite mỗi frame)
+
+        Mỗi zorder một lớp để thứ tự vẽ với các artist động giữ nguyên như trước.
+
+        Returns:
+            Danh sách StaticLayer đã thêm vào ax
+        """
+        groups = defaultdict(list)
+        for artist in artists:
+            if artist is not None:
+                groups[artist.get_zorder()].append(artist)
+
+        layers = []
+        for zorder in sorted(groups):
+            layer = StaticLayer(ax, groups[zorder], zorder)
+            ax.add_artist(layer)
+            layers.append(layer)
+        return layers
 
     def _add_rank_indicators(self, ax, current_ranks, text_color):
         """Add rank change indicators (arrows) next to entity names (V4.0 ULTIMATE Feature)"""
@@ -983,6 +4100,7 @@ class TimeSeriesRacing:
         # V5.1 AESTHETIC: Subtle shadow on watermark
         if self.enable_shadows:
             self._add_text_shadow(text_obj, 'low')
+        return text_obj
 
     def _add_event_annotation(self, ax, event_text, text_color):
         """Add event annotation for key moments (V4.0 ULTIMATE Feature)"""
@@ -1008,9 +4126,191 @@ class TimeSeriesRacing:
                 family=self.font_family,
                 zorder=2001)
 
-    def _reencode_video(self, temp_file, final_file):
-        """Re-encode video with editor-friendly settings using FFmpeg CLI - UPGRADED"""
-        print(f"  ⚙️  Re-encoding with editor-friendly format...")
+    def _bar_style_kwargs(self):
+        """
+        V3.2 - Style của bars (alpha, viền) theo enable_effects và bar_style
+
+        Dùng chung cho BAR matplotlib (bar_chart_race) và renderer fast.
+        """
+        if self.enable_effects:
+            if self.bar_style == 'gradient':
+                bar_kwargs = {
+                    'alpha': self.bar_alpha,  # V3.2 - Customizable transparency
+                    'ec': 'white',  # Edge color - crisp white borders
+                    'lw': self.bar_border_width,  # V3.2 - Thicker premium borders
+                    'zorder': 10,
+                }
+            else:
+                bar_kwargs = {
+                    'alpha': self.bar_alpha - 0.05,  # Slightly less transparent for solid
+                    'ec': '#2C3E50',  # Darker border for contrast
+                    'lw': self.bar_border_width - 0.5,  # Slightly thinner for solid
+                    'zorder': 10,
+                }
+        else:
+            # Standard styling (backward compatible)
+            if self.bar_style == 'gradient':
+                bar_kwargs = {
+                    'alpha': 0.9,
+                    'ec': 'white',
+                    'lw': 2,
+                }
+            else:
+                bar_kwargs = {
+                    'alpha': 0.85,
+                    'ec': 'white',
+                    'lw': 1.5,
+                }
+        return bar_kwargs
+
+    def _encoding_args(self, profile=None):
+        """
+        V5.2 - Tham số FFmpeg (libx264) theo encode profile
+
+        Dùng chung cho pipe raw frames trực tiếp (single-pass) và re-encode.
+        Codec (libx264) được chọn riêng bởi từng nơi gọi; lượt 2-pass do _reencode_video thêm.
+
+        Args:
+            profile: dict từ EncodingProfiles.resolve (mặc định: profile của lần chạy)
+        """
+        p = profile or self.encoding
+        args = ['-preset', p['preset']]
+        rate_control = p['rate_control']
+        if rate_control == 'lossless':
+            args += ['-qp', '0']
+        elif rate_control == '2pass':
+            args += ['-b:v', p['bitrate']]
+            if p['maxrate']:
+                args += ['-maxrate', p['maxrate'], '-bufsize', p['bufsize'] or p['maxrate']]
+        else:
+            args += ['-crf', str(p['crf'])]            # Quality (18 = near lossless)
+            if rate_control == 'vbr':
+                if p['bitrate']:
+                    args += ['-b:v', p['bitrate']]
+                # Max bitrate (prevent spikes) + buffer size
+                args += ['-maxrate', p['maxrate'], '-bufsize', p['bufsize'] or p['maxrate']]
+
+        # Key settings:
+        # - yuv420p: Pixel format (required by editors)
+        # - CFR: Constant frame rate
+        args += ['-pix_fmt', 'yuv420p']
+        if p['force_fps']:
+            args += ['-r', str(self.fps),               # Force constant frame rate
+                     '-g', str(self.fps)]               # GOP size (keyframe interval)
+        if p['h264_high']:
+            args += ['-bf', '2',                        # B-frames
+                     '-profile:v', 'high',              # H.264 high profile
+                     '-level', '4.2']                   # H.264 level (1080p60)
+        if p['faststart']:
+            args += ['-movflags', '+faststart']         # Fast start for web
+        if p['threads']:
+            args += ['-threads', str(p['threads'])]
+        if rate_control != 'lossless':
+            args += self._metadata_args()
+        return args
+
+    def _metadata_args(self):
+        """V5.2 - Metadata title/artist/comment của output cuối ([DRAFT] khi --draft)"""
+        draft = self.draft is not None
+        return [
+            '-metadata', f"title={'[DRAFT] ' if draft else ''}{self.title}",
+            '-metadata', 'artist=TimeSeriesRacing v5.0 MULTI-CHART - UPGRADED',
+            '-metadata', ('comment=DRAFT preview - reduced frames/DPI, not for publishing' if draft
+                          else 'comment=High Quality, Stable Rendering'),
+        ]
+
+    def _output_args(self, target):
+        """
+        V5.2 - Tham số FFmpeg cho một output phụ (codec + encode + đường dẫn)
+
+        H.264 dùng _encoding_args; VP9 ánh xạ cùng profile (CRF + offset, trần bitrate = constrained
+        quality, preset → -cpu-used); GIF giảm fps/kích thước và dùng palette riêng (palettegen).
+
+        Args:
+            target: dict từ EncodingProfiles.parse_output
+        """
+        p = target['profile']
+        if target['codec'] == 'h264':
+            args = ['-c:v', 'libx264'] + self._encoding_args(p)
+        elif target['codec'] == 'vp9':
+            cpu_used = EncodingProfiles.VP9_CPU_USED.get(p['preset'], 4)
+            args = ['-c:v', 'libvpx-vp9', '-pix_fmt', 'yuv420p', '-row-mt', '1',
+                    '-deadline', 'realtime' if cpu_used > 5 else 'good', '-cpu-used', str(cpu_used)]
+            crf = str(min(63, p['crf'] + EncodingProfiles.VP9_CRF_OFFSET))
+            if p['rate_control'] == 'lossless':
+                args += ['-lossless', '1']
+            elif p['rate_control'] == 'vbr':
+                args += ['-crf', crf, '-b:v', p['maxrate']]  # Constrained quality: b:v = trần
+            else:
+                args += ['-crf', crf, '-b:v', '0']           # Constant quality
+            if p['force_fps']:
+                args += ['-r', str(self.fps), '-g', str(self.fps)]
+            if p['threads']:
+                args += ['-threads', str(p['threads'])]
+            args += self._metadata_args()
+        else:
+            args = ['-vf', (f"fps={EncodingProfiles.GIF_FPS},scale={EncodingProfiles.GIF_WIDTH}:-2:flags=lanczos,"
+                            "split[a][b];[a]palettegen=stats_mode=diff[p];[b][p]paletteuse=dither=bayer:bayer_scale=5"),
+                    '-loop', '0']
+        if target['seconds']:
+            args += ['-t', f"{target['seconds']:g}"]
+        return args + ['-y', target['path']]
+
+    def _fanout_args(self):
+        """V5.2 - Tham số FFmpeg của mọi output phụ, nối sau output chính trong cùng một lệnh"""
+        return [arg for target in self.extra_outputs for arg in self._output_args(target)]
+
+    def _make_video_writer(self, fps, lossless=False):
+        """
+        V5.2 - FFmpeg writer nhận raw RGBA frames qua stdin (rawvideo) và encode MỘT lần
+
+        Output cuối cùng kèm các output phụ (--also-output) trong cùng lệnh FFmpeg.
+        Frame đi qua hàng đợi --frame-queue (writer thread riêng) nếu > 0.
+
+        Args:
+            fps: Frame rate của các frame được render
+            lossless: True = segment trung gian lossless (cho --workers / 2-pass), False = output cuối cùng
+        """
+        if lossless:
+            profile = EncodingProfiles.resolve('lossless-intermediate')
+            return BufferFFMpegWriter(fps=fps, codec='h264', extra_args=self._encoding_args(profile),
+                                      queue_depth=self.frame_queue)
+        return BufferFFMpegWriter(fps=fps, codec='h264', extra_args=self._encoding_args(),
+                                  fanout_args=self._fanout_args(), queue_depth=self.frame_queue)
+
+    def _output_frames(self, n_frames, save_fps, lossless=False):
+        """V5.2 - Số frame encoder ghi ra: profile force_fps (-r) chuyển save_fps → --fps"""
+        if lossless or not self.encoding['force_fps']:
+            return n_frames
+        return round(n_frames * self.fps / save_fps)
+
+    def _encode_timeout(self, n_frames=None):
+        """
+        V5.2 - Timeout (giây) mỗi lượt encode: 'timeout' của profile, hoặc
+        120s + frames / min_fps cộng dồn cho output chính và từng output phụ
+        """
+        if self.encoding['timeout']:
+            return self.encoding['timeout']
+        if not n_frames:
+            return 600
+        profiles = [self.encoding] + [target['profile'] for target in self.extra_outputs]
+        return 120 + sum(n_frames / profile['min_fps'] for profile in profiles)
+
+    def _reencode_video(self, temp_file, final_file, input_args=None, n_frames=None):
+        """
+        Re-encode video with editor-friendly settings using FFmpeg CLI - UPGRADED
+
+        V5.2: Dùng để ghép + encode các segment của --workers (input_args=['-f', 'concat', ...])
+        và cho profile 2-pass (lượt 1 chỉ phân tích, lượt 2 ghi output); render tuần tự khác
+        pipe thẳng vào encoder. Timeout mỗi lượt tăng theo số frame (_encode_timeout).
+        Lượt ghi output cũng ghi các output phụ (--also-output) - đọc input một lần.
+
+        Args:
+            n_frames: Số frame output (timeout + báo tốc độ encode), None = không rõ
+        """
+        profile = self.encoding
+        extra = f" + {len(self.extra_outputs)} output phụ" if self.extra_outputs else ""
+        print(f"  ⚙️  Re-encoding: {EncodingProfiles.describe(profile)}{extra}...")
 
         # UPGRADED: Validate input file first
         if not os.path.exists(temp_file):
@@ -1021,74 +4321,64 @@ class TimeSeriesRacing:
             print(f"  ❌ Temp file trống (0 bytes)")
             return False
 
-        # FFmpeg command for editor compatibility
-        # Key settings:
-        # - libx264: H.264 codec (universal)
-        # - yuv420p: Pixel format (required by editors)
-        # - CFR: Constant frame rate
-        # - High bitrate: Professional quality
-
-        ffmpeg_cmd = [
-            'ffmpeg',
-            '-i', temp_file,                    # Input file
-            '-y',                                # Overwrite output
-            '-c:v', 'libx264',                  # H.264 video codec
-            '-preset', 'medium',                 # Encoding preset
-            '-crf', '18',                        # Quality (18 = near lossless)
-            '-pix_fmt', 'yuv420p',              # Pixel format (required!)
-            '-r', str(self.fps),                # Force constant frame rate
-            '-g', str(self.fps),                # GOP size (keyframe interval)
-            '-bf', '2',                          # B-frames
-            '-profile:v', 'high',                # H.264 high profile
-            '-level', '4.2',                     # H.264 level (1080p60)
-            '-movflags', '+faststart',           # Fast start for web
-            '-b:v', '8000k',                     # Video bitrate
-            '-maxrate', '10000k',                # Max bitrate (prevent spikes)
-            '-bufsize', '16000k',                # Buffer size
-            '-c:a', 'copy',                      # Copy audio (if exists)
-            '-metadata', f'title={self.title}',
-            '-metadata', 'artist=TimeSeriesRacing v5.0 MULTI-CHART - UPGRADED',
-            '-metadata', 'comment=High Quality, Stable Rendering',
-            final_file
-        ]
+        # FFmpeg command for editor compatibility (libx264: H.264 codec - universal)
+        base_cmd = ['ffmpeg'] + (input_args or []) + ['-i', temp_file, '-y', '-c:v', 'libx264']
+        encoding_args = self._encoding_args()
+        if profile['rate_control'] == '2pass':
+            passlog = os.path.join(os.path.dirname(os.path.abspath(temp_file)), 'x264_2pass')
+            commands = [
+                base_cmd + ['-an'] + encoding_args + ['-pass', '1', '-passlogfile', passlog, '-f', 'mp4', os.devnull],
+                base_cmd + ['-c:a', 'copy'] + encoding_args + ['-pass', '2', '-passlogfile', passlog, final_file],
+            ]
+        else:
+            commands = [base_cmd + ['-c:a', 'copy'] + encoding_args + [final_file]]  # Copy audio (if exists)
+        commands[-1] += self._fanout_args()
+        timeout = self._encode_timeout(n_frames)
 
         try:
-            # UPGRADED: Run ffmpeg with better error handling
-            result = subprocess.run(
-                ffmpeg_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=600  # UPGRADED: 10 minutes timeout (longer for safety)
-            )
+            encode_start = time.perf_counter()
+            for i, ffmpeg_cmd in enumerate(commands):
+                # UPGRADED: Run ffmpeg with better error handling
+                result = subprocess.run(
+                    ffmpeg_cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    timeout=timeout
+                )
 
-            # UPGRADED: Check for critical errors (vs warnings)
-            if result.returncode != 0:
-                stderr_lower = result.stderr.lower()
-                # Check if it's a critical error
-                critical_errors = ['error', 'failed', 'invalid', 'could not']
-                is_critical = any(err in stderr_lower for err in critical_errors)
-
-                if is_critical:
-                    print(f"  ❌ FFmpeg critical error:")
-                    # Print last 20 lines of stderr
-                    stderr_lines = result.stderr.split('\n')
-                    for line in stderr_lines[-20:]:
-                        if line.strip():
-                            print(f"    {line}")
-                else:
-                    print(f"  ⚠️  FFmpeg warnings (might be ok):")
-                    # Print last 5 lines
-                    stderr_lines = result.stderr.split('\n')
-                    for line in stderr_lines[-5:]:
-                        if line.strip():
-                            print(f"    {line}")
+                # UPGRADED: Check for critical errors (vs warnings)
+                if result.returncode != 0:
+                    stderr_lower = result.stderr.lower()
+                    # Check if it's a critical error
+                    critical_errors = ['error', 'failed', 'invalid', 'could not']
+                    is_critical = any(err in stderr_lower for err in critical_errors)
+
+                    if is_critical:
+                        print(f"  ❌ FFmpeg critical error{f' (lượt {i + 1}/2)' if len(commands) > 1 else ''}:")
+                        # Print last 20 lines of stderr
+                        stderr_lines = result.stderr.split('\n')
+                        for line in stderr_lines[-20:]:
+                            if line.strip():
+                                print(f"    {line}")
+                        if i < len(commands) - 1:
+                            return False  # Lượt phân tích hỏng → không chạy lượt 2
+                    else:
+                        print(f"  ⚠️  FFmpeg warnings (might be ok):")
+                        # Print last 5 lines
+                        stderr_lines = result.stderr.split('\n')
+                        for line in stderr_lines[-5:]:
+                            if line.strip():
+                                print(f"    {line}")
+            encode_time = time.perf_counter() - encode_start
 
             # UPGRADED: Validate output file more thoroughly
             if os.path.exists(final_file):
                 file_size = os.path.getsize(final_file)
                 if file_size > 1000:  # At least 1KB
-                    print(f"  ✅ Re-encoding complete! ({file_size / (1024*1024):.2f} MB)")
+                    speed = f", encode {n_frames / max(encode_time, 1e-9):.1f} frames/s" if n_frames else ""
+                    print(f"  ✅ Re-encoding complete! ({file_size / (1024*1024):.2f} MB, "
+                          f"{encode_time:.1f}s{speed})")
                     return True
                 else:
                     print(f"  ❌ Re-encoding failed - output file quá nhỏ ({file_size} bytes)")
@@ -1098,8 +4388,8 @@ class TimeSeriesRacing:
                 return False
 
         except subprocess.TimeoutExpired:
-            print(f"  ❌ FFmpeg re-encoding timeout (>10 minutes)")
-            print(f"     Video có thể quá dài hoặc phức tạp")
+            print(f"  ❌ FFmpeg re-encoding timeout (>{timeout:.0f}s mỗi lượt)")
+            print(f"     Video có thể quá dài hoặc phức tạp - tăng bằng --encode-set timeout=SECONDS")
             return False
         except FileNotFoundError:
             print(f"  ❌ FFmpeg không được cài đặt. Vui lòng cài đặt FFmpeg:")
@@ -1112,9 +4402,19 @@ class TimeSeriesRacing:
             import traceback
             traceback.print_exc()
             return False
+        finally:
+            if profile['rate_control'] == '2pass':
+                # Log 2-pass nằm cạnh temp_file (có thể là --work-dir của người dùng) → tự dọn
+                for path in glob.glob(glob.escape(passlog) + '-*.log*'):
+                    os.remove(path)
 
     def _create_line_chart_race(self):
-        """V5.0 - Create animated line chart race - UPGRADED for stability"""
+        """
+        V5.2 - Create animated line chart race - RETAINED MODE
+
+        Line2D objects, legend, title, progress bar và watermark được tạo MỘT lần;
+        mỗi frame chỉ cập nhật dữ liệu của các line (không ax.clear()).
+        """
         print(f"\n📈 Creating LINE CHART RACE animation...")
 
         # Setup figure
@@ -1124,121 +4424,147 @@ class TimeSeriesRacing:
             figsize = (12, 6.75)
 
         # UPGRADED: Create figure with proper cleanup
-        fig, ax = plt.subplots(figsize=figsize, dpi=self.dpi)
         plt.close('all')  # Clean up any existing figures
         fig, ax = plt.subplots(figsize=figsize, dpi=self.dpi)
 
         # Get colors
         colors_list = ColorPalettes.get_palette(self.palette)
 
-        # UPGRADED: Prepare data with validation
-        try:
-            df_cumsum = self.df_wide.cumsum()
-            # Validate cumsum didn't create issues
-            if df_cumsum.isnull().any().any():
-                print("  ⚠️  Phát hiện NaN trong cumsum - đang sử dụng dữ liệu gốc")
-                df_cumsum = self.df_wide.fillna(0)
-        except Exception as e:
-            print(f"  ⚠️  Lỗi khi tính cumsum - đang sử dụng dữ liệu gốc: {e}")
-            df_cumsum = self.df_wide
+        # V5.2 - Dữ liệu lấy từ FramePlan (cumsum đã tính trước)
+        plan = self.frame_plan
 
         # FIXED: Calculate total frames with interpolation for smooth animation
         # Total frames = periods * steps_per_period (like bar_chart_race does)
-        n_periods = len(self.df_wide)
-        total_frames = n_periods * self.steps_per_period
-
-        # Animation function with error handling
-        def animate(frame):
-            try:
-                ax.clear()
-
-                # FIXED: Map frame to period with interpolation
-                # frame goes from 0 to total_frames-1
-                # We want to map this to period 0 to n_periods-1
-                period_float = frame / self.steps_per_period
-                current_idx = int(min(period_float, n_periods - 1))
-
-                data_slice = df_cumsum.iloc[:current_idx+1]
-
-                if len(data_slice) == 0:
-                    return
-
-                # Plot lines for top N entities (based on final values)
-                final_values = self.df_wide.iloc[-1].sort_values(ascending=False)
-                top_entities = final_values.head(self.top_n).index
-
-                # UPGRADED: Validate we have entities to plot
-                if len(top_entities) == 0:
-                    return
+        total_frames = plan.n_frames
+
+        # Plot lines for top N entities (based on final values) - tính một lần
+        top_idx = plan.top_order[plan.frame_row[-1]]
+        top_entities = plan.entities[top_idx]
+        x_values = np.asarray(plan.period_labels)
+        if x_values.dtype.kind not in 'iufM':
+            x_values = np.asarray(plan.period_labels, dtype=object)  # Nhãn dạng text (categorical)
+        y_values = plan.cumsum
+
+        # V5.2 - INCREMENTAL ENGINE: buffer toạ độ cấp phát sẵn cho từng entity,
+        # mỗi frame chỉ lấy view [start:n] → chi phí không phụ thuộc vị trí trên timeline
+        y_columns = [np.ascontiguousarray(y_values[:, i]) for i in range(len(top_idx))]
+        window = self.line_window if self.line_window and self.line_window > 0 else 0
+        if len(top_idx):
+            # y min/max tích lũy đến từng period → O(1) mỗi frame
+            y_running_min = np.minimum.accumulate(y_values.min(axis=1))
+            y_running_max = np.maximum.accumulate(y_values.max(axis=1))
+        else:
+            y_running_min = y_running_max = None
+        # Marker decimation tính một lần (~10 marker mỗi line)
+        if window:
+            markevery_table = np.full(plan.n_periods, max(1, window // 10), dtype=np.int64)
+        else:
+            markevery_table = np.maximum(1, np.arange(1, plan.n_periods + 1) // 10)
+
+        # === Retained artists: tạo một lần ===
+        lines = []
+        for i, entity in enumerate(top_entities):
+            color = colors_list[i % len(colors_list)]
+            line, = ax.plot(x_values[:1], y_columns[i][:1],
+                            label=entity, color=color, linewidth=3, alpha=0.9,
+                            marker='o', markersize=4, markevery=1)
+            lines.append(line)
+
+        # Toạ độ số của trục x: nhãn text (categorical) được đánh số theo thứ tự xuất hiện,
+        # nên vị trí = 0..P-1 và nhãn chỉ được đăng ký dần khi timeline tiến tới (giữ nguyên tick)
+        categorical_x = x_values.dtype == object
+        if categorical_x:
+            x_numeric = np.arange(len(x_values), dtype=float)
+        else:
+            x_numeric = np.asarray(ax.xaxis.convert_units(x_values), dtype=float)
+        state = {'span': None, 'markevery': 1, 'registered': 1}
 
-                for i, entity in enumerate(top_entities):
-                    color = colors_list[i % len(colors_list)]
-                    # UPGRADED: Add error handling for plot
-                    try:
-                        ax.plot(data_slice.index, data_slice[entity],
-                               label=entity, color=color, linewidth=3, alpha=0.9,
-                               marker='o', markersize=4, markevery=max(1, len(data_slice)//10))
-                    except Exception as e:
-                        print(f"  ⚠️  Lỗi khi vẽ line cho {entity}: {e}")
-                        continue
+        # V5.1 AESTHETIC: Apply aesthetic principles
+        self._apply_aesthetic_to_axis(ax)
 
-                # V5.1 AESTHETIC: Apply aesthetic principles
-                self._apply_aesthetic_to_axis(ax)
+        # V5.1 AESTHETIC: Title with hierarchy and spacing
+        title_obj, subtitle_obj = self._format_title_with_subtitle(
+            ax, self.title, period_val=plan.period_labels[0])
 
-                # V5.1 AESTHETIC: Title with hierarchy and spacing
-                period_val = self.df_wide.index[current_idx] if current_idx < len(self.df_wide) else self.df_wide.index[-1]
-                self._format_title_with_subtitle(ax, self.title, period_val=period_val)
+        # V5.1 AESTHETIC: Legend with typography hierarchy
+        if 0 < len(top_entities) <= 10:  # Only show legend if not too crowded
+            legend_size = self._get_font_size('body')
+            ax.legend(loc='upper left', fontsize=legend_size,
+                    framealpha=0.9, ncol=1 if len(top_entities) <= 5 else 2,
+                    edgecolor='none', fancybox=True)
 
-                # V5.1 AESTHETIC: Legend with typography hierarchy
-                if len(top_entities) <= 10:  # Only show legend if not too crowded
-                    legend_size = self._get_font_size('body')
-                    ax.legend(loc='upper left', fontsize=legend_size,
-                            framealpha=0.9, ncol=1 if len(top_entities) <= 5 else 2,
-                            edgecolor='none', fancybox=True)
+        # V5.1 AESTHETIC: Axis labels with typography
+        label_size = self._get_font_size('body')
+        ax.set_xlabel('Period', fontsize=label_size, labelpad=self._get_spacing('sm'))
+        ax.set_ylabel('Value', fontsize=label_size, labelpad=self._get_spacing('sm'))
 
-                # V5.1 AESTHETIC: Axis labels with typography
-                label_size = self._get_font_size('body')
-                ax.set_xlabel('Period', fontsize=label_size, labelpad=self._get_spacing('sm'))
-                ax.set_ylabel('Value', fontsize=label_size, labelpad=self._get_spacing('sm'))
+        text_color = '#1a1a1a' if self.theme == 'light' else '#FFFFFF'
+        progress_artists = None
+        static_artists = []
+        if self.show_progress_bar:
+            self.period_index = 0
+            progress_artists = self._add_progress_bar(ax, text_color)
+            static_artists.extend(progress_artists[0])
+        if self.watermark_text:
+            static_artists.append(self._add_watermark(ax, text_color))
+        # V5.2 - Track progress bar + watermark: raster một lần, composite mỗi frame
+        self._add_static_layers(ax, static_artists)
 
-                # UPGRADED: Set reasonable y-axis limits
-                try:
-                    y_max = data_slice[top_entities].max().max()
+        # Animation function with error handling
+        def animate(frame):
+            try:
+                # FIXED: Map frame to period (tra trong FramePlan)
+                current_idx = plan.frame_period[frame]
+                n_points = current_idx + 1
+                start = max(0, n_points - window) if window else 0
+
+                if (start, n_points) != state['span'] and lines:
+                    if categorical_x and n_points > state['registered']:
+                        ax.xaxis.update_units(x_values[state['registered']:n_points])
+                        state['registered'] = n_points
+                    x_view = x_values[start:n_points]
+                    for line, y_column in zip(lines, y_columns):
+                        line.set_data(x_view, y_column[start:n_points])
+
+                    markevery = int(markevery_table[current_idx])
+                    if window:
+                        # Giữ marker cố định theo period khi cửa sổ trượt
+                        markevery = ((-start) % markevery, markevery)
+                    if markevery != state['markevery']:
+                        for line in lines:
+                            line.set_markevery(markevery)
+                        state['markevery'] = markevery
+
+                    # Data limits O(1) thay cho relim() (O(số điểm)): x tăng dần, y min/max tính sẵn
+                    if window:
+                        y_window = y_values[start:n_points]
+                        y_min, y_max = y_window.min(), y_window.max()
+                    else:
+                        y_min, y_max = y_running_min[current_idx], y_running_max[current_idx]
+                    ax.dataLim.update_from_data_xy(
+                        np.array([[x_numeric[start], y_min], [x_numeric[n_points - 1], y_max]]),
+                        ignore=True)
+                    ax.autoscale_view()
+
+                    # UPGRADED: Set reasonable y-axis limits
                     if np.isfinite(y_max) and y_max > 0:
                         ax.set_ylim(0, y_max * 1.1)
-                except:
-                    pass
+                    state['span'] = (start, n_points)
 
-                # Add v4.0 overlays if enabled
-                if current_idx < len(self.df_wide):
-                    period_val = self.df_wide.index[current_idx]
-                    current_values = self.df_wide.iloc[current_idx][top_entities].values
-                    current_ranks = {entity: i for i, entity in enumerate(top_entities)}
+                period_val = plan.period_labels[current_idx]
+                if subtitle_obj is not None and self.subtitle_template and period_val:
+                    subtitle_obj.set_text(self.subtitle_template.format(period=period_val))
 
-                    # Add v4.0 overlays
-                    text_color = '#1a1a1a' if self.theme == 'light' else '#FFFFFF'
-                    if self.show_progress_bar:
-                        self.period_index = current_idx
-                        self._add_progress_bar(ax, text_color)
-                    if self.watermark_text:
-                        self._add_watermark(ax, text_color)
+                if progress_artists:
+                    self.period_index = current_idx
+                    self._update_progress_bar(progress_artists)
 
             except Exception as e:
                 print(f"  ⚠️  Lỗi trong frame {frame}: {e}")
                 # Continue animation even if one frame fails
 
-        # Create animation with interpolated frames
-        # FIXED: Use total_frames instead of just periods
-        # Interval is now per-frame, not per-period
-        interval_per_frame = self.period_length / self.steps_per_period
-
-        # UPGRADED: Add blit=False for better compatibility
-        anim = FuncAnimation(fig, animate, frames=total_frames,
-                           interval=interval_per_frame,
-                           repeat=False,
-                           blit=False)
-
-        return fig, anim
+        # V5.2 - Trả về hàm vẽ frame để render theo từng đoạn (tuần tự hoặc song song)
+        return fig, animate, total_frames
 
     def _create_pie_chart_race(self):
         """V5.0 - Create animated pie chart race - UPGRADED for stability"""
@@ -1257,9 +4583,9 @@ class TimeSeriesRacing:
         # Get colors
         colors_list = ColorPalettes.get_palette(self.palette)
 
-        # FIXED: Calculate total frames with interpolation
-        n_periods = len(self.df_wide)
-        total_frames = n_periods * self.steps_per_period
+        # V5.2 - Top-N mỗi frame tra trong FramePlan
+        plan = self.frame_plan
+        total_frames = plan.n_frames
 
         # Animation function with error handling
         def animate(frame):
@@ -1267,33 +4593,25 @@ class TimeSeriesRacing:
                 ax.clear()
 
                 # FIXED: Map frame to period with interpolation
-                period_float = frame / self.steps_per_period
-                current_idx = int(min(period_float, n_periods - 1))
-
-                if current_idx >= len(self.df_wide):
-                    return
-
-                current_data = self.df_wide.iloc[current_idx]
-                period_val = self.df_wide.index[current_idx]
-
-                # Get top N
-                sorted_data = current_data.sort_values(ascending=False)
-                top_data = sorted_data.head(self.top_n)
+                top_idx, top_values, current_idx = plan.top(frame)
+                period_val = plan.period_labels[current_idx]
 
                 # UPGRADED: Filter out zero/negative values for pie chart
-                top_data = top_data[top_data > 0]
+                mask = top_values > 0
+                pie_values = top_values[mask]
+                pie_labels = plan.entities[top_idx[mask]]
 
                 # Create pie chart only if we have valid data
-                if len(top_data) > 0 and top_data.sum() > 0:
+                if len(pie_values) > 0 and pie_values.sum() > 0:
                     try:
                         # V5.1 AESTHETIC: Use typography hierarchy for labels
                         label_size = self._get_font_size('body')
                         pct_size = self._get_font_size('caption')
 
                         wedges, texts, autotexts = ax.pie(
-                            top_data.values,
-                            labels=top_data.index,
-                            colors=colors_list[:len(top_data)],
+                            pie_values,
+                            labels=pie_labels,
+                            colors=colors_list[:len(pie_values)],
                             autopct='%1.1f%%',
                             startangle=90,
                             textprops={'fontsize': label_size,
@@ -1338,19 +4656,16 @@ class TimeSeriesRacing:
                 print(f"  ⚠️  Lỗi trong frame {frame}: {e}")
                 # Continue animation even if one frame fails
 
-        # Create animation with interpolated frames
-        interval_per_frame = self.period_length / self.steps_per_period
-
-        # UPGRADED: Add blit=False for better compatibility
-        anim = FuncAnimation(fig, animate, frames=total_frames,
-                           interval=interval_per_frame,
-                           repeat=False,
-                           blit=False)
-
-        return fig, anim
+        # V5.2 - Trả về hàm vẽ frame để render theo từng đoạn (tuần tự hoặc song song)
+        return fig, animate, total_frames
 
     def _create_column_chart_race(self):
-        """V5.0 - Create animated column (vertical bar) chart race - UPGRADED for stability"""
+        """
+        V5.2 - Create animated column (vertical bar) chart race - RETAINED MODE
+
+        Bars, value labels, tick labels, title, progress bar và watermark được tạo MỘT lần;
+        mỗi frame chỉ cập nhật height, vị trí và text (không ax.clear()).
+        """
         print(f"\n📊 Creating COLUMN CHART RACE animation (vertical bars)...")
 
         # Setup figure
@@ -1366,104 +4681,93 @@ class TimeSeriesRacing:
         # Get colors
         colors_list = ColorPalettes.get_palette(self.palette)
 
-        # FIXED: Calculate total frames with interpolation
-        n_periods = len(self.df_wide)
-        total_frames = n_periods * self.steps_per_period
+        # V5.2 - Top-N mỗi frame tra trong FramePlan
+        plan = self.frame_plan
+        total_frames = plan.n_frames
+        n_bars = plan.top_n
+
+        # V5.1 AESTHETIC: Typography hierarchy
+        label_size = self._get_font_size('body')
+        value_size = self._get_font_size('caption')
+        font_family = self.aesthetic.FONT_FAMILIES.get(self.font_style, 'sans-serif')
+        text_color = '#1a1a1a' if self.theme == 'light' else '#FFFFFF'
+
+        # === Retained artists: tạo một lần ===
+        bars = ax.bar(range(n_bars), np.zeros(n_bars),
+                      color=colors_list[:n_bars],
+                      alpha=self.bar_alpha,
+                      edgecolor='white',
+                      linewidth=self.bar_border_width)
+
+        value_texts = []
+        if self.show_bar_values:
+            for bar in bars:
+                text_obj = ax.text(bar.get_x() + bar.get_width()/2., 0, '',
+                                   ha='center', va='bottom',
+                                   fontsize=value_size,
+                                   fontweight='bold',
+                                   fontfamily=font_family)
+                self._add_text_shadow(text_obj, 'low')
+                value_texts.append(text_obj)
+
+        self._apply_aesthetic_to_axis(ax)
+        ax.set_xticks(range(n_bars))
+        ax.set_ylabel('Value', fontsize=label_size, labelpad=self._get_spacing('sm'))
+
+        title_obj, subtitle_obj = self._format_title_with_subtitle(
+            ax, self.title, period_val=plan.period_labels[0])
+
+        progress_artists = None
+        static_artists = []
+        if self.show_progress_bar:
+            self.period_index = 0
+            progress_artists = self._add_progress_bar(ax, text_color)
+            static_artists.extend(progress_artists[0])
+        if self.watermark_text:
+            static_artists.append(self._add_watermark(ax, text_color))
+        # V5.2 - Track progress bar + watermark: raster một lần, composite mỗi frame
+        self._add_static_layers(ax, static_artists)
+
+        state = {'names': None}
 
         # Animation function with error handling
         def animate(frame):
             try:
-                ax.clear()
-
                 # FIXED: Map frame to period with interpolation
-                period_float = frame / self.steps_per_period
-                current_idx = int(min(period_float, n_periods - 1))
-
-                if current_idx >= len(self.df_wide):
-                    return
-
-                current_data = self.df_wide.iloc[current_idx]
-                period_val = self.df_wide.index[current_idx]
+                top_idx, values, current_idx = plan.top(frame)
+                period_val = plan.period_labels[current_idx]
 
-                # Get top N and sort
-                sorted_data = current_data.sort_values(ascending=False)
-                top_data = sorted_data.head(self.top_n)
+                for bar, value in zip(bars, values):
+                    bar.set_height(value)
 
-                # UPGRADED: Filter out invalid values
-                top_data = top_data[top_data >= 0]  # No negative values
-                if len(top_data) == 0:
-                    return
+                for text_obj, value in zip(value_texts, values):
+                    text_obj.set_y(value)
+                    text_obj.set_text(f'{value:,.0f}' if np.isfinite(value) else '')
 
-                # Create column chart (vertical bars)
-                try:
-                    bars = ax.bar(range(len(top_data)), top_data.values,
-                                 color=colors_list[:len(top_data)],
-                                 alpha=self.bar_alpha,
-                                 edgecolor='white',
-                                 linewidth=self.bar_border_width)
-
-                    # V5.1 AESTHETIC: Add value labels with typography hierarchy
-                    if self.show_bar_values:
-                        value_size = self._get_font_size('caption')
-                        for i, (value, bar) in enumerate(zip(top_data.values, bars)):
-                            if np.isfinite(value):  # UPGRADED: Check for valid values
-                                height = bar.get_height()
-                                text_obj = ax.text(bar.get_x() + bar.get_width()/2., height,
-                                       f'{value:,.0f}',
-                                       ha='center', va='bottom',
-                                       fontsize=value_size,
-                                       fontweight='bold',
-                                       fontfamily=self.aesthetic.FONT_FAMILIES.get(self.font_style, 'sans-serif'))
-                                # V5.1 AESTHETIC: Add shadow for depth
-                                self._add_text_shadow(text_obj, 'low')
-
-                except Exception as e:
-                    print(f"  ⚠️  Lỗi khi vẽ column chart tại frame {frame}: {e}")
-                    return
-
-                # V5.1 AESTHETIC: Apply aesthetic principles
-                self._apply_aesthetic_to_axis(ax)
-
-                # V5.1 AESTHETIC: Styling with typography hierarchy
-                ax.set_xticks(range(len(top_data)))
-                label_size = self._get_font_size('body')
-                ax.set_xticklabels(top_data.index, rotation=45, ha='right',
-                                  fontsize=label_size)
-                ax.set_ylabel('Value', fontsize=label_size, labelpad=self._get_spacing('sm'))
-
-                # V5.1 AESTHETIC: Title with hierarchy
-                self._format_title_with_subtitle(ax, self.title, period_val=period_val)
+                # Tick labels chỉ cập nhật khi thứ hạng thay đổi
+                names = tuple(top_idx)
+                if names != state['names']:
+                    ax.set_xticklabels(plan.entities[top_idx], rotation=45, ha='right', fontsize=label_size)
+                    state['names'] = names
 
                 # UPGRADED: Set reasonable y-axis limits
-                try:
-                    y_max = top_data.max()
-                    if np.isfinite(y_max) and y_max > 0:
-                        ax.set_ylim(0, y_max * 1.15)  # Add 15% headroom for labels
-                except:
-                    pass
+                y_max = values.max() if len(values) > 0 else 0
+                if np.isfinite(y_max) and y_max > 0:
+                    ax.set_ylim(0, y_max * 1.15)  # Add 15% headroom for labels
 
-                # Add v4.0 overlays
-                text_color = '#1a1a1a' if self.theme == 'light' else '#FFFFFF'
-                if self.show_progress_bar:
+                if subtitle_obj is not None and self.subtitle_template and period_val:
+                    subtitle_obj.set_text(self.subtitle_template.format(period=period_val))
+
+                if progress_artists:
                     self.period_index = current_idx
-                    self._add_progress_bar(ax, text_color)
-                if self.watermark_text:
-                    self._add_watermark(ax, text_color)
+                    self._update_progress_bar(progress_artists)
 
             except Exception as e:
                 print(f"  ⚠️  Lỗi trong frame {frame}: {e}")
                 # Continue animation even if one frame fails
 
-        # Create animation with interpolated frames
-        interval_per_frame = self.period_length / self.steps_per_period
-
-        # UPGRADED: Add blit=False for better compatibility
-        anim = FuncAnimation(fig, animate, frames=total_frames,
-                           interval=interval_per_frame,
-                           repeat=False,
-                           blit=False)
-
-        return fig, anim
+        # V5.2 - Trả về hàm vẽ frame để render theo từng đoạn (tuần tự hoặc song song)
+        return fig, animate, total_frames
 
     def _create_combo_chart_race(self):
         """V5.0 - Create combo chart with multiple chart types - FIXED timing"""
@@ -1505,25 +4809,16 @@ class TimeSeriesRacing:
         # Get colors
         colors_list = ColorPalettes.get_palette(self.palette)
 
-        # FIXED: Calculate total frames with interpolation
-        n_periods = len(self.df_wide)
-        total_frames = n_periods * self.steps_per_period
+        # V5.2 - Top-N mỗi frame tra trong FramePlan
+        plan = self.frame_plan
+        total_frames = plan.n_frames
 
         # Animation function
         def animate(frame):
             # FIXED: Map frame to period with interpolation
-            period_float = frame / self.steps_per_period
-            current_idx = int(min(period_float, n_periods - 1))
-
-            if current_idx >= len(self.df_wide):
-                return
-
-            current_data = self.df_wide.iloc[current_idx]
-            period_val = self.df_wide.index[current_idx]
-
-            # Get top N
-            sorted_data = current_data.sort_values(ascending=False)
-            top_data = sorted_data.head(self.top_n)
+            top_idx, top_values, current_idx = plan.top(frame)
+            top_names = plan.entities[top_idx]
+            period_val = plan.period_labels[current_idx]
 
             # V5.1 AESTHETIC: Get typography sizes
             heading_size = self._get_font_size('heading')
@@ -1540,11 +4835,11 @@ class TimeSeriesRacing:
                 try:
                     if chart_type == 'bar':
                         # Horizontal bar chart
-                        ax.barh(range(len(top_data)), top_data.values,
-                               color=colors_list[:len(top_data)],
+                        ax.barh(range(len(top_values)), top_values,
+                               color=colors_list[:len(top_values)],
                                alpha=self.bar_alpha)
-                        ax.set_yticks(range(len(top_data)))
-                        ax.set_yticklabels(top_data.index, fontsize=body_size, fontfamily=font_family)
+                        ax.set_yticks(range(len(top_values)))
+                        ax.set_yticklabels(top_names, fontsize=body_size, fontfamily=font_family)
                         ax.invert_yaxis()
                         # V5.1 AESTHETIC: Subtitle for chart type
                         title_obj = ax.set_title('Bar Chart', fontsize=heading_size, fontweight='bold',
@@ -1553,11 +4848,11 @@ class TimeSeriesRacing:
 
                     elif chart_type == 'column':
                         # Vertical bar chart
-                        ax.bar(range(len(top_data)), top_data.values,
-                              color=colors_list[:len(top_data)],
+                        ax.bar(range(len(top_values)), top_values,
+                              color=colors_list[:len(top_values)],
                               alpha=self.bar_alpha)
-                        ax.set_xticks(range(len(top_data)))
-                        ax.set_xticklabels(top_data.index, rotation=45, ha='right',
+                        ax.set_xticks(range(len(top_values)))
+                        ax.set_xticklabels(top_names, rotation=45, ha='right',
                                           fontsize=body_size, fontfamily=font_family)
                         title_obj = ax.set_title('Column Chart', fontsize=heading_size, fontweight='bold',
                                                 fontfamily=font_family, pad=self._get_spacing('sm'))
@@ -1565,24 +4860,25 @@ class TimeSeriesRacing:
 
                     elif chart_type == 'line':
                         # Line chart (cumulative)
-                        data_slice = self.df_wide.iloc[:current_idx+1]
-                        for i, entity in enumerate(top_data.index):
-                            ax.plot(data_slice.index, data_slice[entity],
+                        x_slice = plan.period_labels[:current_idx+1]
+                        for i, entity_idx in enumerate(top_idx):
+                            ax.plot(x_slice, plan.values[:current_idx+1, entity_idx],
                                    color=colors_list[i % len(colors_list)],
                                    linewidth=2.5, alpha=0.9)
                         title_obj = ax.set_title('Line Chart', fontsize=heading_size, fontweight='bold',
                                                 fontfamily=font_family, pad=self._get_spacing('sm'))
                         self._add_text_shadow(title_obj, 'low')
-                        if len(top_data) <= 5:  # Only show legend if not too many
-                            ax.legend(top_data.index, fontsize=caption_size, loc='upper left',
+                        if len(top_idx) <= 5:  # Only show legend if not too many
+                            ax.legend(top_names, fontsize=caption_size, loc='upper left',
                                     framealpha=0.9, edgecolor='none')
 
                     elif chart_type == 'pie':
                         # Pie chart
-                        pie_data = top_data[top_data > 0]  # Filter out zeros
-                        if len(pie_data) > 0 and pie_data.sum() > 0:
-                            ax.pie(pie_data.values, labels=pie_data.index,
-                                  colors=colors_list[:len(pie_data)],
+                        mask = top_values > 0  # Filter out zeros
+                        pie_values = top_values[mask]
+                        if len(pie_values) > 0 and pie_values.sum() > 0:
+                            ax.pie(pie_values, labels=top_names[mask],
+                                  colors=colors_list[:len(pie_values)],
                                   autopct='%1.1f%%',
                                   textprops={'fontsize': caption_size, 'fontfamily': font_family})
                         title_obj = ax.set_title('Pie Chart', fontsize=heading_size, fontweight='bold',
@@ -1604,15 +4900,292 @@ class TimeSeriesRacing:
             )
             self._add_text_shadow(suptitle_obj, 'medium')
 
-        # Create animation with interpolated frames
-        interval_per_frame = self.period_length / self.steps_per_period
+        # V5.2 - Trả về hàm vẽ frame để render theo từng đoạn (tuần tự hoặc song song)
+        return fig, animate, total_frames
+
+    # ==================== V5.2 PERFORMANCE: CHUNKED RENDERING ====================
+
+    def _build_chart_race(self):
+        """
+        V5.2 - Tạo figure và hàm vẽ frame cho chart type hiện tại
+
+        Returns:
+            (fig, animate, total_frames)
+        """
+        if self.frame_plan is None:
+            self.build_frame_plan()
+        builders = {
+            'line': self._create_line_chart_race,
+            'pie': self._create_pie_chart_race,
+            'column': self._create_column_chart_race,
+            'combo': self._create_combo_chart_race
+        }
+        if self.chart_type not in builders:
+            raise ValueError(f"Chart type không hỗ trợ render theo frame: {self.chart_type}")
+        return builders[self.chart_type]()
+
+    @staticmethod
+    def _split_frame_range(total_frames, n_chunks):
+        """
+        V5.2 - Chia [0, total_frames) thành các đoạn liên tiếp gần bằng nhau
+
+        Returns:
+            List các tuple (start, end)
+        """
+        n_chunks = max(1, min(n_chunks, total_frames))
+        bounds = np.linspace(0, total_frames, n_chunks + 1).astype(int)
+        return [(int(bounds[i]), int(bounds[i + 1])) for i in range(n_chunks)]
+
+    def _render_frame_range(self, start, end, output_file, save_fps, lossless=False):
+        """
+        V5.2 - Render frames [start, end) ra một file video
+
+        Mỗi lần gọi tạo figure riêng, nên có thể chạy trong process khác.
+        Mỗi frame chỉ phụ thuộc vào chỉ số frame → kết quả giống hệt render tuần tự.
+        Buffer RGBA của canvas được pipe thẳng vào FFmpeg (không file tạm, encode một lần).
+        Frame có cùng nội dung với frame trước (cùng FramePlan.frame_key) không vẽ lại,
+        chỉ ghi lại buffer cũ → vẫn giữ CFR.
+
+        Returns:
+            Số frame đã render
+        """
+        if self._use_fast_renderer():
+            return self._render_frame_range_fast(start, end, output_file, save_fps, lossless)
+
+        fig, animate, _ = self._build_chart_race()
+        writer = self._make_video_writer(save_fps, lossless=lossless)
+        encode_cpu = _children_cpu_seconds()
+        render_start = time.perf_counter()
+        rendered = 0
+        text_hits, text_misses = self.text_cache.hits, self.text_cache.misses
+        try:
+            with writer.saving(fig, output_file, self.dpi):
+                last_key = None
+                for frame in range(start, end):
+                    # Nội dung không đổi (không nội suy: cả period) → giữ nguyên buffer
+                    key = self.frame_plan.frame_key(frame)
+                    if key != last_key:
+                        animate(frame)
+                        fig.canvas.draw()
+                        rendered += 1
+                        last_key = key
+                        writer.grab_buffer()
+                    else:
+                        writer.repeat_frame()
+        finally:
+            plt.close(fig)
+
+        elapsed = time.perf_counter() - render_start
+        n_frames = end - start
+        print(f"      → Frames {start}-{end - 1}: {elapsed:.1f}s "
+              f"({n_frames / max(elapsed, 1e-9):.1f} frames/s, vẽ {rendered}/{n_frames}, "
+              f"text cache {self.text_cache.hits - text_hits:,} hit/"
+              f"{self.text_cache.misses - text_misses:,} miss"
+              f"{_encode_rate(self._output_frames(n_frames, save_fps, lossless), encode_cpu)}"
+              f"{writer.pipeline_summary()})")
+        self.pipeline_stats = writer.pipeline
+        return n_frames
+
+    def _use_fast_renderer(self):
+        """V5.2 - True nếu chart hiện tại được vẽ bằng FastRenderer (--renderer fast)"""
+        return self.renderer == 'fast' and self.chart_type in FastRenderer.CHART_TYPES
+
+    def _frame_count(self):
+        """
+        V5.2 - Tổng số frame của video
+
+        steps_per_period frame / period; BAR (bar_chart_race và renderer fast) dừng ở period
+        cuối: (periods - 1) × steps + 1 frame → hai renderer cùng thời lượng video.
+        """
+        total_frames = len(self.df_wide) * self.steps_per_period
+        if self.chart_type == 'bar':
+            return total_frames - self.steps_per_period + 1
+        return total_frames
+
+    def _render_frame_range_fast(self, start, end, output_file, save_fps, lossless=False):
+        """
+        V5.2 - Render frames [start, end) bằng FastRenderer (NumPy + Pillow, không matplotlib)
+
+        Dùng cùng writer FFmpeg và cùng kích thước frame như renderer matplotlib;
+        figure rỗng chỉ dùng để writer tính kích thước (chẵn cho H.264).
+
+        Returns:
+            Số frame đã render
+        """
+        figsize = (6, 10.67) if self.ratio == '9:16' else (12, 6.75)
+        fig = Figure(figsize=figsize, dpi=self.dpi)
+        writer = self._make_video_writer(save_fps, lossless=lossless)
+        encode_cpu = _children_cpu_seconds()
+        render_start = time.perf_counter()
+        draw_time = 0.0
+        rendered = 0
+        with writer.saving(fig, output_file, self.dpi):
+            renderer = FastRenderer(self, *writer.frame_size)
+            last_key = None
+            buffer = None
+            for frame in range(start, end):
+                key = renderer.frame_key(frame)
+                if key != last_key:
+                    draw_start = time.perf_counter()
+                    buffer = renderer.render(frame)
+                    draw_time += time.perf_counter() - draw_start
+                    rendered += 1
+                    last_key = key
+                    writer.grab_array(buffer)
+                else:
+                    writer.repeat_frame()
+
+        elapsed = time.perf_counter() - render_start
+        n_frames = end - start
+        glyphs = renderer.glyphs.hits + renderer.bar_glyphs.hits
+        misses = renderer.glyphs.misses + renderer.bar_glyphs.misses
+        print(f"      → Frames {start}-{end - 1}: {elapsed:.1f}s "
+              f"({n_frames / max(elapsed, 1e-9):.1f} frames/s, vẽ {rendered}/{n_frames} "
+              f"@ {rendered / max(draw_time, 1e-9):.0f} frames/s, glyph cache {glyphs:,} hit/{misses:,} miss"
+              f"{_encode_rate(self._output_frames(n_frames, save_fps, lossless), encode_cpu)}"
+              f"{writer.pipeline_summary()})")
+        self.pipeline_stats = writer.pipeline
+        return n_frames
+
+    def _render_parallel(self, output_file, save_fps):
+        """
+        V5.2 - Render song song: mỗi worker process render một đoạn frame liên tiếp
+        ra segment lossless riêng, sau đó ghép và encode một lần thành output_file
+        """
+        total_frames = self._frame_count()
+        chunks = self._split_frame_range(total_frames, self.workers)
+        print(f"      → Parallel render: {len(chunks)} workers × ~{total_frames // len(chunks)} frames")
+
+        work_dir = tempfile.mkdtemp(prefix='tsr_chunks_')
+        segment_files = [os.path.join(work_dir, f'segment_{i:04d}.mp4') for i in range(len(chunks))]
+
+        try:
+            with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+                futures = [
+                    pool.submit(self._render_frame_range, start, end, segment_file, save_fps, True)
+                    for (start, end), segment_file in zip(chunks, segment_files)
+                ]
+                rendered = sum(future.result() for future in futures)
+
+            print(f"      → Đã render {rendered:,} frames, đang ghép {len(segment_files)} segments...")
+            return self._concat_segments(segment_files, output_file,
+                                         n_frames=self._output_frames(total_frames, save_fps))
+
+        except Exception as e:
+            print(f"  ❌ Lỗi khi render song song: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _concat_segments(self, segment_files, output_file, n_frames=None):
+        """
+        V5.2 - Ghép các segment lossless bằng FFmpeg concat demuxer và encode một lần
+        với editor-friendly settings → giống hệt output của render tuần tự
+        """
+        list_file = os.path.join(os.path.dirname(segment_files[0]), RenderCheckpoint.SEGMENT_LIST)
+        with open(list_file, 'w', encoding='utf-8') as f:
+            for segment_file in segment_files:
+                f.write(f"file '{Path(segment_file).as_posix()}'\n")
+
+        return self._reencode_video(list_file, output_file, input_args=['-f', 'concat', '-safe', '0'],
+                                    n_frames=n_frames)
+
+    def _encode_from_intermediate(self, render, n_frames):
+        """
+        V5.2 - Render ra video lossless trung gian rồi encode ra output (+ output phụ)
+
+        Profile 2-pass: lượt 2 cần đọc lại toàn bộ video nên không pipe thẳng được.
+        BAR + --also-output: bar_chart_race chỉ ghi một file → fan-out từ file trung gian.
+
+        Args:
+            render: Hàm render(path) ghi video lossless trung gian ra path
+            n_frames: Số frame output (timeout + tốc độ encode)
+
+        Returns:
+            True nếu encode thành công ra self.output
+        """
+        work_dir = tempfile.mkdtemp(prefix='tsr_intermediate_')
+        try:
+            intermediate = os.path.join(work_dir, 'intermediate.mp4')
+            render(intermediate)
+            return self._reencode_video(intermediate, self.output, n_frames=n_frames)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _render_fingerprint(self, save_fps):
+        """
+        V5.2 - Hash dữ liệu đã chuẩn hóa + tùy chọn render (manifest của --resume)
+
+        Tùy chọn lấy từ render_options (chụp cuối __init__); thuộc tính gán sau đó do dữ liệu
+        quyết định (cột phát hiện được, df thô - không có khi dùng cache) nên chỉ tính qua
+        df_wide / entity_positions / period_totals.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(pd.util.hash_pandas_object(self.df_wide, index=True).values.tobytes())
+        digest.update(repr([str(c) for c in self.df_wide.columns]).encode())
+        for extra in (self.entity_positions, self.period_totals):
+            if extra is not None:
+                digest.update(np.asarray(extra).tobytes())
+        digest.update(repr((RenderCheckpoint.VERSION, save_fps, self.render_options)).encode())
+        return digest.hexdigest()
+
+    def _render_checkpointed(self, output_file, save_fps):
+        """
+        V5.2 - Render có checkpoint: chunk cố định → work_dir (manifest), chỉ render chunk còn
+        thiếu (--resume), ghép + encode một lần ra output_file, dọn chunk + manifest khi thành công
+
+        Chunk còn thiếu được render song song khi --workers > 1; ranh giới chunk không phụ
+        thuộc số workers nên có thể resume với --workers khác.
+        """
+        total_frames = self._frame_count()
+        work_dir = self.work_dir or f"{os.path.splitext(output_file)[0]}.tsr-chunks"
+        checkpoint = RenderCheckpoint(work_dir, self._render_fingerprint(save_fps), total_frames,
+                                      self.chunk_frames)
+        reused = checkpoint.open(self.resume)
+        missing = checkpoint.missing()
+        if checkpoint.discarded:
+            print(f"      ⚠️  Dữ liệu / tùy chọn render đã đổi → bỏ {checkpoint.discarded} chunk cũ")
+        print(f"      → Checkpoint: {len(checkpoint.chunks)} chunks × {checkpoint.chunk_frames} frames "
+              f"trong {work_dir} - dùng lại {reused}, cần render {len(missing)}")
+        self.checkpoint_stats = (reused, len(missing), len(checkpoint.chunks))
+
+        def render_chunk(index):
+            start, end = checkpoint.chunks[index]
+            return self._render_frame_range(start, end, str(checkpoint.partial_path(index)), save_fps, True)
 
-        anim = FuncAnimation(fig, animate, frames=total_frames,
-                           interval=interval_per_frame,
-                           repeat=False,
-                           blit=False)
+        try:
+            if self.workers > 1 and len(missing) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(missing))) as pool:
+                    futures = {
+                        pool.submit(self._render_frame_range, *checkpoint.chunks[index],
+                                    str(checkpoint.partial_path(index)), save_fps, True): index
+                        for index in missing
+                    }
+                    for future in as_completed(futures):
+                        future.result()
+                        checkpoint.commit(futures[future])
+            else:
+                for index in missing:
+                    render_chunk(index)
+                    checkpoint.commit(index)
+        except BaseException:
+            # Ctrl-C cũng dừng FFmpeg → lỗi của writer có thể thay KeyboardInterrupt
+            print(f"\n  ⏸️  Render dừng giữa chừng - {len(checkpoint.done)}/{len(checkpoint.chunks)} chunks "
+                  f"đã lưu trong {work_dir}, chạy lại với --resume để render tiếp")
+            raise
+
+        print(f"      → {len(checkpoint.chunks)} chunks sẵn sàng, đang ghép...")
+        if not self._concat_segments(checkpoint.segment_files(), output_file,
+                                     n_frames=self._output_frames(total_frames, save_fps)):
+            print(f"  ℹ️  Các chunk vẫn còn trong {work_dir} - chạy lại với --resume chỉ ghép + encode")
+            return False
+        checkpoint.remove()
+        return True
 
-        return fig, anim
+    # ==================== END CHUNKED RENDERING ====================
 
     def create_animation(self):
         """Tạo animation chart race và xuất video MP4 - V5.0 MULTI-CHART EDITION"""
@@ -1628,6 +5201,9 @@ class TimeSeriesRacing:
         print(f"  → Bar values: {'Yes' if self.show_bar_values else 'No'}")
         print(f"  → Visual effects: {'Enabled' if self.enable_effects else 'Disabled'}")
         print(f"  → Video codec: H.264 (yuv420p, CFR) - Editor-ready format")
+        print(f"  → Encode profile: {EncodingProfiles.describe(self.encoding)}")
+        for target in self.extra_outputs:
+            print(f"  → Output phụ (cùng lần render): {EncodingProfiles.describe_output(target)}")
         print(f"\n  ✨ V4.0 ULTIMATE Features:")
         print(f"  → Stats Panel: {'✅' if self.show_stats_panel else '❌'}")
         print(f"  → Progress Bar: {'✅' if self.show_progress_bar else '❌'}")
@@ -1647,12 +5223,9 @@ class TimeSeriesRacing:
             colors = ColorPalettes.get_palette(self.palette)
 
             # Tạo custom colormap - bar_chart_race chỉ nhận cmap, không nhận colors
-            n_colors = len(self.df_wide.columns)
-            if n_colors <= len(colors):
-                palette_colors = colors[:n_colors]
-            else:
-                # Repeat colors if needed
-                palette_colors = (colors * ((n_colors // len(colors)) + 1))[:n_colors]
+            # V5.2: màu theo vị trí cột gốc (trước prune) → giữ nguyên màu từng thực thể
+            positions = self.entity_positions if self.entity_positions is not None else range(len(self.df_wide.columns))
+            palette_colors = [colors[p % len(colors)] for p in positions]
 
             # Tạo colormap từ palette colors
             cmap = mcolors.ListedColormap(palette_colors)
@@ -1670,91 +5243,51 @@ class TimeSeriesRacing:
                 period_label_pos = {'x': 0.98, 'y': 0.15, 'ha': 'right', 'va': 'center'}  # V3.2 - Better positioning
 
             # V3.2 - PROFESSIONAL bar styling with stunning visual effects
-            if self.enable_effects:
-                if self.bar_style == 'gradient':
-                    bar_kwargs = {
-                        'alpha': self.bar_alpha,  # V3.2 - Customizable transparency
-                        'ec': 'white',  # Edge color - crisp white borders
-                        'lw': self.bar_border_width,  # V3.2 - Thicker premium borders
-                        'zorder': 10,
-                    }
-                else:
-                    bar_kwargs = {
-                        'alpha': self.bar_alpha - 0.05,  # Slightly less transparent for solid
-                        'ec': '#2C3E50',  # Darker border for contrast
-                        'lw': self.bar_border_width - 0.5,  # Slightly thinner for solid
-                        'zorder': 10,
-                    }
-            else:
-                # Standard styling (backward compatible)
-                if self.bar_style == 'gradient':
-                    bar_kwargs = {
-                        'alpha': 0.9,
-                        'ec': 'white',
-                        'lw': 2,
-                    }
-                else:
-                    bar_kwargs = {
-                        'alpha': 0.85,
-                        'ec': 'white',
-                        'lw': 1.5,
-                    }
+            bar_kwargs = self._bar_style_kwargs()
 
-            # UPGRADED: Create temporary file with better cleanup handling
-            temp_fd, temp_file = tempfile.mkstemp(suffix='.mp4', prefix='tsr_temp_')
-            os.close(temp_fd)  # Close file descriptor immediately
+            # V5.2 - Frames được pipe thẳng vào FFmpeg (rawvideo) → encode MỘT lần, không file tạm
 
             # UPGRADED: Ensure matplotlib is in a clean state
             plt.close('all')
 
             try:
                 # V5.0 - MULTI-CHART: Route to appropriate chart type
-                if self.chart_type == 'line':
-                    # Line chart race
-                    fig, anim = self._create_line_chart_race()
-                    # Save animation using matplotlib's built-in writer
-                    print(f"  ⏳ Saving LINE chart animation...")
+                if self.chart_type in ('line', 'pie', 'column', 'combo') or self._use_fast_renderer():
+                    print(f"  ⏳ Saving {self.chart_type.upper()} chart animation...")
+                    if self._use_fast_renderer():
+                        print(f"      → Renderer: FAST (NumPy + Pillow, glyph cache)")
+                    elif self.renderer == 'fast':
+                        print(f"  ℹ️  --renderer fast chỉ hỗ trợ bar/column - {self.chart_type.upper()} dùng matplotlib")
                     # FIXED: Calculate correct FPS for desired video duration
                     # fps = (1000ms / period_length) * steps_per_period
                     # This ensures each period lasts exactly period_length milliseconds
                     save_fps = (1000 / self.period_length) * self.steps_per_period
                     print(f"      → Calculated FPS: {save_fps:.1f} (for {self.period_length}ms per period)")
-                    writer = FFMpegWriter(fps=save_fps, metadata={'artist': 'TimeSeriesRacing v5.0'})
-                    anim.save(temp_file, writer=writer)
-
-                elif self.chart_type == 'pie':
-                    # Pie chart race
-                    fig, anim = self._create_pie_chart_race()
-                    print(f"  ⏳ Saving PIE chart animation...")
-                    # FIXED: Calculate correct FPS
-                    save_fps = (1000 / self.period_length) * self.steps_per_period
-                    print(f"      → Calculated FPS: {save_fps:.1f} (for {self.period_length}ms per period)")
-                    writer = FFMpegWriter(fps=save_fps, metadata={'artist': 'TimeSeriesRacing v5.0'})
-                    anim.save(temp_file, writer=writer)
-
-                elif self.chart_type == 'column':
-                    # Column chart race
-                    fig, anim = self._create_column_chart_race()
-                    print(f"  ⏳ Saving COLUMN chart animation...")
-                    # FIXED: Calculate correct FPS
-                    save_fps = (1000 / self.period_length) * self.steps_per_period
-                    print(f"      → Calculated FPS: {save_fps:.1f} (for {self.period_length}ms per period)")
-                    writer = FFMpegWriter(fps=save_fps, metadata={'artist': 'TimeSeriesRacing v5.0'})
-                    anim.save(temp_file, writer=writer)
-
-                elif self.chart_type == 'combo':
-                    # Combo chart with multiple types
-                    fig, anim = self._create_combo_chart_race()
-                    print(f"  ⏳ Saving COMBO chart animation...")
-                    # FIXED: Calculate correct FPS
-                    save_fps = (1000 / self.period_length) * self.steps_per_period
-                    print(f"      → Calculated FPS: {save_fps:.1f} (for {self.period_length}ms per period)")
-                    writer = FFMpegWriter(fps=save_fps, metadata={'artist': 'TimeSeriesRacing v5.0'})
-                    anim.save(temp_file, writer=writer)
+
+                    # V5.2 - PERFORMANCE: Render song song theo đoạn frame nếu có nhiều workers
+                    total_frames = self._frame_count()
+                    if self.resume or self.work_dir:
+                        # V5.2 - Render theo chunk có checkpoint (--resume / --work-dir)
+                        if not self._render_checkpointed(self.output, save_fps):
+                            raise RuntimeError("Render có checkpoint thất bại")
+                    elif self.workers > 1:
+                        if not self._render_parallel(self.output, save_fps):
+                            raise RuntimeError("Render song song thất bại")
+                    elif self.encoding['rate_control'] == '2pass':
+                        render = lambda path: self._render_frame_range(0, total_frames, path, save_fps, lossless=True)
+                        if not self._encode_from_intermediate(render, self._output_frames(total_frames, save_fps)):
+                            raise RuntimeError("Encode 2-pass thất bại")
+                    else:
+                        self._render_frame_range(0, total_frames, self.output, save_fps)
 
                 elif self.chart_type == 'bar':
                     # Original horizontal bar chart race (using bar_chart_race library)
-                    print(f"  ⏳ Step 1/2: Rendering BAR chart animation... (có thể mất vài phút)")
+                    if self.workers > 1:
+                        print(f"  ℹ️  --workers chỉ áp dụng cho line/pie/column/combo - BAR render tuần tự")
+                    if self.resume or self.work_dir:
+                        print(f"  ℹ️  --resume chỉ áp dụng cho line/pie/column/combo và --renderer fast "
+                              f"- BAR render một lượt")
+                    print(f"  ⏳ Rendering BAR chart animation... (có thể mất vài phút)")
 
                     # V4.0 - Custom bar label function with rank indicators and values
                     def v4_bar_label_func(val, rank):
@@ -1836,68 +5369,80 @@ class TimeSeriesRacing:
                                     'alpha': 0
                                 }
 
-                    bcr.bar_chart_race(
-                        df=self.df_wide,
-                        filename=temp_file,  # Save to temp file first
-                        n_bars=self.top_n,
-                        title=self.title,
-                        figsize=figsize,
-                        period_length=self.period_length,
-                        steps_per_period=self.steps_per_period,
-                        interpolate_period=self.interpolate_period,  # Smooth transitions
-                        cmap=cmap,
-                        bar_size=0.95,
-                        period_label={
-                            **period_label_pos,
-                            'size': period_label_size,
-                            'weight': self.period_label_style,  # V3.2 - Customizable weight
-                            'color': '#1a1a1a' if self.theme == 'light' else '#FFFFFF',  # V3.2 - Better contrast
-                            'alpha': 0.9  # V3.2 - Slight transparency for elegance
-                        },
-                        # Dùng :g để bỏ .0 cho số nguyên (2024 thay vì 2024.0)
-                        period_fmt='{x:g}' if isinstance(self.df_wide.index[0], (int, float)) else '{x}',
-                        bar_label_size=bar_label_size if self.show_bar_values else 0,  # V3.0 - Control bar values
-                        tick_label_size=tick_label_size,
-                        shared_fontdict={
-                            'family': self.font_family,  # V3.0 - Custom font
-                            'weight': self.title_style,  # V3.2 - Customizable title weight
-                            'color': '#1a1a1a' if self.theme == 'light' else '#FFFFFF'  # V3.2 - Better contrast
-                        },
-                        title_size=title_font_size + 2,  # V3.2 - Slightly larger for prominence
-                        scale='linear',
-                        writer='ffmpeg',  # Use default ffmpeg writer
-                        fig=None,
-                        dpi=self.dpi,  # V3.0 - Higher DPI for better quality!
-                        bar_kwargs=bar_kwargs,
-                        filter_column_colors=False,
-                        # V4.0 - ULTIMATE EDITION period summary with full overlay system
-                        period_summary_func=v4_period_summary,
-                    )
-
-                    print(f"  ✅ BAR chart animation rendered to temp file")
+                    # V5.2 - bar_chart_race dùng FFMpegWriter (pipe raw frames) với tham số encode
+                    # từ rcParams → encode thẳng ra output, không re-encode (trừ profile 2-pass và
+                    # --also-output: writer của bar_chart_race chỉ ghi một file)
+                    def render_bar(filename, ffmpeg_args):
+                        # anim.save chỉ nhận tên writer → độ sâu hàng đợi qua thuộc tính lớp
+                        PipelinedFFMpegWriter.QUEUE_DEPTH = self.frame_queue
+                        PipelinedFFMpegWriter.last_pipeline = None
+                        with plt.rc_context({'animation.codec': 'h264',
+                                             'animation.ffmpeg_args': ffmpeg_args}), \
+                                _bcr_layout_columns(self.unpruned_columns):
+                            bcr.bar_chart_race(
+                                df=self.df_wide,
+                                filename=filename,  # V5.2 - Encode thẳng ra output
+                                n_bars=self.top_n,
+                                title=self.title,
+                                figsize=figsize,
+                                period_length=self.period_length,
+                                steps_per_period=self.steps_per_period,
+                                interpolate_period=self.interpolate_period,  # Smooth transitions
+                                cmap=cmap,
+                                bar_size=0.95,
+                                period_label={
+                                    **period_label_pos,
+                                    'size': period_label_size,
+                                    'weight': self.period_label_style,  # V3.2 - Customizable weight
+                                    'color': '#1a1a1a' if self.theme == 'light' else '#FFFFFF',  # V3.2 - Better contrast
+                                    'alpha': 0.9  # V3.2 - Slight transparency for elegance
+                                },
+                                # Dùng :g để bỏ .0 cho số nguyên (2024 thay vì 2024.0)
+                                period_fmt='{x:g}' if isinstance(self.df_wide.index[0], (int, float)) else '{x}',
+                                bar_label_size=bar_label_size if self.show_bar_values else 0,  # V3.0 - Control bar values
+                                tick_label_size=tick_label_size,
+                                shared_fontdict={
+                                    'family': self.font_family,  # V3.0 - Custom font
+                                    'weight': self.title_style,  # V3.2 - Customizable title weight
+                                    'color': '#1a1a1a' if self.theme == 'light' else '#FFFFFF'  # V3.2 - Better contrast
+                                },
+                                title_size=title_font_size + 2,  # V3.2 - Slightly larger for prominence
+                                scale='linear',
+                                writer='tsr_ffmpeg',  # V5.2: FFMpegWriter + hàng đợi frame (--frame-queue)
+                                fig=None,
+                                dpi=self.dpi,  # V3.0 - Higher DPI for better quality!
+                                bar_kwargs=bar_kwargs,
+                                filter_column_colors=False,
+                                # V4.0 - ULTIMATE EDITION period summary with full overlay system
+                                period_summary_func=v4_period_summary,
+                            )
+
+                    output_frames = self._output_frames(self._frame_count(),
+                                                        (1000 / self.period_length) * self.steps_per_period)
+                    encode_cpu = _children_cpu_seconds()
+                    if self.encoding['rate_control'] == '2pass' or self.extra_outputs:
+                        lossless_args = self._encoding_args(EncodingProfiles.resolve('lossless-intermediate'))
+                        if not self._encode_from_intermediate(lambda path: render_bar(path, lossless_args),
+                                                              output_frames):
+                            raise RuntimeError("Encode từ video trung gian thất bại")
+                    else:
+                        render_bar(self.output, self._encoding_args())
+
+                    self.pipeline_stats = PipelinedFFMpegWriter.last_pipeline
+                    queue_stats = f", {self.pipeline_stats.summary()}" if self.pipeline_stats is not None else ""
+                    print(f"  ✅ BAR chart animation rendered{_encode_rate(output_frames, encode_cpu)}{queue_stats}")
 
                 else:
                     # Unknown chart type
                     raise ValueError(f"Unknown chart type: {self.chart_type}. Use: bar, line, pie, column, combo")
 
-                # V5.0 - Step 2: Re-encode with editor-friendly settings (for ALL chart types)
-                print(f"  ⏳ Step 2/2: Re-encoding for editor compatibility...")
-
-                # UPGRADED: Close matplotlib figure before re-encoding to free memory
-                try:
-                    plt.close(fig)
-                except:
-                    pass
-
-                if not self._reencode_video(temp_file, self.output):
-                    print(f"  ⚠️  Re-encoding failed, using original file")
-                    # Copy temp to output as fallback
-                    import shutil
-                    try:
-                        shutil.copy2(temp_file, self.output)
-                    except Exception as e:
-                        print(f"  ❌ Không thể copy temp file: {e}")
-                        # Return False since we failed to create output
+                # UPGRADED: Validate output file
+                if not os.path.exists(self.output) or os.path.getsize(self.output) <= 1000:
+                    print(f"  ❌ Encoding failed - output file không được tạo hoặc quá nhỏ")
+                    return False
+                for target in self.extra_outputs:
+                    if not os.path.exists(target['path']) or os.path.getsize(target['path']) <= 1000:
+                        print(f"  ❌ Encoding failed - output phụ không được tạo hoặc quá nhỏ: {target['path']}")
                         return False
 
             finally:
@@ -1908,33 +5453,35 @@ class TimeSeriesRacing:
                 except:
                     pass
 
-                # Clean up temp file
-                if os.path.exists(temp_file):
-                    try:
-                        os.remove(temp_file)
-                        print(f"  🗑️  Cleaned up temp file")
-                    except Exception as e:
-                        print(f"  ⚠️  Không thể xóa temp file: {e}")
-                        pass  # Not critical if cleanup fails
-
             print(f"\n✅ Video đã được tạo thành công: {self.output}")
 
             # Hiển thị thông tin file
             file_size = os.path.getsize(self.output) / (1024 * 1024)  # MB
             print(f"  → Kích thước: {file_size:.2f} MB")
+            for target in self.extra_outputs:
+                print(f"  → Output phụ: {EncodingProfiles.describe_output(target)} - "
+                      f"{os.path.getsize(target['path']) / (1024 * 1024):.2f} MB")
 
             # Show specs
             # FIXED: Calculate actual video FPS and duration
             actual_fps = (1000 / self.period_length) * self.steps_per_period
-            total_frames = len(self.df_wide) * self.steps_per_period
+            total_frames = self._frame_count()
             actual_duration = total_frames / actual_fps  # in seconds
 
             print(f"\n📊 Thông số video:")
+            if self.draft is not None:
+                print(f"  → ⚠️  DRAFT: {self.steps_per_period} steps/period @ {self.dpi} DPI, ultrafast "
+                      f"(metadata: [DRAFT]) - bỏ --draft để render bản cuối")
             print(f"  → Resolution: {'1080×1920' if self.ratio == '9:16' else '1920×1080'}")
             print(f"  → DPI: {self.dpi} {'(Ultra HD)' if self.dpi >= 150 else '(Standard)'}")
             print(f"  → FPS: {actual_fps:.1f} (Constant Frame Rate)")
             print(f"  → Codec: H.264 (libx264) + yuv420p")
-            print(f"  → Bitrate: 8000 kbps (High Quality)")
+            print(f"  → Encode: {EncodingProfiles.describe(self.encoding)}")
+            if self.pipeline_stats is not None:
+                print(f"  → Frame queue: {self.pipeline_stats.summary()}")
+            if self.checkpoint_stats is not None:
+                reused, rendered, n_chunks = self.checkpoint_stats
+                print(f"  → Checkpoint: {n_chunks} chunks (dùng lại {reused}, render {rendered})")
             print(f"  → Duration: {actual_duration:.1f}s ({len(self.df_wide)} periods × {self.period_length/1000:.1f}s)")
             print(f"  → Total frames: {total_frames:,} ({len(self.df_wide)} periods × {self.steps_per_period} steps)")
             print(f"  → Period length: {self.period_length}ms ({self.period_length/1000:.1f}s/period)")
@@ -1965,17 +5512,36 @@ class TimeSeriesRacing:
         if self.chart_type == 'combo':
             print(f"🎨 Combo Charts: {', '.join(self.combo_charts)} ({self.combo_layout} layout)")
 
-        # Bước 1: Đọc dữ liệu
-        if not self.read_data():
-            return False
+        # V5.2 - Dữ liệu đã chuẩn hóa ở lần chạy trước → bỏ qua bước 1-3
+        # (nguồn SQL luôn truy vấn lại: dữ liệu trong DB có thể đã đổi)
+        cache_key = self._load_cached_dataset() if self.use_cache and not self._is_sql_source() else None
+        if self.df_wide is None:
+            # Bước 1: Đọc dữ liệu
+            if not self.read_data():
+                return False
 
-        # Bước 2: Nhận dạng format
-        format_type = self.detect_format()
+            # Bước 2: Nhận dạng format
+            format_type = self.detect_format()
 
-        # Bước 3: Chuẩn hóa dữ liệu
-        if not self.normalize_data(format_type):
+            # Bước 3: Chuẩn hóa dữ liệu
+            if not self.normalize_data(format_type):
+                return False
+
+            if cache_key:
+                self._store_cached_dataset(cache_key)
+
+        # V5.2 - Gộp theo chu kỳ lớn hơn (--resample) để giảm số period/frame
+        if not self.resample_data():
             return False
 
+        # V5.2 - Bỏ các thực thể không bao giờ xuất hiện trên chart
+        self.prune_entities()
+
+        # V5.2 - Frame plan cho các renderer line/pie/column/combo và renderer fast
+        # (BAR matplotlib dùng bar_chart_race)
+        if self.chart_type != 'bar' or self._use_fast_renderer():
+            self.build_frame_plan()
+
         # Bước 4: Tạo animation
         if not self.create_animation():
             return False
@@ -2081,12 +5647,33 @@ V4.0 Control Flags:
   --watermark-text TEXT   - Add custom watermark
   --watermark-position POS - Set watermark position (top-left/top-right/bottom-left/bottom-right)
 
+V5.2 PERFORMANCE Flags:
+  --workers N             - Render song song N process (line/pie/column/combo)
+  --line-window N         - Line chart: cửa sổ trượt N period (chi phí mỗi frame cố định)
+  --renderer fast         - Bar/column: renderer NumPy/Pillow (không qua matplotlib, nhanh ~10x)
+  --float32               - Dữ liệu đã chuẩn hóa ở float32 (bảng rất lớn: một nửa bộ nhớ)
+  --agg sum|mean|last     - Long format: gộp dòng trùng (thời gian, thực thể) khi pivot
+  --resample W|M|Q|Y|N    - Gộp theo tuần/tháng/quý/năm (index năm dạng số: bucket N năm) - ít frame hơn
+  --no-prune              - Giữ mọi thực thể (mặc định bỏ thực thể không bao giờ vào top N + --prune-margin)
+  "data/*.csv" / thư mục  - Input nhiều shard: đọc song song (--load-workers N), kiểm tra schema, ghép
+  --sheet NAME|INDEX      - Excel: chọn sheet; lần parse đầu được spill ra cache dạng cột
+  sqlite:///data.db --table T - Nguồn SQL (hoặc --query); lọc/gộp/ứng viên top-N chạy trong DB
+  --no-cache              - Bỏ qua cache dữ liệu đã chuẩn hóa (--cache-dir, --cache-size-mb)
+  --draft [K]             - Bản nháp: 1/K frame (không K: 1 frame/period), DPI thấp, không hiệu ứng, ultrafast
+  --encode-profile NAME   - editor (mặc định), draft, social, web, archive (2-pass), lossless-intermediate
+  --encode-set KEY=VALUE  - Ghi đè profile: crf, preset, bitrate, maxrate, bufsize, threads, timeout, rate_control
+  --also-output PATH[:PROFILE][:Ns] - Output phụ từ cùng lần render: .mp4/.mov/.mkv (H.264), .webm (VP9), .gif (teaser)
+  --frame-queue N         - Hàng đợi N frame giữa render và writer thread ghi sang FFmpeg (0 = đồng bộ)
+  --resume                - Render theo chunk có checkpoint; chạy lại chỉ render chunk còn thiếu (--work-dir, --chunk-frames)
+
 🔥 Mặc định: TẤT CẢ v4.0 features được BẬT để có trải nghiệm thông tin tối đa!
         """
     )
 
     # Tham số bắt buộc
-    parser.add_argument('input', help='File dữ liệu đầu vào (CSV, Excel, JSON)')
+    parser.add_argument('input', help='File dữ liệu đầu vào (CSV, Excel, JSON, Parquet, Feather, Arrow IPC), '
+                                      'thư mục hoặc glob như "data/*.csv" (ghép các shard), '
+                                      'hoặc URI SQL như sqlite:///data.db (kèm --table / --query)')
 
     # V5.0 - MULTI-CHART EDITION parameters (NEW!)
     parser.add_argument('--chart-type', type=str,
@@ -2192,6 +5779,65 @@ V4.0 Control Flags:
     parser.add_argument('--no-highlight-leader', action='store_true',
                         help='Tắt highlight cho leader (#1) (mặc định: BẬT)')
 
+    # V5.2 - PERFORMANCE EDITION parameters
+    parser.add_argument('--workers', type=int, default=1,
+                        help='⚡ Số process render song song cho line/pie/column/combo (mặc định: 1, 0 = tất cả CPU cores)')
+    parser.add_argument('--line-window', type=int, default=0,
+                        help='⚡ Line chart: chỉ hiển thị N period gần nhất (cửa sổ trượt, mặc định: 0 = toàn bộ lịch sử)')
+    parser.add_argument('--renderer', type=str, choices=['matplotlib', 'fast'], default='matplotlib',
+                        help='⚡ Renderer: matplotlib (mặc định) hoặc fast (NumPy/Pillow, chỉ bar/column)')
+    parser.add_argument('--float32', action='store_true',
+                        help='⚡ Lưu dữ liệu đã chuẩn hóa ở float32 (một nửa bộ nhớ, đủ chính xác để hiển thị)')
+    parser.add_argument('--agg', type=str, choices=['sum', 'mean', 'last'], default='sum',
+                        help='⚡ Long format: gộp dòng trùng (thời gian, thực thể) bằng sum/mean/last (mặc định: sum)')
+    parser.add_argument('--resample', type=str, default=None,
+                        help='⚡ Gộp dữ liệu theo chu kỳ W/M/Q/Y (index ngày) hoặc N (index số, vd 10 = thập kỷ) trước khi render')
+    parser.add_argument('--resample-agg', type=str, choices=['sum', 'mean', 'last'], default='last',
+                        help='⚡ Cách gộp các hàng trong mỗi chu kỳ --resample (mặc định: last = giá trị cuối kỳ)')
+    parser.add_argument('--no-prune', action='store_true',
+                        help='⚡ Không loại các thực thể không bao giờ vào top N trước khi render')
+    parser.add_argument('--prune-margin', type=int, default=2,
+                        help='⚡ Giữ thêm thực thể từng đạt top N + margin (mặc định: 2)')
+    parser.add_argument('--sheet', type=str, default='0',
+                        help='⚡ Excel: sheet theo tên hoặc chỉ số (mặc định: 0 = sheet đầu tiên)')
+    parser.add_argument('--load-workers', type=int, default=0,
+                        help='⚡ Số thread đọc song song khi input là thư mục / glob (mặc định: 0 = tự động)')
+    parser.add_argument('--table', type=str, default=None,
+                        help='⚡ Input SQL: bảng nguồn (cột thời gian, thực thể, giá trị)')
+    parser.add_argument('--query', type=str, default=None,
+                        help='⚡ Input SQL: câu SELECT nguồn thay cho --table')
+    parser.add_argument('--where', type=str, default=None,
+                        help='⚡ Input SQL: điều kiện lọc chạy trong DB (vd "region = \'EU\'")')
+    parser.add_argument('--sql-chunk-rows', type=int, default=TimeSeriesRacing.SQL_CHUNK_ROWS,
+                        help=f'⚡ Input SQL: số dòng mỗi khối stream vào pivot (mặc định: {TimeSeriesRacing.SQL_CHUNK_ROWS:,})')
+    parser.add_argument('--draft', type=int, nargs='?', const=0, default=None, metavar='K',
+                        help='⚡ Bản nháp xem nhanh: render 1/K frame (không K: chỉ frame đầu mỗi period), '
+                             f'DPI {TimeSeriesRacing.DRAFT_DPI}, không hiệu ứng, encode ultrafast, giữ nguyên thời lượng')
+    parser.add_argument('--encode-profile', type=str, choices=list(EncodingProfiles.PROFILES), default=None,
+                        help='⚡ Bộ thông số encode (mặc định: editor; draft khi --draft)')
+    parser.add_argument('--encode-set', type=str, action='append', default=[], metavar='KEY=VALUE',
+                        help=f'⚡ Ghi đè một thông số của encode profile, lặp lại được ({", ".join(EncodingProfiles.KEYS)})')
+    parser.add_argument('--also-output', type=str, action='append', default=[], metavar='PATH[:PROFILE][:Ns]',
+                        help='⚡ Thêm output encode từ CÙNG lần render, lặp lại được: .mp4/.mov/.mkv (H.264), '
+                             '.webm (VP9), .gif (teaser); :Ns = chỉ N giây đầu (vd teaser.gif:10s, race.webm:web)')
+    parser.add_argument('--frame-queue', type=int, default=TimeSeriesRacing.FRAME_QUEUE_DEPTH, metavar='N',
+                        help='⚡ Số frame buffer giữa render và writer thread ghi sang FFmpeg, giới hạn bộ nhớ '
+                             f'(0 = ghi đồng bộ, mặc định: {TimeSeriesRacing.FRAME_QUEUE_DEPTH})')
+    parser.add_argument('--resume', action='store_true',
+                        help='⚡ Render theo chunk có checkpoint trong --work-dir; chạy lại sau khi bị dừng '
+                             'chỉ render các chunk còn thiếu (line/pie/column/combo, --renderer fast)')
+    parser.add_argument('--work-dir', type=str, default=None,
+                        help='⚡ Thư mục chunk + manifest của render có checkpoint (mặc định với --resume: '
+                             '<output>.tsr-chunks); không có --resume → render lại mọi chunk')
+    parser.add_argument('--chunk-frames', type=int, default=TimeSeriesRacing.CHUNK_FRAMES, metavar='N',
+                        help=f'⚡ Số frame mỗi chunk checkpoint (mặc định: {TimeSeriesRacing.CHUNK_FRAMES})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='⚡ Không dùng cache dữ liệu đã chuẩn hóa (luôn đọc + chuẩn hóa lại file)')
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help='⚡ Thư mục cache dữ liệu (mặc định: ~/.cache/TimeSeriesRacing)')
+    parser.add_argument('--cache-size-mb', type=float, default=512,
+                        help='⚡ Dung lượng tối đa thư mục cache, xoá entry cũ nhất khi vượt (mặc định: 512)')
+
     # Tham số cho long format
     parser.add_argument('--time', type=str, default=None,
                         help='Tên cột thời gian (tự động phát hiện nếu không chỉ định)')
@@ -2203,8 +5849,27 @@ V4.0 Control Flags:
     # Parse arguments
     args = parser.parse_args()
 
+    if args.workers < 0:
+        parser.error(f"--workers phải ≥ 0 (0 = tất cả CPU cores): {args.workers}")
+
+    # V5.2 - Ghi đè encode profile: --encode-set crf=20 --encode-set preset=slow
+    encode_overrides = {}
+    for item in args.encode_set:
+        key, sep, value = item.partition('=')
+        if not sep:
+            parser.error(f"--encode-set cần dạng KEY=VALUE: {item}")
+        encode_overrides[key.strip()] = value.strip()
+    try:
+        encoding = EncodingProfiles.resolve(args.encode_profile, encode_overrides)
+        also_paths = [os.path.abspath(EncodingProfiles.parse_output(spec, encoding)['path'])
+                      for spec in args.also_output]
+    except ValueError as e:
+        parser.error(str(e))
+    if len(set(also_paths + [os.path.abspath(args.output)])) != len(also_paths) + 1:
+        parser.error("--also-output trùng với --output hoặc trùng nhau")
+
     # Kiểm tra file đầu vào
-    if not os.path.exists(args.input):
+    if not os.path.exists(args.input) and not glob.glob(args.input) and '://' not in args.input:
         print(f"❌ File không tồn tại: {args.input}")
         sys.exit(1)
 
@@ -2259,7 +5924,34 @@ V4.0 Control Flags:
         enable_background_gradient=not args.no_background_gradient,
         watermark_text=args.watermark_text,
         watermark_position=args.watermark_position,
-        highlight_leader=not args.no_highlight_leader
+        highlight_leader=not args.no_highlight_leader,
+        # V5.2 - PERFORMANCE EDITION parameters
+        workers=args.workers,
+        line_window=args.line_window,
+        renderer=args.renderer,
+        float32=args.float32,
+        agg=args.agg,
+        resample=args.resample,
+        resample_agg=args.resample_agg,
+        prune=not args.no_prune,
+        prune_margin=args.prune_margin,
+        sheet=args.sheet,
+        load_workers=args.load_workers,
+        table=args.table,
+        query=args.query,
+        where=args.where,
+        sql_chunk_rows=args.sql_chunk_rows,
+        draft=args.draft,
+        encode_profile=args.encode_profile,
+        encode_overrides=encode_overrides,
+        extra_outputs=args.also_output,
+        frame_queue=args.frame_queue,
+        resume=args.resume,
+        work_dir=args.work_dir,
+        chunk_frames=args.chunk_frames,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        cache_size_mb=args.cache_size_mb
     )
 
     success = racing.run()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: pivot long → wide
+
+So sánh DataFrame.pivot với TimeSeriesRacing._pivot_long (factorize mã số nguyên +
+np.bincount vào ma trận cấp phát sẵn) trên dữ liệu long có thực thể dạng chuỗi.
+Đo thời gian, throughput (dòng/s) và bộ nhớ tạm tối đa (tracemalloc).
+
+Usage:
+    python examples/benchmark_pivot.py
+    python examples/benchmark_pivot.py --periods 500 --entities 2000,20000
+"""
+
+import argparse
+import sys
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Import module chính
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from TimeSeriesRacing import TimeSeriesRacing
+
+
+def _measure(func):
+    """(kết quả, thời gian giây, bộ nhớ tạm tối đa MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pivot long → wide')
+    parser.add_argument('--periods', type=int, default=200, help='Số khoảng thời gian (mặc định: 200)')
+    parser.add_argument('--entities', type=str, default='1000,10000',
+                        help='Danh sách số thực thể (mặc định: 1000,10000)')
+    parser.add_argument('--density', type=float, default=0.7,
+                        help='Tỷ lệ ô (thời gian, thực thể) có dữ liệu (mặc định: 0.7)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+
+    print(f"{'Rows':>12} | {'Entities':>9} | {'DataFrame.pivot':>24} | {'_pivot_long':>24} | {'Speedup':>8}")
+    print("-" * 90)
+
+    for n_entities in [int(e) for e in args.entities.split(',')]:
+        # Lưới đầy đủ (không trùng lặp - DataFrame.pivot báo lỗi nếu trùng), bỏ ngẫu nhiên một phần
+        grid = np.arange(args.periods * n_entities)
+        cells = np.sort(rng.choice(grid, size=int(len(grid) * args.density), replace=False))
+        rng.shuffle(cells)
+        names = np.array([f"entity_{i:06d}" for i in range(n_entities)], dtype=object)
+        df = pd.DataFrame({
+            'year': 1900 + cells // n_entities,
+            'name': names[cells % n_entities],
+            'value': rng.gamma(2.0, 100.0, size=len(cells)),
+        })
+
+        expected, t_pivot, m_pivot = _measure(lambda: df.pivot(index='year', columns='name', values='value'))
+        (result, _), t_codes, m_codes = _measure(
+            lambda: TimeSeriesRacing._pivot_long(df, 'year', 'name', 'value'))
+
+        pd.testing.assert_frame_equal(result, expected, check_names=False)
+
+        print(f"{len(df):>12,} | {n_entities:>9,} | "
+              f"{t_pivot:>6.2f}s {len(df) / t_pivot / 1e6:>5.1f}M/s {m_pivot:>6,.0f} MB | "
+              f"{t_codes:>6.2f}s {len(df) / t_codes / 1e6:>5.1f}M/s {m_codes:>6,.0f} MB | "
+              f"{t_pivot / t_codes:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
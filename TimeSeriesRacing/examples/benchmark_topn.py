@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark: chi phí chọn top-N mỗi frame
+
+So sánh cách cũ (pandas sort_values().head() trên từng hàng) với
+FramePlan._top_order (np.argpartition + sort k phần tử) cho E = 100, 10k, 100k thực thể.
+
+Usage:
+    python examples/benchmark_topn.py
+    python examples/benchmark_topn.py --top-n 10 --frames 200
+"""
+
+import argparse
+import sys
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Import module chính
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from TimeSeriesRacing import FramePlan
+
+
+def _per_frame_us(func, n_frames):
+    """Thời gian trung bình mỗi frame (micro giây)"""
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) / n_frames * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark chọn top-N mỗi frame')
+    parser.add_argument('--top-n', type=int, default=10, help='Số thực thể top (mặc định: 10)')
+    parser.add_argument('--frames', type=int, default=200, help='Số frame đo (mặc định: 200)')
+    parser.add_argument('--entities', type=str, default='100,10000,100000',
+                        help='Danh sách số thực thể (mặc định: 100,10000,100000)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    k = args.top_n
+
+    print(f"{'Entities':>10} | {'pandas sort_values':>20} | {'argpartition/frame':>20} | {'argpartition batch':>20} | {'Speedup':>8}")
+    print("-" * 92)
+
+    for n_entities in [int(e) for e in args.entities.split(',')]:
+        values = rng.gamma(2.0, 100.0, size=(args.frames, n_entities))
+        values[rng.random(values.shape) < 0.3] = 0  # Dữ liệu thưa: nhiều giá trị 0 bằng nhau
+        df = pd.DataFrame(values, columns=[f"entity_{i}" for i in range(n_entities)])
+
+        def pandas_path():
+            for i in range(args.frames):
+                df.iloc[i].sort_values(ascending=False).head(k)
+
+        def argpartition_path():
+            for i in range(args.frames):
+                FramePlan._top_order(values[i:i + 1], k)
+
+        def argpartition_batch():
+            FramePlan._top_order(values, k)
+
+        # Kiểm tra kết quả giống stable sort
+        expected = np.argsort(-values, axis=1, kind='stable')[:, :k]
+        assert (FramePlan._top_order(values, k) == expected).all()
+
+        t_pandas = _per_frame_us(pandas_path, args.frames)
+        t_frame = _per_frame_us(argpartition_path, args.frames)
+        t_batch = _per_frame_us(argpartition_batch, args.frames)
+
+        print(f"{n_entities:>10,} | {t_pandas:>17,.1f} µs | {t_frame:>17,.1f} µs | {t_batch:>17,.1f} µs | "
+              f"{t_pandas / t_frame:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kiểm tra pruning: video prune phải giống hệt video --no-prune
+
+Sinh dữ liệu nhiều thực thể (có một thực thể tên rất dài không bao giờ vào top N - BAR qua
+bar_chart_race nới rộng figure theo nhãn dài nhất), render mỗi chart type hai lần (mặc định
+và --no-prune) rồi so kích thước frame + MD5 từng frame đã giải mã (ffmpeg -f framemd5).
+Trả về exit code 1 nếu có chart type khác nhau.
+
+Usage:
+    python examples/check_prune.py
+    python examples/check_prune.py --chart-types bar,column,line --entities 200 --top 5
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(os.path.dirname(HERE), 'TimeSeriesRacing.py')
+
+
+def _frame_md5s(path):
+    """(kích thước frame, MD5 từng frame) của video đã giải mã"""
+    probe = subprocess.run(['ffmpeg', '-i', path], capture_output=True, text=True).stderr
+    match = re.search(r'Video:.*?(\d{2,}x\d{2,})', probe)
+    size = match.group(1) if match else '?'
+    out = subprocess.run(['ffmpeg', '-loglevel', 'error', '-i', path, '-f', 'framemd5', '-'],
+                         capture_output=True, text=True, check=True).stdout
+    return size, [line.split(',')[-1].strip() for line in out.splitlines() if not line.startswith('#')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='So video prune với --no-prune')
+    parser.add_argument('--chart-types', type=str, default='bar,column',
+                        help='Các chart type cần kiểm tra (mặc định: bar,column)')
+    parser.add_argument('--entities', type=int, default=60, help='Số thực thể (mặc định: 60)')
+    parser.add_argument('--periods', type=int, default=8, help='Số period (mặc định: 8)')
+    parser.add_argument('--top', type=int, default=5, help='Số thực thể top (mặc định: 5)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    values = rng.random((args.periods, args.entities)) * 100
+    values[:, :2 * args.top] += 200  # Chỉ nhóm đầu tranh top N
+    values[:, -1] = 1
+    columns = [f"E{i:03d}" for i in range(args.entities - 1)] + ["A very long entity name that never ranks"]
+
+    failed = False
+    with tempfile.TemporaryDirectory(prefix='tsr_prune_') as tmp:
+        data = os.path.join(tmp, 'data.csv')
+        pd.DataFrame(values, index=pd.Index(range(2000, 2000 + args.periods), name='year'),
+                     columns=columns).to_csv(data)
+        for chart_type in args.chart_types.split(','):
+            results = []
+            for extra in ([], ['--no-prune']):
+                output = os.path.join(tmp, f"{chart_type}{'_np' if extra else ''}.mp4")
+                subprocess.run([sys.executable, SCRIPT, data, '--no-cache', '--chart-type', chart_type,
+                                '--top', str(args.top), '--steps-per-period', '4', '--dpi', '50',
+                                '--output', output] + extra,
+                               capture_output=True, text=True, check=True)
+                results.append(_frame_md5s(output))
+            (size, md5s), (size_np, md5s_np) = results
+            same = size == size_np and md5s == md5s_np
+            failed |= not same
+            print(f"{chart_type:>8} | prune {size} ({len(md5s)} frames) | --no-prune {size_np} "
+                  f"({len(md5s_np)} frames) | {'✅ giống hệt' if same else '❌ khác nhau'}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
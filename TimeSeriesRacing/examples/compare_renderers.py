@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+So sánh renderer fast (NumPy/Pillow) với renderer matplotlib
+
+COLUMN: vẽ cùng một chart (nội suy, --steps bước / period) bằng cả hai renderer trên cùng
+kích thước canvas, đo tốc độ vẽ (frames/s, không tính encode) và sai khác hình ảnh từng frame
+(mean absolute difference trên kênh RGB, thang 0-255). Lưu ảnh ghép [matplotlib | fast | diff]
+của frame lệch nhiều nhất để kiểm tra bằng mắt.
+
+BAR: renderer matplotlib do bar_chart_race ghi thẳng ra video (figure tự nới rộng theo nhãn)
+nên không so pixel theo từng frame được. Thay vào đó so từng frame (kể cả frame giữa hai
+period) bars mà renderer fast vẽ - entity, giá trị, thứ hạng nội suy - với
+bar_chart_race.prepare_wide_data, và số frame của hai renderer phải bằng nhau.
+
+Trả về exit code 1 nếu sai khác vượt --max-diff, bars hoặc số frame BAR lệch bar_chart_race.
+
+Usage:
+    python examples/compare_renderers.py
+    python examples/compare_renderers.py examples/sample_wide.csv --dpi 100 --output diff.png
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import time
+import warnings
+
+import bar_chart_race as bcr
+import numpy as np
+from PIL import Image
+
+# Import module chính
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from TimeSeriesRacing import TimeSeriesRacing, FastRenderer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _prepare(input_file, chart_type='column', **kwargs):
+    """Đọc + chuẩn hóa dữ liệu và dựng FramePlan (ẩn log)"""
+    racer = TimeSeriesRacing(input_file, chart_type=chart_type, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        racer.read_data()
+        racer.normalize_data(racer.detect_format())
+        racer.build_frame_plan()
+    return racer
+
+
+def compare_bar(input_file, steps, top_n):
+    """
+    So bars từng frame của renderer fast với bar_chart_race.prepare_wide_data
+
+    Returns:
+        (số frame bar_chart_race, số frame renderer fast, sai khác giá trị tương đối lớn nhất,
+        sai khác thứ hạng lớn nhất, số frame khác tập bar hiển thị)
+    """
+    racer = _prepare(input_file, chart_type='bar', renderer='fast', top_n=top_n, steps_per_period=steps)
+    plan = racer.frame_plan
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)  # fillna(method=...) bên trong bar_chart_race
+        df_values, df_ranks = bcr.prepare_wide_data(racer.df_wide, n_bars=plan.top_n,
+                                                    steps_per_period=steps)
+    # bar_chart_race đảo thứ hạng cho barh (hạng 1 ở trên = y lớn nhất)
+    ranks = plan.top_n + 1 - df_ranks.to_numpy()
+    values = df_values.to_numpy()
+
+    value_err = rank_err = 0.0
+    mismatched = 0
+    n_fast = racer._frame_count()
+    for frame in range(min(len(values), n_fast)):
+        expected = np.flatnonzero((ranks[frame] > 0) & (ranks[frame] < plan.top_n + 1))
+        entities, bar_values, bar_ranks, _ = plan.bar_frame(frame)
+        order = np.argsort(entities)
+        if not np.array_equal(entities[order], expected):
+            mismatched += 1
+            continue
+        scale = max(1.0, np.abs(values[frame, expected]).max())
+        value_err = max(value_err, np.abs(bar_values[order] - values[frame, expected]).max() / scale)
+        rank_err = max(rank_err, np.abs(bar_ranks[order] - ranks[frame, expected]).max())
+    return len(values), n_fast, value_err, rank_err, mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description='So sánh renderer fast với renderer matplotlib')
+    parser.add_argument('input', nargs='?', default=os.path.join(HERE, 'sample_wide.csv'),
+                        help='File dữ liệu (mặc định: examples/sample_wide.csv)')
+    parser.add_argument('--dpi', type=int, default=150, help='DPI (mặc định: 150)')
+    parser.add_argument('--top-n', type=int, default=10, help='Số thực thể top (mặc định: 10)')
+    parser.add_argument('--steps', type=int, default=5,
+                        help='Số bước mỗi period - frame giữa hai period được so (mặc định: 5)')
+    parser.add_argument('--max-diff', type=float, default=12.0,
+                        help='Sai khác trung bình tối đa cho phép (0-255, mặc định: 12)')
+    parser.add_argument('--output', type=str, default='compare_renderers.png',
+                        help='Ảnh ghép frame lệch nhiều nhất (mặc định: compare_renderers.png)')
+    args = parser.parse_args()
+
+    # Tên font dạng "Inter, -apple-system, sans-serif" làm matplotlib cảnh báo mỗi lần vẽ
+    logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+    options = dict(dpi=args.dpi, top_n=args.top_n, watermark_text='@demo channel',
+                   steps_per_period=args.steps, interpolate_period=True)
+
+    # Renderer matplotlib (vẽ lại canvas như khi xuất video)
+    racer = _prepare(args.input, **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        fig, animate, total = racer._build_chart_race()
+    animate(0)
+    fig.canvas.draw()  # Làm nóng: lần vẽ đầu dựng layout + cache font của matplotlib
+    reference, elapsed = [], 0.0
+    for frame in range(total):
+        start = time.perf_counter()
+        animate(frame)
+        fig.canvas.draw()
+        elapsed += time.perf_counter() - start
+        reference.append(np.asarray(fig.canvas.buffer_rgba())[..., :3].copy())
+    mpl_fps = total / elapsed
+
+    # Renderer fast trên cùng kích thước canvas
+    racer = _prepare(args.input, renderer='fast', **options)
+    height, width = reference[0].shape[:2]
+    renderer = FastRenderer(racer, width, height)
+    for frame in range(total):
+        renderer.render(frame)  # Làm nóng glyph cache (raster hóa chỉ xảy ra một lần)
+    fast, elapsed = [], 0.0
+    for frame in range(total):
+        start = time.perf_counter()
+        buffer = renderer.render(frame)
+        elapsed += time.perf_counter() - start
+        fast.append(buffer[..., :3].copy())
+    fast_fps = total / elapsed
+
+    diffs = np.array([np.abs(a.astype(np.int16) - b).mean() for a, b in zip(reference, fast)])
+    worst = int(diffs.argmax())
+
+    print(f"COLUMN - canvas: {width}x{height} @ {args.dpi} dpi, {total} frames ({args.steps} bước / period)")
+    print(f"{'Renderer':>12} | {'frames/s':>10}")
+    print("-" * 27)
+    print(f"{'matplotlib':>12} | {mpl_fps:>10.1f}")
+    print(f"{'fast':>12} | {fast_fps:>10.1f}   ({fast_fps / mpl_fps:.1f}x)")
+    print(f"\nSai khác/frame (0-255): trung bình {diffs.mean():.2f}, lớn nhất {diffs[worst]:.2f} (frame {worst})")
+    print(f"Glyph cache: {renderer.glyphs.hits:,} hit / {renderer.glyphs.misses:,} miss")
+
+    # Ảnh ghép [matplotlib | fast | diff khuếch đại x4]
+    delta = np.abs(reference[worst].astype(np.int16) - fast[worst]).max(axis=2)
+    delta = np.repeat(np.clip(255 - delta * 4, 0, 255).astype(np.uint8)[..., None], 3, axis=2)
+    Image.fromarray(np.hstack([reference[worst], fast[worst], delta])).save(args.output)
+    print(f"Đã lưu: {args.output}")
+
+    n_frames, n_fast, value_err, rank_err, mismatched = compare_bar(args.input, args.steps, args.top_n)
+    print(f"\nBAR - so với bar_chart_race: {n_frames} frames (fast: {n_fast}, {args.steps} bước / period), "
+          f"giá trị lệch {value_err:.2e} (tương đối), thứ hạng lệch {rank_err:.2e}, "
+          f"{mismatched} frame khác tập bar")
+
+    failed = False
+    if diffs[worst] > args.max_diff:
+        print(f"❌ Sai khác vượt ngưỡng --max-diff {args.max_diff}")
+        failed = True
+    if n_fast != n_frames:
+        print(f"❌ Số frame BAR khác nhau: fast {n_fast}, bar_chart_race {n_frames}")
+        failed = True
+    if mismatched or value_err > 1e-5 or rank_err > 1e-5:
+        print("❌ Bars của renderer fast lệch bar_chart_race")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ Trong ngưỡng cho phép")
+
+
+if __name__ == "__main__":
+    main()